@@ -3,6 +3,7 @@ from middleware.auth import optional_auth, require_auth
 from services.telegram_bot import TelegramBotService
 from services.secret_store import SecretStore
 from persistence.store import DataStore
+from utils.http_cache import make_etag, conditional_response
 
 bot_bp = Blueprint('bot', __name__, url_prefix='/api/bot')
 
@@ -24,32 +25,11 @@ def init_bot_blueprint(secret_store: SecretStore, store: DataStore):
 def get_bot_config():
     """Get bot configuration from both config store and secret store."""
     try:
-        # Get config from YAML (fallback values)
-        config = bot_bp.store.get_config()
-        telegram_config = config.get('telegram', {})
-        
-        # Override with real values from secret store if available
-        if _bot_service:
-            bot_token = _bot_service.get_bot_token()
-            admin_user_id = _bot_service.get_admin_user_id()
-            
-            # Use stored values if available, fallback to config
-            if bot_token:
-                telegram_config['botToken'] = bot_token
-            if admin_user_id:
-                telegram_config['adminUserId'] = admin_user_id
-        
-        # Check if we have valid bot credentials
-        has_valid_config = bool(
-            telegram_config.get('botToken') and 
-            telegram_config.get('adminUserId')
-        )
-        telegram_config['hasValidConfig'] = has_valid_config
-        
-        return jsonify({
-            'success': True,
-            'data': telegram_config
-        }), 200
+        etag = None
+        fingerprint = bot_bp.secret_store.fingerprint(('telegram_bot_token', 'telegram_admin_user_id'))
+        if fingerprint is not None:
+            etag = make_etag(bot_bp.store.get_config_version(), fingerprint)
+        return conditional_response(etag, _build_bot_config_response)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -57,6 +37,36 @@ def get_bot_config():
         }), 500
 
 
+def _build_bot_config_response():
+    """Build the GET /api/bot/config payload."""
+    # Get config from YAML (fallback values)
+    config = bot_bp.store.get_config()
+    telegram_config = config.get('telegram', {})
+    
+    # Override with real values from secret store if available
+    if _bot_service:
+        bot_token = _bot_service.get_bot_token()
+        admin_user_id = _bot_service.get_admin_user_id()
+        
+        # Use stored values if available, fallback to config
+        if bot_token:
+            telegram_config['botToken'] = bot_token
+        if admin_user_id:
+            telegram_config['adminUserId'] = admin_user_id
+    
+    # Check if we have valid bot credentials
+    has_valid_config = bool(
+        telegram_config.get('botToken') and 
+        telegram_config.get('adminUserId')
+    )
+    telegram_config['hasValidConfig'] = has_valid_config
+    
+    return jsonify({
+        'success': True,
+        'data': telegram_config
+    }), 200
+
+
 @bot_bp.route('/config', methods=['POST'])
 @require_auth
 def update_bot_config():
@@ -93,19 +103,12 @@ def update_bot_config():
                     'error': 'Failed to save bot credentials securely'
                 }), 500
         
-        # Update config in YAML store
+        # Update the telegram section only (no full-config read-modify-write)
         try:
-            current_config = bot_bp.store.get_config()
-            telegram_config = current_config.get('telegram', {})
-            
-            # Update fields that go in config (not secrets)
+            telegram_updates = {'whitelistMode': whitelist_mode}
             if notification_channel_id:
-                telegram_config['notificationChannelId'] = notification_channel_id
-            telegram_config['whitelistMode'] = whitelist_mode
-            
-            # Always update the full config to ensure consistency
-            current_config['telegram'] = telegram_config
-            bot_bp.store.update_config(current_config)
+                telegram_updates['notificationChannelId'] = notification_channel_id
+            bot_bp.store.patch_config_section('telegram', telegram_updates)
             
         except Exception as e:
             # Don't fail the whole request if config update fails
@@ -113,7 +116,7 @@ def update_bot_config():
             pass
         
         # Return updated config
-        return get_bot_config()
+        return _build_bot_config_response()
         
     except Exception as e:
         return jsonify({
@@ -127,12 +130,13 @@ def update_bot_config():
 def get_bot_commands():
     """Get bot command definitions."""
     try:
-        commands = _bot_service.get_commands()
+        fingerprint = bot_bp.secret_store.fingerprint(('telegram_bot_commands',))
+        etag = make_etag(fingerprint) if fingerprint is not None else None
         
-        return jsonify({
+        return conditional_response(etag, lambda: (jsonify({
             'success': True,
-            'data': commands
-        }), 200
+            'data': _bot_service.get_commands()
+        }), 200))
     except Exception as e:
         return jsonify({
             'success': False,
@@ -250,13 +250,15 @@ def list_directories():
     """List directory contents from 115 cloud."""
     try:
         cid = request.args.get('cid', '0')
+        refresh = request.args.get('refresh', 'false').lower() == 'true'
         
-        result = _cloud115_service.list_directory(cid)
+        result = _cloud115_service.list_directory(cid, refresh=refresh)
         
         if result.get('success'):
             return jsonify({
                 'success': True,
-                'data': result.get('data', [])
+                'data': result.get('data', []),
+                'cached': result.get('cached', False)
             }), 200
         else:
             return jsonify(result), 400
@@ -369,6 +371,111 @@ def delete_file():
         }), 500
 
 
+@cloud115_bp.route('/files/batch/rename', methods=['POST'])
+@require_auth
+def rename_files_batch():
+    """Rename many files or folders on 115 cloud."""
+    try:
+        data = request.get_json() or {}
+        
+        items = data.get('items')
+        if not isinstance(items, list) or not items:
+            return jsonify({
+                'success': False,
+                'error': 'items is required'
+            }), 400
+        
+        renames = []
+        for item in items:
+            item = item if isinstance(item, dict) else {}
+            file_id = item.get('fileId') or item.get('file_id')
+            new_name = item.get('newName') or item.get('new_name')
+            if not file_id or not new_name:
+                return jsonify({
+                    'success': False,
+                    'error': 'Each item needs fileId and newName'
+                }), 400
+            renames.append((str(file_id), new_name))
+        
+        result = _cloud115_service.rename_files(renames)
+        
+        if result.get('success'):
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 400
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Failed to rename: {str(e)}'
+        }), 500
+
+
+@cloud115_bp.route('/files/batch/move', methods=['POST'])
+@require_auth
+def move_files_batch():
+    """Move many files or folders to one directory on 115 cloud."""
+    try:
+        data = request.get_json() or {}
+        
+        file_ids = data.get('fileIds') or data.get('file_ids')
+        target_cid = data.get('targetCid') or data.get('target_cid')
+        
+        if not isinstance(file_ids, list) or not file_ids:
+            return jsonify({
+                'success': False,
+                'error': 'fileIds is required'
+            }), 400
+        
+        if not target_cid:
+            return jsonify({
+                'success': False,
+                'error': 'targetCid is required'
+            }), 400
+        
+        result = _cloud115_service.move_files(file_ids, target_cid)
+        
+        if result.get('success'):
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 400
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Failed to move: {str(e)}'
+        }), 500
+
+
+@cloud115_bp.route('/files/batch', methods=['DELETE'])
+@require_auth
+def delete_files_batch():
+    """Delete many files or folders from 115 cloud."""
+    try:
+        data = request.get_json() or {}
+        
+        file_ids = data.get('fileIds') or data.get('file_ids')
+        
+        if not isinstance(file_ids, list) or not file_ids:
+            return jsonify({
+                'success': False,
+                'error': 'fileIds is required'
+            }), 400
+        
+        result = _cloud115_service.delete_files(file_ids)
+        
+        if result.get('success'):
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 400
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Failed to delete: {str(e)}'
+        }), 500
+
+
 @cloud115_bp.route('/files/offline', methods=['POST'])
 @require_auth
 def create_offline_task():
@@ -392,6 +499,20 @@ def create_offline_task():
                 'error': 'saveCid is required'
             }), 400
         
+        # Import offline task service at runtime to avoid circular dependency
+        from main import get_offline_task_service
+        offline_service = get_offline_task_service()
+        
+        # Same content already downloading: attach instead of starting a second 115 download
+        if offline_service:
+            existing = offline_service.find_active_task(source_url, provider='115')
+            if existing:
+                return jsonify({
+                    'success': True,
+                    'data': existing.to_dict(),
+                    'duplicate': True
+                }), 200
+        
         # Create task via cloud115 service first to get p115 task ID
         result = _cloud115_service.create_offline_task(source_url, save_cid)
         
@@ -400,33 +521,18 @@ def create_offline_task():
         
         p115_task_id = result['data'].get('p115TaskId')
         
-        # Import offline task service at runtime to avoid circular dependency
-        from main import get_offline_task_service
-        offline_service = get_offline_task_service()
-        
         if offline_service:
             # Store in local database
             local_result = offline_service.create_task(
                 source_url=source_url,
                 save_cid=save_cid,
                 requested_by=username,
-                requested_chat=''
+                requested_chat='',
+                p115_task_id=p115_task_id
             )
             
             if local_result.get('success'):
-                # Update with p115 task ID
-                task = offline_service.get_task(local_result['data']['id'])
-                if task:
-                    from models.database import get_session_factory
-                    from main import get_app
-                    app = get_app()
-                    session = app.session_factory()
-                    task.p115_task_id = p115_task_id
-                    session.merge(task)
-                    session.commit()
-                    session.close()
-                
-                return jsonify(local_result), 201
+                return jsonify(local_result), 200 if local_result.get('duplicate') else 201
         
         # Fallback: return just the 115 task info
         return jsonify({
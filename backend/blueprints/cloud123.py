@@ -272,6 +272,111 @@ def delete_file():
         }), 500
 
 
+@cloud123_bp.route('/files/batch/rename', methods=['POST'])
+@require_auth
+def rename_files_batch():
+    """Rename many files or folders on 123 cloud."""
+    try:
+        data = request.get_json() or {}
+        
+        items = data.get('items')
+        if not isinstance(items, list) or not items:
+            return jsonify({
+                'success': False,
+                'error': 'items is required'
+            }), 400
+        
+        renames = []
+        for item in items:
+            item = item if isinstance(item, dict) else {}
+            file_id = item.get('fileId') or item.get('file_id')
+            new_name = item.get('newName') or item.get('new_name')
+            if not file_id or not new_name:
+                return jsonify({
+                    'success': False,
+                    'error': 'Each item needs fileId and newName'
+                }), 400
+            renames.append((str(file_id), new_name))
+        
+        result = _cloud123_service.rename_files(renames)
+        
+        if result.get('success'):
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 400
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Failed to rename: {str(e)}'
+        }), 500
+
+
+@cloud123_bp.route('/files/batch/move', methods=['POST'])
+@require_auth
+def move_files_batch():
+    """Move many files or folders to one directory on 123 cloud."""
+    try:
+        data = request.get_json() or {}
+        
+        file_ids = data.get('fileIds') or data.get('file_ids')
+        target_dir_id = data.get('targetDirId') or data.get('target_dir_id')
+        
+        if not isinstance(file_ids, list) or not file_ids:
+            return jsonify({
+                'success': False,
+                'error': 'fileIds is required'
+            }), 400
+        
+        if not target_dir_id:
+            return jsonify({
+                'success': False,
+                'error': 'targetDirId is required'
+            }), 400
+        
+        result = _cloud123_service.move_files(file_ids, target_dir_id)
+        
+        if result.get('success'):
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 400
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Failed to move: {str(e)}'
+        }), 500
+
+
+@cloud123_bp.route('/files/batch', methods=['DELETE'])
+@require_auth
+def delete_files_batch():
+    """Delete many files or folders from 123 cloud."""
+    try:
+        data = request.get_json() or {}
+        
+        file_ids = data.get('fileIds') or data.get('file_ids')
+        
+        if not isinstance(file_ids, list) or not file_ids:
+            return jsonify({
+                'success': False,
+                'error': 'fileIds is required'
+            }), 400
+        
+        result = _cloud123_service.delete_files(file_ids)
+        
+        if result.get('success'):
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 400
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Failed to delete: {str(e)}'
+        }), 500
+
+
 @cloud123_bp.route('/offline/tasks', methods=['POST'])
 @require_auth
 def create_offline_task():
@@ -295,6 +400,19 @@ def create_offline_task():
                 'error': 'saveDirId is required'
             }), 400
         
+        from main import get_offline_task_service
+        offline_service = get_offline_task_service()
+        
+        # Same content already downloading on 123: attach instead of starting a second download
+        if offline_service:
+            existing = offline_service.find_active_task(source_url, provider='123')
+            if existing:
+                return jsonify({
+                    'success': True,
+                    'data': existing.to_dict(),
+                    'duplicate': True
+                }), 200
+        
         # Create task via cloud123 service
         result = _cloud123_service.create_offline_task(source_url, save_dir_id)
         
@@ -303,8 +421,18 @@ def create_offline_task():
         
         p123_task_id = result['data'].get('p123TaskId')
         
-        # Note: Unlike 115, we don't create local database records for 123 tasks
-        # They're managed directly through the 123 API
+        # Track the task locally so the poller syncs its status
+        if offline_service and p123_task_id:
+            local_result = offline_service.create_task(
+                source_url=source_url,
+                save_cid=save_dir_id,
+                requested_by=username,
+                requested_chat='',
+                provider='123',
+                p123_task_id=p123_task_id
+            )
+            if local_result.get('success'):
+                return jsonify(local_result), 201
         
         return jsonify({
             'success': True,
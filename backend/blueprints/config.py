@@ -1,7 +1,8 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response
 from middleware.auth import optional_auth
 from persistence.store import DataStore
 from services.secret_store import SecretStore
+from utils.http_cache import make_etag, conditional_response
 import json
 
 config_bp = Blueprint('config', __name__, url_prefix='/api')
@@ -14,6 +15,20 @@ def init_config_blueprint(store: DataStore, secret_store: SecretStore = None):
     return config_bp
 
 
+# Secrets whose presence is reflected in the config response (session flags)
+SESSION_SECRET_KEYS = ('cloud115_cookies', 'cloud123_token', 'cloud123_cookies')
+
+
+def _config_etag():
+    """ETag for GET /api/config; None disables conditional handling."""
+    fingerprint = ''
+    if config_bp.secret_store:
+        fingerprint = config_bp.secret_store.fingerprint(SESSION_SECRET_KEYS)
+        if fingerprint is None:
+            return None
+    return make_etag(config_bp.store.get_config_version(), fingerprint)
+
+
 def _add_session_flags(config: dict, secret_store: SecretStore) -> dict:
     """Add session health flags to config."""
     if not secret_store:
@@ -21,14 +36,13 @@ def _add_session_flags(config: dict, secret_store: SecretStore) -> dict:
         config['cloud123']['hasValidSession'] = False
         return config
     
+    secrets = secret_store.get_secrets(SESSION_SECRET_KEYS)
+    
     # Check if we have valid 115 cookies
-    cookies_json = secret_store.get_secret('cloud115_cookies')
-    config['cloud115']['hasValidSession'] = bool(cookies_json)
+    config['cloud115']['hasValidSession'] = bool(secrets.get('cloud115_cookies'))
     
     # Check if we have valid 123 token or cookies
-    token_json = secret_store.get_secret('cloud123_token')
-    cookies_123_json = secret_store.get_secret('cloud123_cookies')
-    config['cloud123']['hasValidSession'] = bool(token_json or cookies_123_json)
+    config['cloud123']['hasValidSession'] = bool(secrets.get('cloud123_token') or secrets.get('cloud123_cookies'))
     
     return config
 
@@ -84,21 +98,7 @@ def _sync_cloud115_cookies_from_config(payload: dict, secret_store: SecretStore
 def get_config():
     """Get full application configuration without masking."""
     try:
-        config = config_bp.store.get_config()
-
-        # Bootstrap SecretStore from persisted config for frontend compatibility
-        if config_bp.secret_store and not config_bp.secret_store.get_secret('cloud115_cookies'):
-            cloud115 = config.get('cloud115') if isinstance(config, dict) else None
-            if isinstance(cloud115, dict) and isinstance(cloud115.get('cookies'), str) and cloud115.get('cookies').strip():
-                _sync_cloud115_cookies_from_config(config, config_bp.secret_store)
-        
-        # Add session health flags
-        config = _add_session_flags(config, config_bp.secret_store)
-        
-        return jsonify({
-            'success': True,
-            'data': config
-        }), 200
+        return conditional_response(_config_etag(), _build_config_response)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -106,6 +106,25 @@ def get_config():
         }), 500
 
 
+def _build_config_response():
+    """Build the GET /api/config payload (bootstraps 115 cookies, adds session flags)."""
+    config = config_bp.store.get_config()
+
+    # Bootstrap SecretStore from persisted config for frontend compatibility
+    if config_bp.secret_store and not config_bp.secret_store.get_secret('cloud115_cookies'):
+        cloud115 = config.get('cloud115') if isinstance(config, dict) else None
+        if isinstance(cloud115, dict) and isinstance(cloud115.get('cookies'), str) and cloud115.get('cookies').strip():
+            _sync_cloud115_cookies_from_config(config, config_bp.secret_store)
+    
+    # Add session health flags
+    config = _add_session_flags(config, config_bp.secret_store)
+    
+    return jsonify({
+        'success': True,
+        'data': config
+    }), 200
+
+
 @config_bp.route('/config', methods=['PUT', 'POST'])
 @optional_auth
 def update_config():
@@ -140,6 +159,140 @@ def update_config():
         }), 500
 
 
+@config_bp.route('/config/<section>', methods=['PATCH'])
+@optional_auth
+def patch_config_section(section):
+    """Update a single config section; other sections are left untouched."""
+    data = request.get_json(silent=True)
+    
+    if not isinstance(data, dict) or not data:
+        return jsonify({
+            'success': False,
+            'error': 'Section data must be a non-empty object'
+        }), 400
+    
+    try:
+        updated_section = config_bp.store.patch_config_section(section, data)
+    except KeyError:
+        return jsonify({
+            'success': False,
+            'error': f'Unknown config section: {section}'
+        }), 404
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Failed to update config section: {str(e)}'
+        }), 500
+    
+    if section == 'cloud115':
+        _sync_cloud115_cookies_from_config({'cloud115': data}, config_bp.secret_store)
+    
+    return jsonify({
+        'success': True,
+        'data': {section: updated_section}
+    }), 200
+
+
+@config_bp.route('/config/export', methods=['GET'])
+@optional_auth
+def export_config():
+    """Export the effective configuration as YAML."""
+    try:
+        return Response(
+            config_bp.store.config_store.export_yaml(),
+            mimetype='application/x-yaml',
+            headers={'Content-Disposition': 'attachment; filename=config.yml'}
+        )
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Failed to export config: {str(e)}'
+        }), 500
+
+
+@config_bp.route('/config/import', methods=['POST'])
+@optional_auth
+def import_config():
+    """Replace the configuration with an uploaded YAML document."""
+    text = request.get_data(as_text=True)
+    
+    if not text.strip():
+        return jsonify({
+            'success': False,
+            'error': 'YAML document is required'
+        }), 400
+    
+    try:
+        config_bp.store.config_store.import_yaml(text)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': f'Invalid YAML: {str(e)}'
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Failed to import config: {str(e)}'
+        }), 500
+    
+    updated_config = _add_session_flags(config_bp.store.get_config(), config_bp.secret_store)
+    return jsonify({
+        'success': True,
+        'data': updated_config
+    }), 200
+
+
+@config_bp.route('/secrets/rotate', methods=['POST'])
+@optional_auth
+def rotate_secrets():
+    """Re-encrypt stored secrets with the current primary encryption key."""
+    if not config_bp.secret_store:
+        return jsonify({
+            'success': False,
+            'error': 'Secret store not initialized'
+        }), 500
+    
+    data = request.get_json(silent=True) or {}
+    try:
+        batch_size = int(data.get('batchSize', 100))
+    except (TypeError, ValueError):
+        batch_size = 0
+    if batch_size <= 0:
+        return jsonify({
+            'success': False,
+            'error': 'batchSize must be a positive integer'
+        }), 400
+    
+    try:
+        status = config_bp.secret_store.start_rotation(batch_size=batch_size)
+    except RuntimeError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'data': config_bp.secret_store.get_rotation_status()
+        }), 409
+    return jsonify({
+        'success': True,
+        'data': status
+    }), 202
+
+
+@config_bp.route('/secrets/rotate', methods=['GET'])
+@optional_auth
+def get_rotation_status():
+    """Get progress of the current or last secret key rotation."""
+    if not config_bp.secret_store:
+        return jsonify({
+            'success': False,
+            'error': 'Secret store not initialized'
+        }), 500
+    
+    return jsonify({
+        'success': True,
+        'data': config_bp.secret_store.get_rotation_status()
+    }), 200
+
+
 @config_bp.route('/me', methods=['GET'])
 @optional_auth
 def get_me():
@@ -1,4 +1,6 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, current_app
+from middleware.auth import require_auth
+from services.rate_limiter import get_rate_limit_metrics
 import os
 
 health_bp = Blueprint('health', __name__, url_prefix='/api')
@@ -15,3 +17,17 @@ def health_check():
             'version': '1.0.0'
         }
     }), 200
+
+
+@health_bp.route('/metrics', methods=['GET'])
+@require_auth
+def metrics():
+    """Runtime metrics of this worker (outbound rate limiter waits, offline task poller)."""
+    task_poller = getattr(current_app, 'task_poller', None)
+    return jsonify({
+        'success': True,
+        'data': {
+            'rateLimits': get_rate_limit_metrics(),
+            'poller': task_poller.get_metrics() if task_poller else None
+        }
+    }), 200
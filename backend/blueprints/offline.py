@@ -51,7 +51,8 @@ def create_task():
         )
         
         if result.get('success'):
-            return jsonify(result), 201
+            # 200: attached to the active task for the same content
+            return jsonify(result), 200 if result.get('duplicate') else 201
         else:
             return jsonify(result), 400
     
@@ -62,6 +63,57 @@ def create_task():
         }), 500
 
 
+@offline_bp.route('/tasks/batch', methods=['POST'])
+@require_auth
+def create_tasks_batch():
+    """Create many offline tasks in one request."""
+    try:
+        data = request.get_json() or {}
+        username = get_jwt_identity()
+        
+        source_urls = data.get('sourceUrls') or data.get('source_urls')
+        save_cid = data.get('saveCid') or data.get('save_cid')
+        requested_by = data.get('requestedBy') or data.get('requested_by') or username
+        requested_chat = data.get('requestedChat') or data.get('requested_chat') or ''
+        
+        # Accept a pasted block of links as well as a list
+        if isinstance(source_urls, str):
+            source_urls = source_urls.splitlines()
+        
+        if not isinstance(source_urls, list) or not source_urls:
+            return jsonify({
+                'success': False,
+                'error': 'sourceUrls is required'
+            }), 400
+        
+        if not save_cid:
+            return jsonify({
+                'success': False,
+                'error': 'saveCid is required'
+            }), 400
+        
+        result = _offline_task_service.create_tasks(
+            source_urls=source_urls,
+            save_cid=save_cid,
+            requested_by=requested_by,
+            requested_chat=requested_chat
+        )
+        
+        if result.get('success') and result.get('created'):
+            return jsonify(result), 201
+        elif result.get('success') and not result.get('failed'):
+            # Every link attached to an already active task
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 400
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Failed to create tasks: {str(e)}'
+        }), 500
+
+
 @offline_bp.route('/tasks', methods=['GET'])
 @require_auth
 def list_tasks():
@@ -72,6 +124,9 @@ def list_tasks():
         requested_by = request.args.get('requestedBy')
         limit = int(request.args.get('limit', '50'))
         offset = int(request.args.get('offset', '0'))
+        cursor = request.args.get('cursor') or None
+        total_arg = request.args.get('total')
+        include_total = None if total_arg is None else total_arg.lower() == 'true'
         refresh = request.args.get('refresh', 'false').lower() == 'true'
         
         # Refresh from 115 if requested
@@ -88,7 +143,9 @@ def list_tasks():
             status=status,
             requested_by=requested_by,
             limit=limit,
-            offset=offset
+            offset=offset,
+            cursor=cursor,
+            include_total=include_total
         )
         
         if result.get('success'):
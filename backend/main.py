@@ -1,4 +1,5 @@
 import os
+import atexit
 from datetime import timedelta
 from flask import Flask, jsonify
 from flask_cors import CORS
@@ -27,6 +28,11 @@ from services.cloud123_service import Cloud123Service
 from services.telegram_bot import TelegramBotService
 from services.offline_tasks import OfflineTaskService
 from services.task_poller import create_task_poller
+from services.task_archiver import create_task_archiver
+from services.leader_election import create_leader_elector
+from services.event_bus import EventBus, create_outbox_dispatcher
+from services.rate_limiter import configure_rate_limiters
+from services.dir_cache import configure_dir_cache
 from utils.logger import get_app_logger, get_api_logger
 
 
@@ -50,7 +56,7 @@ def create_app(config=None):
     CORS(app, resources={
         r"/api/*": {
             "origins": cors_origins,
-            "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+            "methods": ["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
             "allow_headers": ["Content-Type", "Authorization"],
             "expose_headers": ["Content-Type", "Authorization"],
             "supports_credentials": True
@@ -108,10 +114,6 @@ def create_app(config=None):
             'error': 'Missing authorization token'
         }), 401
     
-    # Initialize data store
-    data_path = os.environ.get('DATA_PATH', '/data/appdata.json')
-    store = DataStore(data_path)
-    
     # Initialize logger
     logger = get_app_logger()
     logger.info('Starting application initialization...')
@@ -122,6 +124,10 @@ def create_app(config=None):
     appdata_session_factory = get_session_factory(appdata_engine)
     secret_store = SecretStore(secrets_session_factory)
     
+    # Initialize data store (config sections saved individually go to appdata.db)
+    data_path = os.environ.get('DATA_PATH', '/data/appdata.json')
+    store = DataStore(data_path, session_factory=appdata_session_factory)
+    
     logger.info('Database initialized: secrets.db (encrypted), appdata.db (general data)')
     
     # Store in app context
@@ -134,6 +140,12 @@ def create_app(config=None):
     app.db_engine = secrets_engine
     app.session_factory = secrets_session_factory
     
+    # Outbound 115/123 calls share a cross-worker token bucket (cloudXXX.qps);
+    # 115 directory listings are cached in appdata.db (warm across restarts)
+    if not app.config.get('TESTING'):
+        configure_rate_limiters(appdata_session_factory, store)
+        configure_dir_cache(appdata_session_factory)
+    
     # Initialize services
     cloud115_service = Cloud115Service(secret_store)
     cloud123_service = Cloud123Service(secret_store)
@@ -144,19 +156,50 @@ def create_app(config=None):
     app.sensitive_data_service = sensitive_data_service
     
     # Initialize offline task service and poller
-    offline_task_service = OfflineTaskService(secrets_session_factory, store, None, cloud115_service)
+    offline_task_service = OfflineTaskService(secrets_session_factory, store, None, cloud115_service, cloud123_service)
     task_poller = create_task_poller(offline_task_service)
+    task_archiver = create_task_archiver(secrets_session_factory, appdata_session_factory)
+    
+    # Task state transitions reach the workflow through the outbox (secrets.db)
+    event_bus = EventBus()
+    outbox_dispatcher = create_outbox_dispatcher(secrets_session_factory, event_bus)
+    offline_task_service.on_events_enqueued = outbox_dispatcher.notify
+    # New tasks get their first status check right away instead of after the poll interval;
+    # in the other workers the leader's poller finds them on its next due check
+    offline_task_service.on_task_created = task_poller.wake
     
     app.cloud115_service = cloud115_service
     app.cloud123_service = cloud123_service
     app.offline_task_service = offline_task_service
     app.task_poller = task_poller
+    app.task_archiver = task_archiver
+    app.event_bus = event_bus
+    app.outbox_dispatcher = outbox_dispatcher
+    
+    # Background singletons run only in the worker holding the leader lease
+    def start_background_jobs():
+        task_poller.start()
+        task_archiver.start()
+        outbox_dispatcher.start()
+    
+    def stop_background_jobs():
+        task_poller.stop()
+        task_archiver.stop()
+        outbox_dispatcher.stop()
+    
+    leader_elector = create_leader_elector(
+        appdata_session_factory,
+        on_elected=start_background_jobs,
+        on_demoted=stop_background_jobs
+    )
+    app.leader_elector = leader_elector
     
     logger.info('Services initialized successfully')
     
-    # Start task poller
+    # Start leader election (the elected worker starts the task poller)
     if not app.config.get('TESTING'):
-        task_poller.start()
+        leader_elector.start()
+        atexit.register(leader_elector.stop)
     
     # Initialize blueprints
     init_auth_blueprint(store)
@@ -198,6 +241,7 @@ def create_app(config=None):
         config_store=store
     )
     
+    workflow_service.subscribe_events(event_bus)
     app.workflow_service = workflow_service
     set_workflow_service(workflow_service)
     
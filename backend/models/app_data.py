@@ -2,7 +2,7 @@
 # 普通应用数据模型 (非敏感数据)
 
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, Integer, Text, Boolean
+from sqlalchemy import Column, String, DateTime, Integer, Float, Text, Boolean, Index, LargeBinary
 from sqlalchemy.sql import func
 from .database import AppDataBase
 
@@ -14,6 +14,7 @@ class AppConfig(AppDataBase):
     key = Column(String(255), primary_key=True, nullable=False)
     value = Column(Text, nullable=True)
     category = Column(String(100), default='general')  # telegram, cloud, emby, etc.
+    version = Column(Integer, nullable=True)  # config.__version__ when a section row was saved
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     
@@ -45,6 +46,68 @@ class TaskHistory(AppDataBase):
     details = Column(Text)  # JSON details
     created_at = Column(DateTime, default=func.now())
     completed_at = Column(DateTime, nullable=True)
+    source_id = Column(String(36), nullable=True)  # 原任务 ID (归档的 offline task id)
+    
+    __table_args__ = (
+        Index('idx_task_history_source_id', 'source_id', unique=True),
+        Index('idx_task_history_completed_at', 'completed_at'),
+        Index('idx_task_history_type_created_at', 'task_type', 'created_at'),
+    )
     
     def __repr__(self):
         return f'<TaskHistory(id={self.id}, task_type={self.task_type}, status={self.status})>'
+
+
+class Lease(AppDataBase):
+    """Model for time-limited leases (leader election between gunicorn workers)."""
+    __tablename__ = 'leases'
+    
+    name = Column(String(100), primary_key=True, nullable=False)
+    holder = Column(String(255), nullable=True)  # hostname:pid:nonce of the current owner
+    expires_at = Column(Float, nullable=False, default=0)  # Unix time; free once passed
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    
+    def __repr__(self):
+        return f'<Lease(name={self.name}, holder={self.holder})>'
+
+
+class RateBucket(AppDataBase):
+    """Model for token buckets shared by all workers (outbound API rate limits)."""
+    __tablename__ = 'rate_buckets'
+    
+    name = Column(String(100), primary_key=True, nullable=False)  # cloud115, cloud123
+    tokens = Column(Float, nullable=False, default=0)  # May go negative: reserved future tokens
+    updated_at = Column(Float, nullable=False, default=0)  # Unix time of the last refill
+    
+    def __repr__(self):
+        return f'<RateBucket(name={self.name}, tokens={self.tokens})>'
+
+
+class DirCacheEntry(AppDataBase):
+    """Model for cached directory listings (cid -> children) of a cloud drive."""
+    __tablename__ = 'dir_cache'
+    
+    provider = Column(String(10), primary_key=True, nullable=False)  # 115
+    cid = Column(String(64), primary_key=True, nullable=False)
+    children = Column(LargeBinary, nullable=False)  # zlib-compressed JSON list of entries
+    fetched_at = Column(Float, nullable=False)  # Unix time of the live listing
+    account = Column(String(64), nullable=True)  # Fingerprint of the login the listing was fetched with
+    
+    def __repr__(self):
+        return f'<DirCacheEntry(provider={self.provider}, cid={self.cid})>'
+
+
+class DirCacheItem(AppDataBase):
+    """Model mapping each cached entry to its parent directory (for invalidation)."""
+    __tablename__ = 'dir_cache_items'
+    
+    provider = Column(String(10), primary_key=True, nullable=False)
+    item_id = Column(String(64), primary_key=True, nullable=False)
+    parent_cid = Column(String(64), nullable=False)
+    
+    __table_args__ = (
+        Index('idx_dir_cache_items_parent', 'provider', 'parent_cid'),
+    )
+    
+    def __repr__(self):
+        return f'<DirCacheItem(provider={self.provider}, item_id={self.item_id}, parent_cid={self.parent_cid})>'
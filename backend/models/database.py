@@ -1,7 +1,10 @@
 import os
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import declarative_base, sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import QueuePool, StaticPool
 
 # 创建两个独立的 Base，分别对应两个数据库
 SecretsBase = declarative_base()  # 敏感数据 (secrets.db)
@@ -49,15 +52,120 @@ def get_database_url():
     return get_secrets_db_url()
 
 
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _is_memory_sqlite(url):
+    """True for sqlite:// and sqlite:///:memory: style URLs."""
+    return url.database in (None, '', ':memory:') or 'mode=memory' in str(url)
+
+
+def _apply_sqlite_pragmas(dbapi_connection, memory=False):
+    """
+    Apply per-connection SQLite settings.
+    
+    WAL lets readers proceed while the poller writes; busy_timeout makes
+    writers from other threads/gunicorn workers wait instead of failing
+    with "database is locked".
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        if not memory:
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute(f"PRAGMA mmap_size={_env_int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)}")
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute(f"PRAGMA busy_timeout={_env_int('SQLITE_BUSY_TIMEOUT_MS', 5000)}")
+        # Negative value = size in KiB
+        cursor.execute(f"PRAGMA cache_size={_env_int('SQLITE_CACHE_SIZE', -20000)}")
+    finally:
+        cursor.close()
+
+
 def _create_engine(database_url):
     """Create SQLAlchemy engine with appropriate settings."""
-    if 'sqlite' in database_url:
-        return create_engine(
+    url = make_url(database_url)
+    if url.get_backend_name() != 'sqlite':
+        return create_engine(database_url)
+    
+    memory = _is_memory_sqlite(url)
+    if memory:
+        # An in-memory database only exists on its connection, so it must be shared
+        engine = create_engine(
             database_url,
             connect_args={'check_same_thread': False},
             poolclass=StaticPool
         )
-    return create_engine(database_url)
+    else:
+        # One connection per checkout: request, poller and workflow threads each
+        # get their own connection instead of serialising on a shared one
+        engine = create_engine(
+            database_url,
+            connect_args={
+                'check_same_thread': False,
+                'timeout': _env_int('SQLITE_BUSY_TIMEOUT_MS', 5000) / 1000
+            },
+            poolclass=QueuePool,
+            pool_size=_env_int('SQLITE_POOL_SIZE', 5),
+            max_overflow=_env_int('SQLITE_POOL_MAX_OVERFLOW', 10)
+        )
+    
+    @event.listens_for(engine, 'connect')
+    def _on_connect(dbapi_connection, connection_record):
+        _apply_sqlite_pragmas(dbapi_connection, memory=memory)
+    
+    return engine
+
+
+# Statements run on every start after new columns are added (must be idempotent)
+_DATA_UPGRADES = {
+    # Rows from before offline_tasks.provider existed are 115 tasks; the
+    # dedup index is per provider, so they need the value to take part
+    'offline_tasks': ["UPDATE offline_tasks SET provider = '115' WHERE provider IS NULL"],
+}
+
+# Indexes replaced by a differently named one
+_OBSOLETE_INDEXES = {
+    # Leading columns of the (filter, created_at, id) keyset indexes
+    'offline_tasks': ['idx_status', 'idx_requested_by', 'idx_created_at'],
+}
+
+
+def _upgrade_schema(metadata, engine):
+    """
+    create_all() skips tables that already exist, so nullable columns and
+    indexes added to a model later would never reach existing databases;
+    add them here.
+    """
+    inspector = inspect(engine)
+    for table in metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=engine.dialect)
+            try:
+                with engine.begin() as conn:
+                    conn.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}')
+            except OperationalError:
+                # Another worker added it first
+                pass
+        with engine.begin() as conn:
+            for statement in _DATA_UPGRADES.get(table.name, ()):
+                conn.exec_driver_sql(statement)
+            for name in _OBSOLETE_INDEXES.get(table.name, ()):
+                conn.exec_driver_sql(f'DROP INDEX IF EXISTS {name}')
+        for index in table.indexes:
+            try:
+                index.create(engine, checkfirst=True)
+            except OperationalError:
+                # Another worker created it between the check and the CREATE
+                pass
 
 
 def init_secrets_db():
@@ -66,6 +174,7 @@ def init_secrets_db():
     engine = _create_engine(database_url)
     # Use checkfirst=True to avoid race conditions when multiple workers initialize
     SecretsBase.metadata.create_all(engine, checkfirst=True)
+    _upgrade_schema(SecretsBase.metadata, engine)
     return engine
 
 
@@ -75,6 +184,7 @@ def init_appdata_db():
     engine = _create_engine(database_url)
     # Use checkfirst=True to avoid race conditions when multiple workers initialize
     AppDataBase.metadata.create_all(engine, checkfirst=True)
+    _upgrade_schema(AppDataBase.metadata, engine)
     return engine
 
 
@@ -91,6 +201,32 @@ def init_all_databases():
 
 
 def get_session_factory(engine):
-    """Get SQLAlchemy session factory."""
-    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    """
+    Get SQLAlchemy session factory.
+    
+    expire_on_commit=False keeps loaded attributes after commit, so results
+    can be serialized once the session is gone without re-querying.
+    """
+    return sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+
+@contextmanager
+def session_scope(session_factory):
+    """
+    Unit of work around a session: commit on success, rollback on error,
+    and always close so the connection goes back to the pool.
+    
+    Usage:
+        with session_scope(self.session_factory) as session:
+            session.add(obj)
+    """
+    session = session_factory()
+    try:
+        yield session
+        session.commit()
+    except BaseException:
+        session.rollback()
+        raise
+    finally:
+        session.close()
 
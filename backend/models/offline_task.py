@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Float, DateTime, Enum, func, Index
+from sqlalchemy import Column, String, Integer, Float, DateTime, Enum, Index, text
 from datetime import datetime
 from enum import Enum as PyEnum
 from models.database import Base
@@ -19,30 +19,54 @@ class OfflineTask(Base):
     
     id = Column(String(36), primary_key=True, unique=True, nullable=False)  # UUID
     p115_task_id = Column(String(255), nullable=True, unique=True)  # 115 API task ID
+    # Cloud the task runs on: '115' or '123' (NULL on rows created before 123 support = '115')
+    provider = Column(String(10), default='115', nullable=True)
+    p123_task_id = Column(String(255), nullable=True)  # 123 open API taskID
     source_url = Column(String, nullable=False)  # URL or magnet link
+    content_key = Column(String(100), nullable=True)  # btih:/btmh:/ed2k: hash of source_url (utils.content_key)
     save_cid = Column(String(255), nullable=False)  # Target folder CID in 115
     status = Column(Enum(TaskStatus), default=TaskStatus.PENDING, nullable=False)
     progress = Column(Integer, default=0)  # 0-100 percentage
     speed = Column(Float, nullable=True)  # Current download speed (bytes/sec)
     requested_by = Column(String(255), nullable=False)  # Telegram user ID
     requested_chat = Column(String(255), nullable=False)  # Telegram chat ID
-    created_at = Column(DateTime, default=func.now(), nullable=False)
-    updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), nullable=False)
+    # Python-side timestamps keep microseconds, so (created_at, id) gives a stable keyset order
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now, nullable=False)
+    next_poll_at = Column(DateTime, nullable=True)  # Poller: when the task is due again (NULL = now)
+    poll_interval = Column(Integer, nullable=True)  # Poller: last delay in seconds, drives backoff
     
     __table_args__ = (
-        Index('idx_status', 'status'),
-        Index('idx_requested_by', 'requested_by'),
-        Index('idx_created_at', 'created_at'),
+        # Keyset pagination: newest first, optionally per status / per user
+        Index('idx_created_at_id', 'created_at', 'id'),
+        Index('idx_status_created_at_id', 'status', 'created_at', 'id'),
+        Index('idx_requested_by_created_at_id', 'requested_by', 'created_at', 'id'),
+        # Poller: status IN (...) AND (p115_task_id IS NOT NULL OR p123_task_id IS NOT NULL)
+        Index('idx_status_p115_task_id', 'status', 'p115_task_id'),
+        Index('idx_status_p123_task_id', 'status', 'p123_task_id'),
+        Index('idx_status_next_poll_at', 'status', 'next_poll_at'),
+        # Archiver: terminal tasks last touched before a cutoff
+        Index('idx_status_updated_at', 'status', 'updated_at'),
         Index('idx_p115_task_id', 'p115_task_id'),
         Index('idx_save_cid', 'save_cid'),
+        # Dedup: at most one active (pending/downloading) task per provider and content
+        Index('idx_active_provider_content_key', 'provider', 'content_key', unique=True,
+              sqlite_where=text("status IN ('PENDING', 'DOWNLOADING')"),
+              postgresql_where=text("status IN ('PENDING', 'DOWNLOADING')")),
     )
+    # Fetch any SQL-side defaults in the INSERT/UPDATE itself,
+    # so tasks stay serializable after the session is closed
+    __mapper_args__ = {'eager_defaults': True}
     
     def to_dict(self) -> dict:
         """Convert task to dictionary."""
         return {
             'id': self.id,
+            'provider': self.provider or '115',
             'p115TaskId': self.p115_task_id,
+            'p123TaskId': self.p123_task_id,
             'sourceUrl': self.source_url,
+            'contentKey': self.content_key,
             'saveCid': self.save_cid,
             'status': self.status.value if self.status else 'pending',
             'progress': self.progress,
@@ -51,6 +75,7 @@ class OfflineTask(Base):
             'requestedChat': self.requested_chat,
             'createdAt': self.created_at.isoformat() if self.created_at else None,
             'updatedAt': self.updated_at.isoformat() if self.updated_at else None,
+            'nextPollAt': self.next_poll_at.isoformat() if self.next_poll_at else None,
         }
     
     def __repr__(self):
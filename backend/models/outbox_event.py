@@ -0,0 +1,34 @@
+# models/outbox_event.py
+# 事务性发件箱 - 与状态变更同一事务写入的事件
+
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, Integer, Text, Index
+from models.database import Base
+
+
+class OutboxEvent(Base):
+    """
+    Event written in the same transaction as the state change it describes.
+    
+    Lives in secrets.db next to offline_tasks so the two commit atomically;
+    OutboxDispatcher delivers unprocessed rows to the in-process event bus.
+    """
+    __tablename__ = 'outbox_events'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)  # Delivery order
+    topic = Column(String(100), nullable=False)  # e.g. offline_task.completed
+    aggregate_id = Column(String(255), nullable=True)  # ID of the entity the event is about
+    payload = Column(Text, nullable=False)  # JSON
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
+    available_at = Column(DateTime, default=datetime.now, nullable=False)  # Retry backoff
+    processed_at = Column(DateTime, nullable=True)  # NULL = not delivered yet
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(Text, nullable=True)
+    
+    __table_args__ = (
+        # Dispatcher: processed_at IS NULL ORDER BY id; purge: processed_at < cutoff
+        Index('idx_outbox_processed_at_id', 'processed_at', 'id'),
+    )
+    
+    def __repr__(self):
+        return f'<OutboxEvent(id={self.id}, topic={self.topic}, processed_at={self.processed_at})>'
@@ -22,6 +22,8 @@ class RecognitionKeyword(Base):
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     
+    __mapper_args__ = {'eager_defaults': True}
+    
     def __repr__(self):
         return f'<RecognitionKeyword(keyword={self.keyword}, normalized={self.normalized}, count={self.match_count})>'
     
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, func, Index
+from sqlalchemy import Column, String, Integer, Text, DateTime, func, Index
 from datetime import datetime
 from models.database import Base
 
@@ -18,3 +18,16 @@ class Secret(Base):
     
     def __repr__(self):
         return f'<Secret(key={self.key}, updated_at={self.updated_at})>'
+
+
+class SecretMeta(Base):
+    """Bookkeeping counters for the secrets table (e.g. change version for cache invalidation)."""
+    __tablename__ = 'secrets_meta'
+    
+    key = Column(String(100), primary_key=True, nullable=False)
+    value = Column(Integer, nullable=False, default=0)
+    data = Column(Text, nullable=True)  # JSON details, e.g. key rotation progress
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    
+    def __repr__(self):
+        return f'<SecretMeta(key={self.key}, value={self.value})>'
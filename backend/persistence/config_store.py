@@ -1,24 +1,179 @@
 import os
+import copy
 import json
+import tempfile
 import yaml
-from typing import Dict, Any
-from threading import Lock
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Any, Callable, List, Optional, Tuple
+from threading import Lock, RLock
+from models.database import session_scope
+
+
+def _str(section: Dict[str, Any], key: str, default: str = '') -> str:
+    value = section.get(key, default)
+    return str(value).strip() if value is not None else default
+
+
+def _float(section: Dict[str, Any], key: str, default: float) -> float:
+    try:
+        return float(section.get(key, default))
+    except (TypeError, ValueError):
+        return default
+
+
+@dataclass(frozen=True, slots=True)
+class TelegramSettings:
+    bot_token: str
+    admin_user_id: str
+    whitelist_mode: bool
+    notification_channel_id: str
+
+    @classmethod
+    def from_dict(cls, section: Dict[str, Any]) -> 'TelegramSettings':
+        return cls(
+            bot_token=_str(section, 'botToken'),
+            admin_user_id=_str(section, 'adminUserId'),
+            whitelist_mode=bool(section.get('whitelistMode', True)),
+            notification_channel_id=_str(section, 'notificationChannelId'),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class CloudSettings:
+    enabled: bool
+    download_path: str
+    download_dir_name: str
+    qps: float
+
+    @classmethod
+    def from_dict(cls, section: Dict[str, Any], default_qps: float = 1.0) -> 'CloudSettings':
+        return cls(
+            enabled=bool(section.get('enabled', True)),
+            download_path=_str(section, 'downloadPath', '0') or '0',
+            download_dir_name=_str(section, 'downloadDirName'),
+            qps=_float(section, 'qps', default_qps),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class TmdbSettings:
+    api_key: str
+    language: str
+    include_adult: bool
+
+    @classmethod
+    def from_dict(cls, section: Dict[str, Any]) -> 'TmdbSettings':
+        return cls(
+            api_key=_str(section, 'apiKey'),
+            language=_str(section, 'language', 'zh-CN') or 'zh-CN',
+            include_adult=bool(section.get('includeAdult', False)),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class EmbySettings:
+    enabled: bool
+    server_url: str  # stripped, without trailing slash
+    api_key: str
+    refresh_after_organize: bool
+
+    @classmethod
+    def from_dict(cls, section: Dict[str, Any]) -> 'EmbySettings':
+        return cls(
+            enabled=bool(section.get('enabled', False)),
+            server_url=_str(section, 'serverUrl').rstrip('/'),
+            api_key=_str(section, 'apiKey'),
+            refresh_after_organize=bool(section.get('refreshAfterOrganize', True)),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledConfig:
+    """Immutable, pre-normalized view of the merged config for hot paths."""
+    telegram: TelegramSettings
+    cloud115: CloudSettings
+    cloud123: CloudSettings
+    tmdb: TmdbSettings
+    emby: EmbySettings
+
+    @classmethod
+    def from_dict(cls, config: Dict[str, Any]) -> 'CompiledConfig':
+        def section(name: str) -> Dict[str, Any]:
+            value = config.get(name)
+            return value if isinstance(value, dict) else {}
+
+        return cls(
+            telegram=TelegramSettings.from_dict(section('telegram')),
+            cloud115=CloudSettings.from_dict(section('cloud115'), default_qps=0.8),
+            cloud123=CloudSettings.from_dict(section('cloud123'), default_qps=1.0),
+            tmdb=TmdbSettings.from_dict(section('tmdb')),
+            emby=EmbySettings.from_dict(section('emby')),
+        )
+
+
+ConfigListener = Callable[[CompiledConfig], None]
+
+
+def atomic_write(path: str, write: Callable[[Any], None]):
+    """Write a file via temp file + os.replace so readers never see partial data."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def file_signature(path: str) -> Optional[Tuple[int, int, int]]:
+    """Return (inode, mtime_ns, size) of a file, or None if missing."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+CONFIG_CATEGORY = 'config'
+CONFIG_VERSION_KEY = 'config.__version__'
+# Value of CONFIG_VERSION_KEY when the YAML file was last written through the store
+CONFIG_YAML_VERSION_KEY = 'config.__yaml_version__'
 
 
 class ConfigStore:
-    """YAML-based persistence layer for app configuration."""
+    """
+    Persistence layer for app configuration.
+    
+    The YAML file is the import/export format. When an appdata session
+    factory is supplied, single sections can also be saved as rows of the
+    `app_config` table (see `patch_section`). Every write bumps the
+    `config.__version__` counter; a section row records the counter it was
+    saved at and overrides the YAML section only while that is higher than
+    the counter recorded when the YAML was last written or imported.
+    """
     
-    def __init__(self, yaml_path: str = None, json_path: str = None):
+    def __init__(self, yaml_path: str = None, json_path: str = None, session_factory=None):
         """
         Initialize the config store.
         
         Args:
             yaml_path: Path to YAML config file (default: /data/config.yml)
             json_path: Path to legacy JSON file for migration (default: /data/appdata.json)
+            session_factory: appdata.db session factory for per-section storage (optional)
         """
         self.yaml_path = yaml_path or os.environ.get('CONFIG_YAML_PATH', '/data/config.yml')
         self.json_path = json_path or os.environ.get('DATA_PATH', '/data/appdata.json')
+        self.session_factory = session_factory
         self._lock = Lock()
+        # (file signature, merged config, compiled config) - swapped atomically as one tuple
+        self._snapshot: Optional[Tuple[Tuple[int, int, int], Dict[str, Any], CompiledConfig]] = None
+        # Last merged config handed to subscribers, used to diff watched paths
+        self._published: Optional[Dict[str, Any]] = None
+        self._publish_lock = RLock()
+        self._subscribers: List[Tuple[str, ConfigListener]] = []
         self._ensure_data_dir()
         self._migrate_from_json_if_needed()
         self._ensure_yaml_file()
@@ -179,23 +334,242 @@ class ConfigStore:
                 return self._get_default_config()
     
     def _write_yaml(self, config: Dict[str, Any]):
-        """Write config to YAML file with thread safety."""
+        """Write config to YAML file atomically (temp file + rename)."""
         with self._lock:
-            with open(self.yaml_path, 'w') as f:
-                yaml.dump(config, f, default_flow_style=False, allow_unicode=True, sort_keys=False)
+            atomic_write(self.yaml_path, lambda f: yaml.dump(
+                config, f, default_flow_style=False, allow_unicode=True, sort_keys=False
+            ))
+            self._snapshot = None
     
-    def get_config(self) -> Dict[str, Any]:
-        """Get full app config from YAML."""
+    def _file_signature(self) -> Optional[Tuple[int, int, int]]:
+        """Return (inode, mtime_ns, size) of the YAML file, or None if missing."""
+        return file_signature(self.yaml_path)
+    
+    def _db_version(self) -> Optional[int]:
+        """Return the section-table version counter (one PK lookup), or None."""
+        if not self.session_factory:
+            return None
+        with session_scope(self.session_factory) as session:
+            return self._counter(session, CONFIG_VERSION_KEY)
+    
+    def _signature(self):
+        file_sig = self._file_signature()
+        if file_sig is None:
+            return None
+        return (file_sig, self._db_version())
+    
+    @staticmethod
+    def _counter(session, key: str) -> int:
+        from models.app_data import AppConfig
+        row = session.get(AppConfig, key)
+        return int(row.value) if row and row.value else 0
+    
+    @staticmethod
+    def _set_counter(session, key: str, value: int, now: datetime):
+        from models.app_data import AppConfig
+        row = session.get(AppConfig, key)
+        if row is None:
+            session.add(AppConfig(key=key, value=str(value), category=CONFIG_CATEGORY, updated_at=now))
+        else:
+            row.value = str(value)
+            row.updated_at = now
+    
+    @staticmethod
+    def _begin_write(session):
+        # BEGIN IMMEDIATE on SQLite, so concurrent workers serialize instead of losing updates
+        if session.get_bind().dialect.name == 'sqlite':
+            session.connection().exec_driver_sql('BEGIN IMMEDIATE')
+    
+    def _load_sections(self) -> Dict[str, Any]:
+        """Load section rows saved after the YAML file was last written."""
+        if not self.session_factory:
+            return {}
+        from models.app_data import AppConfig
+        with session_scope(self.session_factory) as session:
+            yaml_version = self._counter(session, CONFIG_YAML_VERSION_KEY)
+            rows = session.query(AppConfig).filter(
+                AppConfig.category == CONFIG_CATEGORY,
+                AppConfig.key.notin_([CONFIG_VERSION_KEY, CONFIG_YAML_VERSION_KEY]),
+                AppConfig.version > yaml_version
+            ).all()
+            sections = {}
+            for row in rows:
+                try:
+                    sections[row.key] = json.loads(row.value)
+                except (TypeError, ValueError):
+                    print(f"Warning: Ignoring unreadable config section {row.key}")
+            return sections
+    
+    def _load_config(self) -> Dict[str, Any]:
+        """Parse YAML, merge it over the defaults and apply saved sections."""
         config = self._read_yaml()
         # Ensure all default keys exist (for backwards compatibility)
         default = self._get_default_config()
-        return self._deep_merge(default, config)
+        merged = self._deep_merge(default, config)
+        if self.session_factory:
+            for section, value in self._load_sections().items():
+                if isinstance(merged.get(section), dict) and isinstance(value, dict):
+                    merged[section] = self._deep_merge(merged[section], value)
+                else:
+                    merged[section] = value
+        return merged
+    
+    def _current_snapshot(self) -> Tuple[Any, Dict[str, Any], CompiledConfig]:
+        """
+        Return the cached (signature, merged, compiled) snapshot.
+        
+        The config is rebuilt only when the YAML file's inode, mtime or
+        size, or the section-table version, changes, so edits written by
+        other gunicorn workers are still picked up on the next read.
+        """
+        signature = self._signature()
+        snapshot = self._snapshot
+        if snapshot is None or signature is None or snapshot[0] != signature:
+            # Signature is taken before the read: a concurrent write leaves
+            # a stale signature behind, which only forces one extra re-parse.
+            config = self._load_config()
+            snapshot = (signature, config, CompiledConfig.from_dict(config))
+            if signature is not None:
+                self._snapshot = snapshot
+            self._publish(snapshot)
+        return snapshot
+    
+    def get_version(self) -> Any:
+        """
+        Return an opaque token that changes on every config write.
+        
+        Built from the YAML file signature and the section-table version,
+        so it is identical across workers and costs a stat plus one lookup.
+        """
+        return self._current_snapshot()[0]
+    
+    def get_config(self) -> Dict[str, Any]:
+        """Get full app config from YAML."""
+        # Callers mutate the returned dict, so never hand out the cached one
+        return copy.deepcopy(self._current_snapshot()[1])
+    
+    def get_compiled_config(self) -> CompiledConfig:
+        """Get the typed, immutable config; shared between callers, never copied."""
+        return self._current_snapshot()[2]
+    
+    def subscribe(self, path: str, callback: ConfigListener):
+        """
+        Call `callback(compiled_config)` whenever the value at `path` changes.
+        
+        `path` is a dotted key such as 'cloud115.qps'; a section name or a
+        trailing '.*' ('emby.*') watches the whole section. Changes are
+        detected when a read or write observes a new file signature.
+        """
+        if path.endswith('.*'):
+            path = path[:-2]
+        with self._publish_lock:
+            self._subscribers.append((path, callback))
+    
+    @staticmethod
+    def _value_at(config: Optional[Dict[str, Any]], path: str) -> Any:
+        value: Any = config
+        for part in path.split('.'):
+            if not isinstance(value, dict):
+                return None
+            value = value.get(part)
+        return value
+    
+    def _publish(self, snapshot):
+        """Notify subscribers whose watched path differs from the last published config."""
+        _, config, compiled = snapshot
+        with self._publish_lock:
+            previous = self._published
+            self._published = config
+            if previous is None:
+                return
+            callbacks = [
+                callback for path, callback in self._subscribers
+                if self._value_at(previous, path) != self._value_at(config, path)
+            ]
+        for callback in callbacks:
+            try:
+                callback(compiled)
+            except Exception as e:
+                print(f"Warning: Config subscriber failed: {e}")
     
     def update_config(self, config: Dict[str, Any]):
         """Update app config in YAML."""
         # Remove twoFactorSecret if present - it's managed separately in JSON
         config_copy = {k: v for k, v in config.items() if k != 'twoFactorSecret'}
-        self._write_yaml(config_copy)
+        if not self.session_factory:
+            self._write_yaml(config_copy)
+        else:
+            # Record the write as an import: section rows saved before it stop applying
+            with session_scope(self.session_factory) as session:
+                self._begin_write(session)
+                self._write_yaml(config_copy)
+                version = self._counter(session, CONFIG_VERSION_KEY) + 1
+                now = datetime.now()
+                self._set_counter(session, CONFIG_VERSION_KEY, version, now)
+                self._set_counter(session, CONFIG_YAML_VERSION_KEY, version, now)
+        # Re-read right away so in-process subscribers see the change
+        self._current_snapshot()
+    
+    def patch_section(self, section: str, updates: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Deep-merge `updates` into one config section and persist only that section.
+        
+        With a session factory the section is upserted as a single
+        `app_config` row, stamped with the next `config.__version__`, in one
+        write transaction (BEGIN IMMEDIATE on SQLite, so concurrent workers
+        serialize instead of losing updates). Without
+        one, falls back to a locked read-modify-write of the YAML file.
+        
+        Returns:
+            The full, updated section.
+        """
+        if section not in self._get_default_config():
+            raise KeyError(f'Unknown config section: {section}')
+        
+        if not self.session_factory:
+            config = self.get_config()
+            current = config.get(section)
+            config[section] = self._deep_merge(current, updates) if isinstance(current, dict) else updates
+            self.update_config(config)
+            return config[section]
+        
+        from models.app_data import AppConfig
+        with session_scope(self.session_factory) as session:
+            self._begin_write(session)
+            
+            row = session.get(AppConfig, section)
+            current = None
+            if row is not None and row.value and \
+                    (row.version or 0) > self._counter(session, CONFIG_YAML_VERSION_KEY):
+                current = json.loads(row.value)
+            if current is None:
+                current = self._deep_merge(self._get_default_config(), self._read_yaml()).get(section)
+            value = self._deep_merge(current, updates) if isinstance(current, dict) else updates
+            
+            now = datetime.now()
+            version = self._counter(session, CONFIG_VERSION_KEY) + 1
+            if row is None:
+                row = AppConfig(key=section, category=CONFIG_CATEGORY)
+                session.add(row)
+            row.value = json.dumps(value, ensure_ascii=False)
+            row.version = version
+            row.updated_at = now
+            self._set_counter(session, CONFIG_VERSION_KEY, version, now)
+        
+        self._snapshot = None
+        self._current_snapshot()
+        return value
+    
+    def export_yaml(self) -> str:
+        """Export the effective config (YAML + saved sections) as YAML text."""
+        return yaml.dump(self.get_config(), default_flow_style=False, allow_unicode=True, sort_keys=False)
+    
+    def import_yaml(self, text: str):
+        """Replace the config with a YAML document; supersedes saved sections."""
+        config = yaml.safe_load(text)
+        if not isinstance(config, dict):
+            raise ValueError('YAML document must be a mapping')
+        self.update_config(config)
     
     def _deep_merge(self, base: Dict[str, Any], updates: Dict[str, Any]) -> Dict[str, Any]:
         """Deep merge two dictionaries."""
@@ -1,21 +1,28 @@
+import copy
 import json
 import os
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 from threading import Lock
-from .config_store import ConfigStore
+from .config_store import ConfigStore, CompiledConfig, ConfigListener, atomic_write, file_signature
 
 
 class DataStore:
     """Persistence layer for admin credentials and 2FA secrets. Config is managed by ConfigStore."""
     
-    def __init__(self, data_path: str = None, config_yaml_path: str = None):
+    def __init__(self, data_path: str = None, config_yaml_path: str = None, session_factory=None):
         self.data_path = data_path or os.environ.get('DATA_PATH', '/data/appdata.json')
         self._lock = Lock()
+        # (file signature, parsed data) - readers never take the lock
+        self._snapshot: Optional[Tuple[Tuple[int, int, int], Dict[str, Any]]] = None
         self._ensure_data_dir()
         self._ensure_data_file()
         
         # Initialize YAML-backed config store
-        self.config_store = ConfigStore(yaml_path=config_yaml_path, json_path=self.data_path)
+        self.config_store = ConfigStore(
+            yaml_path=config_yaml_path,
+            json_path=self.data_path,
+            session_factory=session_factory
+        )
     
     def _ensure_data_dir(self):
         """Create data directory if it doesn't exist."""
@@ -26,16 +33,7 @@ class DataStore:
     def _ensure_data_file(self):
         """Create data file with default structure if it doesn't exist."""
         if not os.path.exists(self.data_path):
-            default_data = {
-                'admin': {
-                    'username': 'admin',
-                    'password_hash': None,
-                    'two_factor_secret': None,
-                    'two_factor_enabled': False
-                },
-                'config': self._get_default_config()
-            }
-            self._write_data(default_data)
+            self._write_data(self._default_data())
     
     def _get_default_config(self) -> Dict[str, Any]:
         """Return default AppConfig structure."""
@@ -141,28 +139,57 @@ class DataStore:
             }
         }
     
+    def _default_data(self) -> Dict[str, Any]:
+        return {
+            'admin': {
+                'username': 'admin',
+                'password_hash': None,
+                'two_factor_secret': None,
+                'two_factor_enabled': False
+            },
+            'config': self._get_default_config()
+        }
+    
+    def _load_data(self) -> Dict[str, Any]:
+        """Return the cached appdata.json contents, re-parsing only when the file changes."""
+        signature = file_signature(self.data_path)
+        snapshot = self._snapshot
+        if snapshot is not None and signature is not None and snapshot[0] == signature:
+            return snapshot[1]
+        try:
+            with open(self.data_path, 'r') as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, FileNotFoundError):
+            return self._default_data()
+        if signature is not None:
+            self._snapshot = (signature, data)
+        return data
+    
     def _read_data(self) -> Dict[str, Any]:
-        """Read data from file with thread safety."""
-        with self._lock:
-            try:
-                with open(self.data_path, 'r') as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, FileNotFoundError):
-                return {
-                    'admin': {
-                        'username': 'admin',
-                        'password_hash': None,
-                        'two_factor_secret': None,
-                        'two_factor_enabled': False
-                    },
-                    'config': self._get_default_config()
-                }
+        """Read data without locking; writes replace the file atomically."""
+        return copy.deepcopy(self._load_data())
     
     def _write_data(self, data: Dict[str, Any]):
         """Write data to file with thread safety."""
         with self._lock:
-            with open(self.data_path, 'w') as f:
-                json.dump(data, f, indent=2)
+            self._write_data_locked(data)
+    
+    def _write_data_locked(self, data: Dict[str, Any]):
+        atomic_write(self.data_path, lambda f: json.dump(data, f, indent=2))
+        self._snapshot = None
+    
+    def _update_admin(self, **fields):
+        """Read-modify-write the admin record under the write lock."""
+        with self._lock:
+            data = self._read_data()
+            if 'admin' not in data:
+                data['admin'] = {'username': 'admin'}
+            data['admin'].update(fields)
+            self._write_data_locked(data)
+    
+    def _get_admin(self) -> Dict[str, Any]:
+        """Shared, read-only view of the admin record (do not mutate)."""
+        return self._load_data().get('admin') or {}
     
     def get_admin_credentials(self) -> Dict[str, Any]:
         """Get admin credentials."""
@@ -176,41 +203,47 @@ class DataStore:
     
     def update_admin_password(self, password_hash: str):
         """Update admin password hash."""
-        data = self._read_data()
-        if 'admin' not in data:
-            data['admin'] = {'username': 'admin'}
-        data['admin']['password_hash'] = password_hash
-        self._write_data(data)
+        self._update_admin(password_hash=password_hash)
     
     def get_two_factor_secret(self) -> Optional[str]:
         """Get 2FA secret."""
-        data = self._read_data()
-        return data.get('admin', {}).get('two_factor_secret')
+        return self._get_admin().get('two_factor_secret')
     
     def update_two_factor_secret(self, secret: str):
         """Update 2FA secret."""
-        data = self._read_data()
-        if 'admin' not in data:
-            data['admin'] = {'username': 'admin'}
-        data['admin']['two_factor_secret'] = secret
-        data['admin']['two_factor_enabled'] = True
-        self._write_data(data)
+        self._update_admin(two_factor_secret=secret, two_factor_enabled=True)
     
     def is_two_factor_enabled(self) -> bool:
         """Check if 2FA is enabled."""
-        data = self._read_data()
-        return data.get('admin', {}).get('two_factor_enabled', False)
+        return self._get_admin().get('two_factor_enabled', False)
     
     def get_config(self) -> Dict[str, Any]:
         """Get full app config from YAML store."""
         config = self.config_store.get_config()
         
-        # Add 2FA secret to config if enabled
-        if self.is_two_factor_enabled():
-            config['twoFactorSecret'] = self.get_two_factor_secret()
+        # Add 2FA secret to config if enabled (single cached read of the admin record)
+        admin = self._get_admin()
+        if admin.get('two_factor_enabled', False):
+            config['twoFactorSecret'] = admin.get('two_factor_secret')
         
         return config
     
+    def get_config_version(self) -> Any:
+        """Version of what get_config() returns: config sections plus 2FA state."""
+        return (self.config_store.get_version(), file_signature(self.data_path))
+    
+    def get_compiled_config(self) -> CompiledConfig:
+        """Get typed, immutable app config (no 2FA data)."""
+        return self.config_store.get_compiled_config()
+    
+    def subscribe_config(self, path: str, callback: ConfigListener):
+        """Subscribe to changes of a config path, e.g. 'cloud115.qps' or 'emby.*'."""
+        self.config_store.subscribe(path, callback)
+    
+    def patch_config_section(self, section: str, updates: Dict[str, Any]) -> Dict[str, Any]:
+        """Merge updates into a single config section without rewriting the rest."""
+        return self.config_store.patch_section(section, updates)
+    
     def update_config(self, config: Dict[str, Any]):
         """Update app config in YAML store."""
         # Extract 2FA secret if present and update separately in JSON
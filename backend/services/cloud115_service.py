@@ -1,15 +1,63 @@
 import json
+import hashlib
 import logging
-from typing import Dict, Any, List, Optional
+import threading
+from typing import Dict, Any, Callable, Iterator, List, Optional, Tuple
 from datetime import datetime
 from services.secret_store import SecretStore
+from services.rate_limiter import RateLimitedProxy, get_rate_limiter
+from services.dir_cache import get_dir_cache
+from services.dir_walker import walk_tree
+from utils.batching import run_in_batches
 
 logger = logging.getLogger(__name__)
 
+# Process-wide P115Client reuse: (cookie fingerprint, client). Shared by all
+# Cloud115Service instances so the HTTP connection pool stays warm.
+_client_cache: Dict[str, Any] = {'key': None, 'client': None}
+_client_cache_lock = threading.Lock()
+
+
+def clear_client_cache():
+    """Drop the cached P115Client (next call builds a new one)."""
+    with _client_cache_lock:
+        _client_cache['key'] = None
+        _client_cache['client'] = None
+
+
+def _cookie_fingerprint(cookies_json: str) -> str:
+    """Identity of a 115 login: keys the cached client and cached listings."""
+    return hashlib.sha256(cookies_json.encode()).hexdigest()
+
+
+def _clear_dir_cache():
+    """Forget cached 115 listings (they belong to a login that is gone)."""
+    cache = get_dir_cache('115')
+    if not cache:
+        return
+    try:
+        cache.clear()
+    except Exception as e:
+        logger.warning(f'Failed to clear directory cache: {str(e)}')
+
 
 class Cloud115Service:
     """Service for interacting with 115 cloud via p115client."""
     
+    # Items per fs_files page when walking a tree
+    WALK_PAGE_SIZE = 1000
+    # Ids per fs_move / fs_rename / fs_delete request
+    FILE_OP_BATCH_SIZE = 1000
+    # Client methods that hit the 115 API and take a cloud115.qps token
+    RATE_LIMITED_CALLS = frozenset({
+        'fs_files', 'fs_move', 'fs_rename', 'fs_delete',
+        'offline_list', 'offline_add', 'offline_add_urls',
+        'fs.listdir', 'fs.listdir_attr', 'fs.move', 'fs.rename', 'fs.delete', 'fs.get_url',
+        'offline.list', 'offline.add_url', 'offline.add_urls',
+        'list_files', 'move', 'rename', 'delete', 'get_download_url',
+        'add_offline_task', 'list_offline_tasks',
+    })
+    
     def __init__(self, secret_store: SecretStore):
         """
         Initialize Cloud115Service.
@@ -28,37 +76,92 @@ class Cloud115Service:
             logger.warning('p115client not installed, 115 operations will be mocked')
     
     def _get_authenticated_client(self):
-        """Get or create an authenticated p115client instance."""
+        """
+        Get an authenticated p115client instance.
+        
+        The client is built once per cookie value and reused afterwards, so
+        calls share its keep-alive HTTP session instead of paying a new
+        TLS handshake each time. Saving new cookies changes the fingerprint
+        and the next call builds a fresh client; listings cached for the
+        previous login are dropped then, and on logout.
+        """
         if not self.p115client:
             raise ImportError('p115client not installed')
         
-        # Get cookies from secret store
+        # Get cookies from secret store (served from its in-memory cache)
         cookies_json = self.secret_store.get_secret('cloud115_cookies')
         if not cookies_json:
+            clear_client_cache()
+            _clear_dir_cache()
             raise ValueError('No 115 cookies found in secret store')
         
-        try:
-            cookies = json.loads(cookies_json)
-        except json.JSONDecodeError:
-            raise ValueError('Invalid cookies format in secret store')
+        key = _cookie_fingerprint(cookies_json)
+        with _client_cache_lock:
+            previous_key = _client_cache['key']
+            client = _client_cache['client'] if previous_key == key else None
         
-        # Create client
-        if hasattr(self.p115client, 'P115Client'):
+        if client is None:
+            try:
+                cookies = json.loads(cookies_json)
+            except json.JSONDecodeError:
+                raise ValueError('Invalid cookies format in secret store')
+            
+            # Create client
+            if not hasattr(self.p115client, 'P115Client'):
+                raise ImportError('p115client.P115Client not available')
             client = self.p115client.P115Client(cookies=cookies)
-            return client
-        else:
-            raise ImportError('p115client.P115Client not available')
+            with _client_cache_lock:
+                _client_cache['key'] = key
+                _client_cache['client'] = client
+            logger.info('Created 115 client for current cookies')
+            if previous_key is not None:
+                # Cookies changed (possibly another account)
+                _clear_dir_cache()
+        
+        # API calls wait for a cloud115.qps token shared by all workers
+        limiter = get_rate_limiter('cloud115')
+        return RateLimitedProxy(client, limiter, self.RATE_LIMITED_CALLS) if limiter else client
     
-    def list_directory(self, cid: str = '0') -> Dict[str, Any]:
+    def list_directory(self, cid: str = '0', refresh: bool = False) -> Dict[str, Any]:
         """
         List directory contents from 115 cloud.
         
+        Served from the directory cache when it is configured (see
+        services.dir_cache), only listings fetched with the current cookies;
+        `refresh` forces a live listing.
+        
         Args:
             cid: Directory ID (CID), defaults to '0' for root
+            refresh: Bypass the cache
         
         Returns:
             Dict with success flag and list of entries
         """
+        cache = get_dir_cache('115')
+        cookies_json = self.secret_store.get_secret('cloud115_cookies') if cache else None
+        if cookies_json:
+            return cache.get_or_load(cid, lambda: self._list_directory_live(cid), refresh=refresh,
+                                     account=_cookie_fingerprint(cookies_json))
+        return self._list_directory_live(cid)
+    
+    def _invalidate_dirs(self, item_ids=(), cids=(), trees=()):
+        """
+        Drop cached listings touched by a mutation: parents of item_ids,
+        cids, and trees together with all cached folders below them.
+        """
+        cache = get_dir_cache('115')
+        if not cache:
+            return
+        try:
+            for item_id in item_ids:
+                cache.invalidate_item(item_id)
+            cache.invalidate(*cids)
+            cache.invalidate_tree(*trees)
+        except Exception as e:
+            logger.warning(f'Failed to invalidate directory cache: {str(e)}')
+    
+    def _list_directory_live(self, cid: str) -> Dict[str, Any]:
+        """List `cid` through the 115 API."""
         try:
             client = self._get_authenticated_client()
             
@@ -122,6 +225,93 @@ class Cloud115Service:
                 'error': f'Failed to list directory: {str(e)}'
             }
     
+    @staticmethod
+    def _normalize_walk_item(item, parent_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Normalize a listing item for the walker.
+        
+        Accepts raw fs_files dicts (folders: cid/n/pc, files: fid/n/s/sha/pc)
+        and p115client attr objects (id/name/is_directory/size/sha1/pickcode).
+        """
+        if isinstance(item, dict):
+            is_directory = 'fid' not in item
+            entry_id = item.get('cid') if is_directory else item.get('fid')
+            entry_name = item.get('n')
+            size = item.get('s')
+            sha1 = item.get('sha')
+            pickcode = item.get('pc')
+        else:
+            is_directory = bool(getattr(item, 'is_directory', False))
+            entry_id = getattr(item, 'id', None)
+            entry_name = getattr(item, 'name', None)
+            size = getattr(item, 'size', None)
+            sha1 = getattr(item, 'sha1', None)
+            pickcode = getattr(item, 'pickcode', None)
+        
+        if not entry_id or not entry_name:
+            return None
+        return {
+            'id': str(entry_id),
+            'name': entry_name,
+            'isDir': is_directory,
+            'size': None if is_directory else int(size or 0),
+            'sha1': (sha1 or '').upper() or None,
+            'md5': None,
+            'pickcode': pickcode or None,
+            'parentId': str(parent_id)
+        }
+    
+    def _walk_page(self, client, cid: str, offset) -> Tuple[List[Dict[str, Any]], Any]:
+        """dir_walker page function: normalized entries of one page and the next offset."""
+        offset = offset or 0
+        if hasattr(client, 'fs_files'):
+            # p115client.P115Client: paged, {'state': ..., 'count': N, 'data': [...]}
+            response = client.fs_files({
+                'cid': cid, 'offset': offset, 'limit': self.WALK_PAGE_SIZE, 'show_dir': 1
+            })
+            if not response.get('state', True):
+                raise RuntimeError(f"Failed to list directory {cid}: {response.get('error') or response}")
+            items = response.get('data') or []
+            total = int(response.get('count') or 0)
+            next_offset = offset + len(items) if items and offset + len(items) < total else None
+        elif hasattr(client, 'fs'):
+            # 无分页接口时整个目录作为一页返回
+            lister = getattr(client.fs, 'listdir_attr', None) or client.fs.listdir
+            items, next_offset = list(lister(cid)), None
+        else:
+            raise NotImplementedError('Directory listing not supported')
+        
+        entries = [self._normalize_walk_item(item, cid) for item in items]
+        return [entry for entry in entries if entry], next_offset
+    
+    def walk(self, cid: str = '0', root_path: str = '', max_workers: int = 4,
+             max_depth: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Recursively list a subtree, see services.dir_walker.walk_tree.
+        
+        Live listings (the directory cache is bypassed); each page request
+        goes through the cloud115 rate limiter, so `max_workers` only bounds
+        how many requests wait in parallel.
+        
+        Args:
+            cid: Folder to walk, '0' for root
+            root_path: Path of `cid`, used as prefix of parentPath
+            max_workers: Max concurrent page requests
+            max_depth: Don't descend below this depth
+        
+        Yields:
+            Dicts with id, name, isDir, size, sha1, md5, pickcode, parentId, parentPath
+        
+        Raises:
+            ImportError, ValueError: No usable client / cookies
+            RuntimeError: A page could not be listed
+        """
+        client = self._get_authenticated_client()
+        return walk_tree(
+            lambda dir_id, offset: self._walk_page(client, dir_id, offset),
+            cid, root_path, max_workers, max_depth
+        )
+    
     def rename_file(self, file_id: str, new_name: str) -> Dict[str, Any]:
         """
         Rename a file or folder on 115 cloud.
@@ -146,6 +336,8 @@ class Cloud115Service:
                     'error': 'Rename operation not supported'
                 }
             
+            self._invalidate_dirs(item_ids=[file_id])
+            
             return {
                 'success': True,
                 'data': {
@@ -191,6 +383,9 @@ class Cloud115Service:
                     'error': 'Move operation not supported'
                 }
             
+            # Old parent loses the item, target gains it
+            self._invalidate_dirs(item_ids=[file_id], cids=[target_cid])
+            
             return {
                 'success': True,
                 'data': {
@@ -235,6 +430,8 @@ class Cloud115Service:
                     'error': 'Delete operation not supported'
                 }
             
+            self._invalidate_dirs(item_ids=[file_id], trees=[file_id])
+            
             return {
                 'success': True,
                 'data': {
@@ -255,6 +452,125 @@ class Cloud115Service:
                 'error': f'Failed to delete: {str(e)}'
             }
     
+    @staticmethod
+    def _fs_error(response) -> Optional[str]:
+        """Error of a 115 fs_* response, None when it succeeded."""
+        if isinstance(response, dict) and response.get('state') is False:
+            return response.get('error') or response.get('error_msg') or 'Operation rejected'
+        return None
+    
+    def _batch_file_op(self, items: List[Any], batch_call: Optional[Callable], single_call: Callable,
+                       describe: Callable[[Any], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Run a file operation over `items` in FILE_OP_BATCH_SIZE chunks.
+        
+        Args:
+            items: Ids (or (id, name) pairs) in request order
+            batch_call: Client method taking a list of items, None if unavailable
+            single_call: Fallback for one item returning a service result dict
+            describe: Per-item result identity
+        """
+        if batch_call is not None:
+            return run_in_batches(items, self.FILE_OP_BATCH_SIZE,
+                                  lambda chunk: self._fs_error(batch_call(chunk)), describe)
+        # No batch API: one request per item
+        return run_in_batches(items, 1, lambda chunk: single_call(chunk[0]).get('error'), describe)
+    
+    def move_files(self, file_ids: List[str], target_cid: str) -> Dict[str, Any]:
+        """
+        Move many files or folders to one directory on 115 cloud.
+        
+        Args:
+            file_ids: File or folder IDs
+            target_cid: Target directory CID
+        
+        Returns:
+            Dict with success flag, per-id results ({'fileId', 'success', 'error'?})
+            and succeeded / failed counts
+        """
+        try:
+            client = self._get_authenticated_client()
+        except Exception as e:
+            logger.warning(f'Failed to move files: {str(e)}')
+            return {
+                'success': False,
+                'error': str(e)
+            }
+        
+        file_ids = list(dict.fromkeys(str(file_id) for file_id in file_ids if file_id))
+        batch_call = None
+        if hasattr(client, 'fs_move'):
+            batch_call = lambda chunk: client.fs_move(chunk, pid=target_cid)
+        
+        result = self._batch_file_op(file_ids, batch_call,
+                                     lambda file_id: self.move_file(file_id, target_cid),
+                                     lambda file_id: {'fileId': file_id})
+        moved = [item['fileId'] for item in result['data'] if item['success']]
+        if moved:
+            self._invalidate_dirs(item_ids=moved, cids=[target_cid])
+        return result
+    
+    def rename_files(self, renames: List[Tuple[str, str]]) -> Dict[str, Any]:
+        """
+        Rename many files or folders on 115 cloud.
+        
+        Args:
+            renames: (file_id, new_name) pairs
+        
+        Returns:
+            Dict with success flag, per-id results ({'fileId', 'newName', 'success', 'error'?})
+            and succeeded / failed counts
+        """
+        try:
+            client = self._get_authenticated_client()
+        except Exception as e:
+            logger.warning(f'Failed to rename files: {str(e)}')
+            return {
+                'success': False,
+                'error': str(e)
+            }
+        
+        renames = [(str(file_id), new_name) for file_id, new_name in renames]
+        batch_call = client.fs_rename if hasattr(client, 'fs_rename') else None
+        
+        result = self._batch_file_op(renames, batch_call,
+                                     lambda pair: self.rename_file(*pair),
+                                     lambda pair: {'fileId': pair[0], 'newName': pair[1]})
+        renamed = [item['fileId'] for item in result['data'] if item['success']]
+        if renamed:
+            self._invalidate_dirs(item_ids=renamed)
+        return result
+    
+    def delete_files(self, file_ids: List[str]) -> Dict[str, Any]:
+        """
+        Delete many files or folders from 115 cloud.
+        
+        Args:
+            file_ids: File or folder IDs
+        
+        Returns:
+            Dict with success flag, per-id results ({'fileId', 'success', 'error'?})
+            and succeeded / failed counts
+        """
+        try:
+            client = self._get_authenticated_client()
+        except Exception as e:
+            logger.warning(f'Failed to delete files: {str(e)}')
+            return {
+                'success': False,
+                'error': str(e)
+            }
+        
+        file_ids = list(dict.fromkeys(str(file_id) for file_id in file_ids if file_id))
+        batch_call = client.fs_delete if hasattr(client, 'fs_delete') else None
+        
+        result = self._batch_file_op(file_ids, batch_call, self.delete_file,
+                                     lambda file_id: {'fileId': file_id})
+        deleted = [item['fileId'] for item in result['data'] if item['success']]
+        if deleted:
+            self._invalidate_dirs(item_ids=deleted, trees=deleted)
+        return result
+    
     def get_download_link(self, file_id: str) -> Dict[str, Any]:
         """
         Get direct download link for a file.
@@ -354,100 +670,241 @@ class Cloud115Service:
                 'error': f'Failed to create offline task: {str(e)}'
             }
     
-    def get_offline_task_status(self, task_id: str) -> Dict[str, Any]:
+    # Max URLs per offline add request accepted by the 115 web API
+    OFFLINE_ADD_BATCH_SIZE = 100
+    
+    def create_offline_tasks(self, source_urls: List[str], save_cid: str) -> Dict[str, Any]:
         """
-        Get status of an offline task from 115 cloud.
+        Create several offline download tasks with as few 115 calls as possible.
         
         Args:
-            task_id: Task ID from 115
+            source_urls: URLs or magnet links to download
+            save_cid: Target folder CID
         
         Returns:
-            Dict with task status, progress, and speed
+            Dict with success flag and one result per URL (same order):
+            {'sourceUrl', 'success', 'p115TaskId' or 'error'}
         """
         try:
             client = self._get_authenticated_client()
-            
-            # Try various possible method names
-            if hasattr(client, 'offline') and hasattr(client.offline, 'list'):
-                tasks = client.offline.list()
-            elif hasattr(client, 'list_offline_tasks'):
-                tasks = client.list_offline_tasks()
-            else:
-                return {
-                    'success': False,
-                    'error': 'Offline task status not supported'
-                }
-            
-            # Find the task by ID
-            task_info = None
-            for task in tasks:
-                if isinstance(task, dict):
-                    if task.get('task_id') == task_id or task.get('info_hash') == task_id or task.get('id') == task_id:
-                        task_info = task
-                        break
-                elif hasattr(task, 'task_id'):
-                    if getattr(task, 'task_id', None) == task_id or getattr(task, 'info_hash', None) == task_id:
-                        task_info = {
-                            'status': getattr(task, 'status', None),
-                            'progress': getattr(task, 'progress', None) or getattr(task, 'percentDone', None),
-                            'speed': getattr(task, 'speed', None) or getattr(task, 'rateDownload', None),
-                        }
-                        break
-            
-            if not task_info:
-                return {
-                    'success': False,
-                    'error': f'Task {task_id} not found'
-                }
-            
-            # Map status to our enum
-            status_map = {
-                '1': 'downloading',
-                '2': 'completed',
-                '-1': 'failed',
-                'downloading': 'downloading',
-                'completed': 'completed',
-                'failed': 'failed',
-                'seeding': 'completed',
-                'paused': 'pending',
+        except Exception as e:
+            logger.warning(f'Failed to create offline tasks: {str(e)}')
+            return {
+                'success': False,
+                'error': str(e)
             }
-            
-            raw_status = task_info.get('status', '0')
-            status = status_map.get(str(raw_status), 'pending')
-            
-            # Get progress (0-100)
-            progress = task_info.get('progress', 0) or task_info.get('percentDone', 0)
-            if isinstance(progress, float) and progress <= 1.0:
-                progress = int(progress * 100)
+        
+        add_urls = None
+        if hasattr(client, 'offline_add_urls'):
+            add_urls = client.offline_add_urls
+        elif hasattr(client, 'offline') and hasattr(client.offline, 'add_urls'):
+            add_urls = client.offline.add_urls
+        
+        results = []
+        for start in range(0, len(source_urls), self.OFFLINE_ADD_BATCH_SIZE):
+            chunk = source_urls[start:start + self.OFFLINE_ADD_BATCH_SIZE]
+            if add_urls is None:
+                # No batch API: fall back to one request per URL
+                for url in chunk:
+                    single = self.create_offline_task(url, save_cid)
+                    if single.get('success'):
+                        results.append({'sourceUrl': url, 'success': True,
+                                        'p115TaskId': single['data'].get('p115TaskId')})
+                    else:
+                        results.append({'sourceUrl': url, 'success': False, 'error': single.get('error')})
+                continue
+            try:
+                response = add_urls({'urls': '\n'.join(chunk), 'wp_path_id': save_cid})
+                results.extend(self._parse_offline_add_results(chunk, response))
+            except Exception as e:
+                logger.error(f'Failed to create offline tasks: {str(e)}')
+                results.extend({'sourceUrl': url, 'success': False, 'error': str(e)} for url in chunk)
+        
+        return {
+            'success': True,
+            'data': results
+        }
+    
+    @staticmethod
+    def _parse_offline_add_results(urls: List[str], response) -> List[Dict[str, Any]]:
+        """Map a batch add response ({'result': [...]} in request order) to per-URL results."""
+        if isinstance(response, dict) and response.get('state') is False and not response.get('result'):
+            error = response.get('error_msg') or response.get('error') or 'Offline add rejected'
+            return [{'sourceUrl': url, 'success': False, 'error': error} for url in urls]
+        
+        items = response.get('result') if isinstance(response, dict) else response
+        if not isinstance(items, list):
+            items = []
+        results = []
+        for index, url in enumerate(urls):
+            item = items[index] if index < len(items) else None
+            if not isinstance(item, dict):
+                results.append({'sourceUrl': url, 'success': False, 'error': 'No result returned'})
+            elif item.get('state') is False:
+                results.append({
+                    'sourceUrl': url,
+                    'success': False,
+                    'error': item.get('error_msg') or item.get('errcode') or 'Offline add rejected'
+                })
             else:
-                progress = int(progress)
-            
+                results.append({
+                    'sourceUrl': url,
+                    'success': True,
+                    'p115TaskId': item.get('info_hash') or item.get('task_id') or item.get('id')
+                })
+        return results
+    
+    # 115 offline status codes / names -> our task status
+    OFFLINE_STATUS_MAP = {
+        '1': 'downloading',
+        '2': 'completed',
+        '-1': 'failed',
+        'downloading': 'downloading',
+        'completed': 'completed',
+        'failed': 'failed',
+        'seeding': 'completed',
+        'paused': 'pending',
+    }
+    
+    @classmethod
+    def _normalize_offline_task(cls, task) -> Optional[Dict[str, Any]]:
+        """
+        Convert a raw 115 offline task (dict or object) into
+        {'ids': [...], 'status', 'progress', 'speed'}.
+        """
+        if isinstance(task, dict):
+            ids = [task.get('task_id'), task.get('info_hash'), task.get('id')]
+            raw_status = task.get('status', '0')
+            progress = task.get('progress', 0) or task.get('percentDone', 0)
+            speed = task.get('speed', 0) or task.get('rateDownload', 0)
+        elif hasattr(task, 'task_id'):
+            ids = [getattr(task, 'task_id', None), getattr(task, 'info_hash', None)]
+            raw_status = getattr(task, 'status', None)
+            progress = getattr(task, 'progress', None) or getattr(task, 'percentDone', None) or 0
+            speed = getattr(task, 'speed', None) or getattr(task, 'rateDownload', None) or 0
+        else:
+            return None
+        
+        # Get progress (0-100)
+        if isinstance(progress, float) and progress <= 1.0:
+            progress = int(progress * 100)
+        else:
+            progress = int(progress)
+        
+        return {
+            'ids': [str(task_id) for task_id in ids if task_id],
+            'status': cls.OFFLINE_STATUS_MAP.get(str(raw_status), 'pending'),
+            'progress': progress,
             # Get speed (bytes/sec)
-            speed = task_info.get('speed', 0) or task_info.get('rateDownload', 0)
-            if speed:
-                speed = float(speed)
+            'speed': float(speed) if speed else speed
+        }
+    
+    @staticmethod
+    def _fetch_offline_page(client, page: int):
+        """
+        Fetch one page of the 115 offline task list.
+        
+        Every client shape is asked for `page`; a dict result reports
+        'page_count', a plain list is taken as the whole list.
+        
+        Returns:
+            (tasks, page_count); clients without paging return everything as one page
+        """
+        if hasattr(client, 'offline') and hasattr(client.offline, 'list'):
+            result = client.offline.list(page)
+        elif hasattr(client, 'list_offline_tasks'):
+            result = client.list_offline_tasks(page)
+        elif hasattr(client, 'offline_list'):
+            # p115client.P115Client: paged, {'tasks': [...], 'page_count': N}
+            result = client.offline_list(page)
+        else:
+            raise NotImplementedError('Offline task status not supported')
+        
+        if isinstance(result, dict):
+            data = result.get('data') if isinstance(result.get('data'), dict) else result
+            tasks = data.get('tasks') or []
+            page_count = int(data.get('page_count') or 1)
+            return tasks, page_count
+        return list(result or []), 1
+    
+    def list_offline_task_statuses(self) -> Dict[str, Any]:
+        """
+        Fetch the whole 115 offline task list once (all pages).
+        
+        Returns:
+            Dict with success flag and data mapping every task id / info_hash
+            to {'status', 'progress', 'speed'}
+        """
+        try:
+            client = self._get_authenticated_client()
+            
+            statuses: Dict[str, Dict[str, Any]] = {}
+            page, page_count = 1, 1
+            while page <= page_count:
+                tasks, page_count = self._fetch_offline_page(client, page)
+                if not tasks:
+                    # Past the last page (the list shrank since page 1)
+                    break
+                for task in tasks:
+                    info = self._normalize_offline_task(task)
+                    if not info:
+                        continue
+                    ids = info.pop('ids')
+                    for task_id in ids:
+                        statuses[task_id] = info
+                page += 1
             
             return {
                 'success': True,
-                'data': {
-                    'status': status,
-                    'progress': progress,
-                    'speed': speed
-                }
+                'data': statuses
             }
         
+        except NotImplementedError as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
         except (ImportError, ValueError) as e:
-            logger.warning(f'Failed to get task status: {str(e)}')
+            logger.warning(f'Failed to list offline tasks: {str(e)}')
             return {
                 'success': False,
                 'error': str(e)
             }
         except Exception as e:
-            logger.error(f'Failed to get offline task status: {str(e)}')
+            logger.error(f'Failed to list offline tasks: {str(e)}')
+            return {
+                'success': False,
+                'error': f'Failed to list offline tasks: {str(e)}'
+            }
+    
+    def get_offline_task_status(self, task_id: str) -> Dict[str, Any]:
+        """
+        Get status of an offline task from 115 cloud.
+        
+        Fetches the whole list; use list_offline_task_statuses to look up
+        many tasks at once.
+        
+        Args:
+            task_id: Task ID from 115
+        
+        Returns:
+            Dict with task status, progress, and speed
+        """
+        result = self.list_offline_task_statuses()
+        if not result.get('success'):
+            return result
+        
+        task_info = result['data'].get(str(task_id))
+        if not task_info:
             return {
                 'success': False,
-                'error': f'Failed to get task status: {str(e)}'
+                'error': f'Task {task_id} not found'
             }
+        
+        return {
+            'success': True,
+            'data': dict(task_info)
+        }
     
     def get_session_metadata(self) -> Dict[str, Any]:
         """
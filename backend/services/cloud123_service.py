@@ -1,9 +1,12 @@
 import json
 import logging
 import requests
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Callable, Iterator, List, Optional, Tuple
 from datetime import datetime, timedelta
 from services.secret_store import SecretStore
+from services.rate_limiter import get_rate_limiter
+from services.dir_walker import walk_tree
+from utils.batching import run_in_batches
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +17,12 @@ CLOUD123_API_BASE = "https://open-api.123pan.com"
 class Cloud123Service:
     """Service for interacting with 123 cloud via OAuth API."""
     
+    # /api/v2/file/list 单页上限
+    LIST_PAGE_SIZE = 100
+    # 移动 / 删除单次最多 100 个文件, 批量重命名最多 30 个
+    FILE_OP_BATCH_SIZE = 100
+    RENAME_BATCH_SIZE = 30
+    
     def __init__(self, secret_store: SecretStore):
         """
         Initialize Cloud123Service.
@@ -25,6 +34,13 @@ class Cloud123Service:
         self._access_token = None
         self._token_expires_at = None
     
+    @staticmethod
+    def _throttle():
+        """Wait for a cloud123.qps token shared by all workers."""
+        limiter = get_rate_limiter('cloud123')
+        if limiter:
+            limiter.acquire()
+    
     def _get_access_token(self) -> Optional[str]:
         """
         Get valid access token, refreshing if necessary.
@@ -98,6 +114,7 @@ class Cloud123Service:
                 "Platform": "open_platform"
             }
             
+            self._throttle()
             response = requests.post(url, json=payload, headers=headers, timeout=30)
             response.raise_for_status()
             
@@ -169,6 +186,7 @@ class Cloud123Service:
                 "Platform": "open_platform"
             }
             
+            self._throttle()
             if method.upper() == 'GET':
                 response = requests.get(url, params=params, headers=headers, timeout=30)
             elif method.upper() == 'POST':
@@ -206,9 +224,45 @@ class Cloud123Service:
             }
 
     
+    def _fetch_file_page(self, dir_id: str, last_file_id=None) -> Dict[str, Any]:
+        """
+        Fetch one page of a folder via /api/v2/file/list.
+        
+        Args:
+            dir_id: Directory ID
+            last_file_id: Cursor returned by the previous page, None for the first
+        
+        Returns:
+            Dict with success flag, raw 'data' items and 'lastFileId' (None on the last page)
+        """
+        params = {
+            'parentFileId': int(dir_id),
+            'limit': self.LIST_PAGE_SIZE
+        }
+        if last_file_id is not None:
+            params['lastFileId'] = last_file_id
+        
+        result = self._make_api_request('GET', '/api/v2/file/list', params=params)
+        if not result.get('success'):
+            return result
+        
+        api_data = result.get('data', {})
+        if isinstance(api_data, dict):
+            file_list = api_data.get('fileList') or []
+            next_id = api_data.get('lastFileId')
+        else:
+            file_list, next_id = api_data or [], -1
+        
+        # v2 列表包含回收站中的文件, lastFileId == -1 表示最后一页
+        return {
+            'success': True,
+            'data': [item for item in file_list if not item.get('trashed')],
+            'lastFileId': None if next_id in (None, -1, '-1') or not file_list else next_id
+        }
+    
     def list_directory(self, dir_id: str = '0') -> Dict[str, Any]:
         """
-        List directory contents from 123 cloud.
+        List directory contents from 123 cloud (all pages).
         
         Args:
             dir_id: Directory ID, defaults to '0' for root
@@ -222,37 +276,31 @@ class Cloud123Service:
             if dir_id == '/' or dir_id == '':
                 dir_id = '0'
             
-            params = {
-                'parentFileId': int(dir_id),
-                'limit': 100,
-                'Page': 1,
-                'orderBy': 'file_name',
-                'orderDirection': 'asc'
-            }
-            
-            result = self._make_api_request('GET', '/api/v2/file/list', params=params)
-            
-            if not result.get('success'):
-                return result
-            
-            # 转换数据格式
-            api_data = result.get('data', {})
-            file_list = api_data.get('fileList', []) if isinstance(api_data, dict) else api_data
-            
             entries = []
-            for item in file_list:
-                entry_id = item.get('fileId')
-                entry_name = item.get('filename') or item.get('fileName')
-                is_directory = item.get('type') == 1  # 1 = 文件夹, 0 = 文件
-                update_time = item.get('updateTime', '')
+            last_file_id = None
+            while True:
+                result = self._fetch_file_page(dir_id, last_file_id)
+                if not result.get('success'):
+                    return result
                 
-                if entry_id and entry_name:
-                    entries.append({
-                        'id': str(entry_id),
-                        'name': entry_name,
-                        'children': is_directory,
-                        'date': update_time[:10] if update_time else datetime.now().strftime('%Y-%m-%d')
-                    })
+                # 转换数据格式
+                for item in result['data']:
+                    entry_id = item.get('fileId')
+                    entry_name = item.get('filename') or item.get('fileName')
+                    is_directory = item.get('type') == 1  # 1 = 文件夹, 0 = 文件
+                    update_time = item.get('updateTime', '')
+                    
+                    if entry_id and entry_name:
+                        entries.append({
+                            'id': str(entry_id),
+                            'name': entry_name,
+                            'children': is_directory,
+                            'date': update_time[:10] if update_time else datetime.now().strftime('%Y-%m-%d')
+                        })
+                
+                last_file_id = result['lastFileId']
+                if last_file_id is None:
+                    break
             
             return {
                 'success': True,
@@ -265,6 +313,55 @@ class Cloud123Service:
                 'error': f'Failed to list directory: {str(e)}'
             }
     
+    def _walk_page(self, dir_id: str, last_file_id) -> Tuple[List[Dict[str, Any]], Any]:
+        """dir_walker page function: normalized entries of one page and the next cursor."""
+        result = self._fetch_file_page(dir_id, last_file_id)
+        if not result.get('success'):
+            raise RuntimeError(f"Failed to list directory {dir_id}: {result.get('error')}")
+        
+        entries = []
+        for item in result['data']:
+            entry_id = item.get('fileId')
+            entry_name = item.get('filename') or item.get('fileName')
+            if not entry_id or not entry_name:
+                continue
+            is_directory = item.get('type') == 1
+            entries.append({
+                'id': str(entry_id),
+                'name': entry_name,
+                'isDir': is_directory,
+                'size': None if is_directory else int(item.get('size') or 0),
+                'sha1': None,
+                'md5': item.get('etag') or None,
+                'pickcode': None,
+                'parentId': str(dir_id)
+            })
+        return entries, result['lastFileId']
+    
+    def walk(self, dir_id: str = '0', root_path: str = '', max_workers: int = 4,
+             max_depth: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Recursively list a subtree, see services.dir_walker.walk_tree.
+        
+        Each page request goes through the cloud123 rate limiter, so
+        `max_workers` only bounds how many requests wait in parallel.
+        
+        Args:
+            dir_id: Folder to walk, '0' for root
+            root_path: Path of `dir_id`, used as prefix of parentPath
+            max_workers: Max concurrent page requests
+            max_depth: Don't descend below this depth
+        
+        Yields:
+            Dicts with id, name, isDir, size, sha1, md5 (etag), pickcode, parentId, parentPath
+        
+        Raises:
+            RuntimeError: A page could not be listed
+        """
+        if dir_id in ('/', ''):
+            dir_id = '0'
+        return walk_tree(self._walk_page, dir_id, root_path, max_workers, max_depth)
+    
     def rename_file(self, file_id: str, new_name: str) -> Dict[str, Any]:
         """
         Rename a file or folder on 123 cloud.
@@ -370,6 +467,85 @@ class Cloud123Service:
                 'error': f'Failed to delete: {str(e)}'
             }
     
+    def _batch_request(self, endpoint: str, items: List[Any], batch_size: int,
+                       payload: Callable[[List[Any]], Dict[str, Any]],
+                       describe: Callable[[Any], Dict[str, Any]]) -> Dict[str, Any]:
+        """POST `endpoint` once per chunk of `items`, see utils.batching.run_in_batches."""
+        def call(chunk):
+            result = self._make_api_request('POST', endpoint, json_data=payload(chunk))
+            return None if result.get('success') else result.get('error', 'Unknown API error')
+        
+        return run_in_batches(items, batch_size, call, describe)
+    
+    def move_files(self, file_ids: List[str], target_dir_id: str) -> Dict[str, Any]:
+        """
+        Move many files or folders to one directory on 123 cloud.
+        
+        Args:
+            file_ids: File or folder IDs
+            target_dir_id: Target directory ID
+        
+        Returns:
+            Dict with success flag, per-id results ({'fileId', 'success', 'error'?})
+            and succeeded / failed counts
+        """
+        try:
+            file_ids = list(dict.fromkeys(str(int(file_id)) for file_id in file_ids))
+            target = int(target_dir_id)
+        except (TypeError, ValueError):
+            return {'success': False, 'error': 'Invalid file or directory ID'}
+        
+        return self._batch_request(
+            '/api/v1/file/move', file_ids, self.FILE_OP_BATCH_SIZE,
+            lambda chunk: {'fileIds': [int(file_id) for file_id in chunk], 'toParentFileId': target},
+            lambda file_id: {'fileId': file_id}
+        )
+    
+    def rename_files(self, renames: List[Tuple[str, str]]) -> Dict[str, Any]:
+        """
+        Rename many files or folders on 123 cloud.
+        
+        Args:
+            renames: (file_id, new_name) pairs
+        
+        Returns:
+            Dict with success flag, per-id results ({'fileId', 'newName', 'success', 'error'?})
+            and succeeded / failed counts
+        """
+        try:
+            renames = [(str(int(file_id)), new_name) for file_id, new_name in renames]
+        except (TypeError, ValueError):
+            return {'success': False, 'error': 'Invalid file ID'}
+        
+        # 批量重命名: renameList 每项为 "fileId|新文件名"
+        return self._batch_request(
+            '/api/v1/file/rename', renames, self.RENAME_BATCH_SIZE,
+            lambda chunk: {'renameList': [f'{file_id}|{new_name}' for file_id, new_name in chunk]},
+            lambda pair: {'fileId': pair[0], 'newName': pair[1]}
+        )
+    
+    def delete_files(self, file_ids: List[str]) -> Dict[str, Any]:
+        """
+        Delete many files or folders from 123 cloud (move to trash).
+        
+        Args:
+            file_ids: File or folder IDs
+        
+        Returns:
+            Dict with success flag, per-id results ({'fileId', 'success', 'error'?})
+            and succeeded / failed counts
+        """
+        try:
+            file_ids = list(dict.fromkeys(str(int(file_id)) for file_id in file_ids))
+        except (TypeError, ValueError):
+            return {'success': False, 'error': 'Invalid file ID'}
+        
+        return self._batch_request(
+            '/api/v1/file/trash', file_ids, self.FILE_OP_BATCH_SIZE,
+            lambda chunk: {'fileIds': [int(file_id) for file_id in chunk]},
+            lambda file_id: {'fileId': file_id}
+        )
+    
     def get_download_link(self, file_id: str) -> Dict[str, Any]:
         """
         Get direct download link for a file.
@@ -445,6 +621,72 @@ class Cloud123Service:
                 'error': f'Failed to create offline task: {str(e)}'
             }
     
+    # Open API offline progress status -> our task status
+    OFFLINE_STATUS_MAP = {
+        0: 'downloading',  # 进行中
+        1: 'failed',       # 下载失败
+        2: 'completed',    # 下载成功
+        3: 'downloading',  # 重试中
+    }
+    
+    def _fetch_offline_progress(self, task_id: str) -> Dict[str, Any]:
+        """Query /api/v1/offline/download/process for one task."""
+        try:
+            task_key = int(task_id)
+        except (TypeError, ValueError):
+            task_key = task_id
+        result = self._make_api_request('GET', '/api/v1/offline/download/process', params={'taskID': task_key})
+        if not result.get('success'):
+            return result
+        
+        data = result.get('data') or {}
+        try:
+            progress = int(float(data.get('process') or 0))
+        except (TypeError, ValueError):
+            progress = 0
+        return {
+            'success': True,
+            'data': {
+                'status': self.OFFLINE_STATUS_MAP.get(data.get('status'), 'pending'),
+                'progress': max(0, min(progress, 100)),
+                # The open API reports no speed
+                'speed': None
+            }
+        }
+    
+    def get_offline_task_statuses(self, task_ids: List[str]) -> Dict[str, Any]:
+        """
+        Get the status of several offline tasks.
+        
+        The open API only has a per-task progress endpoint, so this issues
+        one request per task; each goes through the cloud123 rate limiter.
+        A missing access token fails the whole batch without further calls.
+        
+        Args:
+            task_ids: Task IDs from 123
+        
+        Returns:
+            Dict with success flag and {task_id: {status, progress, speed}};
+            tasks whose query failed are left out
+        """
+        if task_ids and not self._get_access_token():
+            return {
+                'success': False,
+                'error': 'No valid access token. Please configure OAuth credentials.'
+            }
+        
+        statuses = {}
+        for task_id in task_ids:
+            result = self._fetch_offline_progress(task_id)
+            if result.get('success'):
+                statuses[str(task_id)] = result['data']
+            else:
+                logger.warning(f'Failed to get 123 offline task {task_id}: {result.get("error")}')
+        return {
+            'success': True,
+            'data': statuses
+        }
+    
     def get_offline_task_status(self, task_id: str) -> Dict[str, Any]:
         """
         Get status of an offline task from 123 cloud.
@@ -456,83 +698,13 @@ class Cloud123Service:
             Dict with task status, progress, and speed
         """
         try:
-            client = self._get_authenticated_client()
-            
-            # Try various possible method names
-            if hasattr(client, 'list_offline_tasks'):
-                tasks = client.list_offline_tasks()
-            elif hasattr(client, 'offline') and hasattr(client.offline, 'list'):
-                tasks = client.offline.list()
-            else:
-                return {
-                    'success': False,
-                    'error': 'Offline task status not supported'
-                }
-            
-            # Find the task by ID
-            task_info = None
-            for task in tasks:
-                if isinstance(task, dict):
-                    if task.get('task_id') == task_id or task.get('info_hash') == task_id or task.get('id') == task_id:
-                        task_info = task
-                        break
-                elif hasattr(task, 'task_id'):
-                    if getattr(task, 'task_id', None) == task_id or getattr(task, 'info_hash', None) == task_id:
-                        task_info = {
-                            'status': getattr(task, 'status', None),
-                            'progress': getattr(task, 'progress', None) or getattr(task, 'percentDone', None),
-                            'speed': getattr(task, 'speed', None) or getattr(task, 'rateDownload', None),
-                        }
-                        break
-            
-            if not task_info:
+            result = self._fetch_offline_progress(task_id)
+            if not result.get('success'):
                 return {
                     'success': False,
-                    'error': f'Task {task_id} not found'
+                    'error': f'Task {task_id} not found: {result.get("error")}'
                 }
-            
-            # Map status to our enum
-            status_map = {
-                '1': 'downloading',
-                '2': 'completed',
-                '-1': 'failed',
-                'downloading': 'downloading',
-                'completed': 'completed',
-                'failed': 'failed',
-                'seeding': 'completed',
-                'paused': 'pending',
-            }
-            
-            raw_status = task_info.get('status', '0')
-            status = status_map.get(str(raw_status), 'pending')
-            
-            # Get progress (0-100)
-            progress = task_info.get('progress', 0) or task_info.get('percentDone', 0)
-            if isinstance(progress, float) and progress <= 1.0:
-                progress = int(progress * 100)
-            else:
-                progress = int(progress)
-            
-            # Get speed (bytes/sec)
-            speed = task_info.get('speed', 0) or task_info.get('rateDownload', 0)
-            if speed:
-                speed = float(speed)
-            
-            return {
-                'success': True,
-                'data': {
-                    'status': status,
-                    'progress': progress,
-                    'speed': speed
-                }
-            }
-        
-        except (ImportError, ValueError) as e:
-            logger.warning(f'Failed to get task status: {str(e)}')
-            return {
-                'success': False,
-                'error': str(e)
-            }
+            return result
         except Exception as e:
             logger.error(f'Failed to get offline task status: {str(e)}')
             return {
@@ -0,0 +1,263 @@
+import os
+import json
+import time
+import zlib
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from models.app_data import DirCacheEntry, DirCacheItem
+from models.database import session_scope
+
+logger = logging.getLogger(__name__)
+
+# Directory caches by provider ('115'), set up by configure_dir_cache()
+_caches: Dict[str, 'DirectoryCache'] = {}
+
+
+class DirectoryCache:
+    """
+    Persistent cache of directory listings in appdata.db.
+    
+    A listing younger than `ttl` is served as-is; up to `ttl + stale_ttl`
+    it is served stale while a background thread fetches a fresh copy
+    (stale-while-revalidate); older listings are fetched live. Rows survive
+    restarts and are shared by all workers, so the cache is warm right away.
+    Mutations invalidate the affected parents through dir_cache_items.
+    Each listing remembers the account (cookie fingerprint) it was fetched
+    with and is only served to that account.
+    """
+    
+    def __init__(self, session_factory, provider: str = '115', ttl: float = 60, stale_ttl: float = 600):
+        """
+        Initialize cache.
+        
+        Args:
+            session_factory: Session factory for appdata.db
+            provider: Cloud the listings belong to
+            ttl: Seconds a listing is served without revalidation
+            stale_ttl: Further seconds a listing is served while revalidating
+        """
+        self.session_factory = session_factory
+        self.provider = provider
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._refreshing = set()
+        self._refreshing_lock = threading.Lock()
+        self._last_prune = time.time()
+    
+    @staticmethod
+    def _pack(children: List[Dict[str, Any]]) -> bytes:
+        return zlib.compress(json.dumps(children, ensure_ascii=False, separators=(',', ':')).encode())
+    
+    @staticmethod
+    def _unpack(blob: bytes) -> List[Dict[str, Any]]:
+        return json.loads(zlib.decompress(blob).decode())
+    
+    def get(self, cid: str, account: Optional[str] = None) -> Optional[Tuple[List[Dict[str, Any]], float]]:
+        """Cached children of `cid` fetched by `account` and their age in seconds, or None."""
+        with session_scope(self.session_factory) as session:
+            entry = session.get(DirCacheEntry, (self.provider, cid))
+            if entry is None or entry.account != account:
+                return None
+            return self._unpack(entry.children), time.time() - entry.fetched_at
+    
+    def put(self, cid: str, children: List[Dict[str, Any]], account: Optional[str] = None):
+        """Store a live listing of `cid` and remember each child's parent."""
+        with session_scope(self.session_factory) as session:
+            session.merge(DirCacheEntry(
+                provider=self.provider, cid=cid, children=self._pack(children), fetched_at=time.time(),
+                account=account
+            ))
+            session.query(DirCacheItem).filter(
+                DirCacheItem.provider == self.provider,
+                DirCacheItem.parent_cid == cid
+            ).delete(synchronize_session=False)
+            # One executemany upsert; an item moved here from another cached folder is re-parented
+            items = {
+                child['id']: {'provider': self.provider, 'item_id': child['id'], 'parent_cid': cid}
+                for child in children if child.get('id')
+            }
+            if items:
+                insert = postgresql.insert if session.get_bind().dialect.name == 'postgresql' else sqlite.insert
+                statement = insert(DirCacheItem)
+                session.execute(statement.on_conflict_do_update(
+                    index_elements=['provider', 'item_id'],
+                    set_={'parent_cid': statement.excluded.parent_cid}
+                ), list(items.values()))
+    
+    def invalidate(self, *cids: str):
+        """Forget the listings of `cids` (next read is live)."""
+        cids = [cid for cid in cids if cid]
+        if not cids:
+            return
+        with session_scope(self.session_factory) as session:
+            session.query(DirCacheEntry).filter(
+                DirCacheEntry.provider == self.provider,
+                DirCacheEntry.cid.in_(cids)
+            ).delete(synchronize_session=False)
+    
+    def invalidate_tree(self, *cids: str):
+        """
+        Forget the listings of `cids` and of every cached folder below them
+        (e.g. after a folder was deleted), following dir_cache_items down.
+        """
+        seen = set()
+        level = {cid for cid in cids if cid}
+        with session_scope(self.session_factory) as session:
+            while level:
+                seen |= level
+                children = session.query(DirCacheItem.item_id).filter(
+                    DirCacheItem.provider == self.provider,
+                    DirCacheItem.parent_cid.in_(level)
+                ).all()
+                level = {item_id for (item_id,) in children} - seen
+            if not seen:
+                return
+            session.query(DirCacheEntry).filter(
+                DirCacheEntry.provider == self.provider,
+                DirCacheEntry.cid.in_(seen)
+            ).delete(synchronize_session=False)
+            session.query(DirCacheItem).filter(
+                DirCacheItem.provider == self.provider,
+                DirCacheItem.parent_cid.in_(seen)
+            ).delete(synchronize_session=False)
+    
+    def invalidate_item(self, item_id: str) -> Optional[str]:
+        """
+        Forget the listing that contains `item_id`.
+        
+        Returns:
+            The parent cid, if the item was known
+        """
+        with session_scope(self.session_factory) as session:
+            item = session.get(DirCacheItem, (self.provider, item_id))
+            parent_cid = item.parent_cid if item else None
+            if item:
+                session.delete(item)
+        self.invalidate(parent_cid)
+        return parent_cid
+    
+    def clear(self):
+        """Forget every listing of this provider (e.g. after logout or an account switch)."""
+        with session_scope(self.session_factory) as session:
+            session.query(DirCacheEntry).filter(
+                DirCacheEntry.provider == self.provider
+            ).delete(synchronize_session=False)
+            session.query(DirCacheItem).filter(
+                DirCacheItem.provider == self.provider
+            ).delete(synchronize_session=False)
+    
+    def prune(self) -> int:
+        """
+        Delete listings too old to be served at all, and the parent links of
+        listings that are gone (expired or invalidated).
+        
+        Returns:
+            Number of listings deleted
+        """
+        cutoff = time.time() - self.ttl - self.stale_ttl
+        with session_scope(self.session_factory) as session:
+            pruned = session.query(DirCacheEntry).filter(
+                DirCacheEntry.provider == self.provider,
+                DirCacheEntry.fetched_at < cutoff
+            ).delete(synchronize_session=False)
+            cached = select(DirCacheEntry.cid).where(DirCacheEntry.provider == self.provider)
+            session.query(DirCacheItem).filter(
+                DirCacheItem.provider == self.provider,
+                DirCacheItem.parent_cid.notin_(cached)
+            ).delete(synchronize_session=False)
+            return pruned
+    
+    def get_or_load(self, cid: str, loader: Callable[[], Dict[str, Any]], refresh: bool = False,
+                    account: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Serve `cid` from the cache, falling back to `loader` (a live listing).
+        
+        Args:
+            cid: Directory ID
+            loader: Returns {'success': ..., 'data': [entries]}
+            refresh: Skip the cache and fetch live
+            account: Login the listing belongs to; other accounts' listings are ignored
+        
+        Returns:
+            The loader's result shape, with 'cached' / 'stale' flags on hits
+        """
+        if not refresh:
+            try:
+                cached = self.get(cid, account)
+            except Exception as e:
+                logger.warning(f'Directory cache read failed for {cid}: {str(e)}')
+                cached = None
+            if cached is not None:
+                children, age = cached
+                if age < self.ttl:
+                    return {'success': True, 'data': children, 'cached': True}
+                if age < self.ttl + self.stale_ttl:
+                    self._revalidate(cid, loader, account)
+                    return {'success': True, 'data': children, 'cached': True, 'stale': True}
+        
+        return self._load(cid, loader, account)
+    
+    def _load(self, cid: str, loader: Callable[[], Dict[str, Any]], account: Optional[str]) -> Dict[str, Any]:
+        result = loader()
+        if result.get('success'):
+            try:
+                self.put(cid, result.get('data') or [], account)
+                self._prune_periodically()
+            except Exception as e:
+                logger.warning(f'Directory cache write failed for {cid}: {str(e)}')
+        return result
+    
+    def _prune_periodically(self):
+        """Prune once per ttl + stale_ttl, piggybacking on live loads."""
+        now = time.time()
+        if now - self._last_prune < self.ttl + self.stale_ttl:
+            return
+        self._last_prune = now
+        self.prune()
+    
+    def _revalidate(self, cid: str, loader: Callable[[], Dict[str, Any]], account: Optional[str]):
+        """Refresh `cid` in the background; one refresh per directory at a time."""
+        with self._refreshing_lock:
+            if cid in self._refreshing:
+                return
+            self._refreshing.add(cid)
+        
+        def refresh():
+            try:
+                self._load(cid, loader, account)
+            except Exception as e:
+                logger.warning(f'Directory cache refresh failed for {cid}: {str(e)}')
+            finally:
+                with self._refreshing_lock:
+                    self._refreshing.discard(cid)
+        
+        threading.Thread(target=refresh, daemon=True).start()
+
+
+def configure_dir_cache(session_factory) -> DirectoryCache:
+    """
+    Create the 115 directory cache from environment (DIR_CACHE_TTL, DIR_CACHE_STALE_TTL).
+    
+    Args:
+        session_factory: Session factory for appdata.db
+    """
+    cache = DirectoryCache(
+        session_factory,
+        provider='115',
+        ttl=float(os.environ.get('DIR_CACHE_TTL', '60')),
+        stale_ttl=float(os.environ.get('DIR_CACHE_STALE_TTL', '600'))
+    )
+    try:
+        cache.prune()
+    except Exception as e:
+        logger.warning(f'Failed to prune directory cache: {str(e)}')
+    _caches['115'] = cache
+    return cache
+
+
+def get_dir_cache(provider: str) -> Optional[DirectoryCache]:
+    """Get a configured directory cache, or None when caching is not set up."""
+    return _caches.get(provider)
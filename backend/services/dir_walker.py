@@ -0,0 +1,60 @@
+import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# list_page(dir_id, cursor) -> (normalized entries, next cursor or None); cursor None = first page
+ListPage = Callable[[str, Any], Tuple[List[Dict[str, Any]], Any]]
+
+
+def walk_tree(list_page: ListPage, root_id: str = '0', root_path: str = '',
+              max_workers: int = 4, max_depth: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Recursively walk a cloud directory tree, yielding entries as pages arrive.
+    
+    Up to `max_workers` pages (of sibling or nested folders) are fetched
+    concurrently; the provider's rate limiter still paces the actual calls.
+    Only the frontier of unvisited folders (id + path) is kept in memory,
+    never the listed entries themselves.
+    
+    Args:
+        list_page: Fetches one page of a folder, see ListPage
+        root_id: Folder to start from (not yielded itself)
+        root_path: Path of the root folder, prefixed to every parentPath
+        max_workers: Max concurrent page requests
+        max_depth: Don't descend below this depth (1 = root's children only)
+    
+    Yields:
+        Entries as returned by list_page plus 'parentPath'
+    
+    Raises:
+        Exception: The first error of list_page; pending requests are cancelled
+    """
+    # Folders waiting for their first page: (id, path, depth); LIFO keeps the frontier small
+    pending: List[Tuple[str, str, int]] = [(root_id, root_path.rstrip('/'), 1)]
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='dir-walk')
+    running = {}
+    try:
+        while pending or running:
+            while pending and len(running) < max_workers:
+                folder_id, path, depth = pending.pop()
+                future = executor.submit(list_page, folder_id, None)
+                running[future] = (folder_id, path, depth)
+            
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                folder_id, path, depth = running.pop(future)
+                entries, next_cursor = future.result()
+                if next_cursor is not None:
+                    # Next page of the same folder goes out before we yield this one
+                    running[executor.submit(list_page, folder_id, next_cursor)] = (folder_id, path, depth)
+                for entry in entries:
+                    entry['parentPath'] = path or '/'
+                    if entry.get('isDir') and (max_depth is None or depth < max_depth):
+                        pending.append((entry['id'], f"{path}/{entry['name']}", depth + 1))
+                    yield entry
+    finally:
+        for future in running:
+            future.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
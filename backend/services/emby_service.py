@@ -1,6 +1,7 @@
 import requests
 import time
 from persistence.store import DataStore
+from persistence.config_store import EmbySettings
 from typing import Dict, Any, List
 
 
@@ -11,19 +12,18 @@ class EmbyService:
         self.store = store
         self.timeout = 10
     
-    def _get_config(self) -> Dict[str, Any]:
+    def _get_config(self) -> EmbySettings:
         """Get Emby configuration from store."""
         try:
-            config = self.store.get_config()
-            return config.get('emby', {})
+            return self.store.get_compiled_config().emby
         except Exception:
-            return {}
+            return EmbySettings.from_dict({})
     
     def test_connection(self) -> Dict[str, Any]:
         """Test connection to Emby server."""
         config = self._get_config()
-        server_url = config.get('serverUrl', '').strip()
-        api_key = config.get('apiKey', '').strip()
+        server_url = config.server_url
+        api_key = config.api_key
         
         if not server_url or not api_key:
             return {
@@ -93,16 +93,16 @@ class EmbyService:
         ]
         """
         config = self._get_config()
-        server_url = config.get('serverUrl', '').rstrip('/')
-        api_key = config.get('apiKey', '').strip()
+        server_url = config.server_url
+        api_key = config.api_key
         
         if not server_url or not api_key:
             return {'success': False, 'data': [], 'error': 'Emby未配置'}
         
         # 获取 TMDB 配置
-        full_config = self.store.get_config()
-        tmdb_api_key = full_config.get('tmdb', {}).get('apiKey', '').strip()
-        tmdb_lang = full_config.get('tmdb', {}).get('language', 'zh-CN')
+        tmdb = self.store.get_compiled_config().tmdb
+        tmdb_api_key = tmdb.api_key
+        tmdb_lang = tmdb.language
         
         missing_data = []
         
@@ -241,8 +241,8 @@ class EmbyService:
             library_id: 可选，指定要刷新的库ID，为空则刷新全部
         """
         config = self._get_config()
-        server_url = config.get('serverUrl', '').strip()
-        api_key = config.get('apiKey', '').strip()
+        server_url = config.server_url
+        api_key = config.api_key
         
         if not server_url or not api_key:
             return {
@@ -287,8 +287,8 @@ class EmbyService:
             item_type: 项目类型 (Movie, Series, Episode, etc.)
         """
         config = self._get_config()
-        server_url = config.get('serverUrl', '').strip()
-        api_key = config.get('apiKey', '').strip()
+        server_url = config.server_url
+        api_key = config.api_key
         
         if not server_url or not api_key:
             return {
@@ -366,8 +366,8 @@ class EmbyService:
             item_id: Emby 项目ID
         """
         config = self._get_config()
-        server_url = config.get('serverUrl', '').strip()
-        api_key = config.get('apiKey', '').strip()
+        server_url = config.server_url
+        api_key = config.api_key
         
         if not server_url or not api_key:
             return {
@@ -503,8 +503,8 @@ class EmbyService:
             包含媒体流信息的字典
         """
         config = self._get_config()
-        server_url = config.get('serverUrl', '').strip()
-        api_key = config.get('apiKey', '').strip()
+        server_url = config.server_url
+        api_key = config.api_key
         
         if not server_url or not api_key:
             return {
@@ -0,0 +1,203 @@
+import os
+import json
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+from models.database import session_scope
+from models.outbox_event import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+# Topics
+OFFLINE_TASK_COMPLETED = 'offline_task.completed'
+OFFLINE_TASK_FAILED = 'offline_task.failed'
+
+
+class EventBus:
+    """In-process publish/subscribe; handlers run synchronously in publish()."""
+    
+    def __init__(self):
+        self._handlers: Dict[str, List[Callable[[Dict[str, Any]], None]]] = {}
+        self._lock = threading.Lock()
+    
+    def subscribe(self, topic: str, handler: Callable[[Dict[str, Any]], None]):
+        """Register a handler for a topic."""
+        with self._lock:
+            self._handlers.setdefault(topic, []).append(handler)
+    
+    def publish(self, topic: str, payload: Dict[str, Any]) -> int:
+        """
+        Call every handler of `topic` with `payload`.
+        
+        Returns:
+            Number of handlers called
+        
+        Raises:
+            Exception: The first handler error, after all handlers have run
+        """
+        with self._lock:
+            handlers = list(self._handlers.get(topic, ()))
+        error = None
+        for handler in handlers:
+            try:
+                handler(payload)
+            except Exception as e:
+                logger.error(f'Event handler for {topic} failed: {str(e)}')
+                error = error or e
+        if error:
+            raise error
+        return len(handlers)
+
+
+def enqueue_event(session, topic: str, aggregate_id: Optional[str], payload: Dict[str, Any]):
+    """
+    Add an outbox event to `session`; it commits (or rolls back) together
+    with the caller's state change.
+    """
+    session.add(OutboxEvent(
+        topic=topic,
+        aggregate_id=aggregate_id,
+        payload=json.dumps(payload, ensure_ascii=False)
+    ))
+
+
+class OutboxDispatcher:
+    """
+    Background job delivering outbox events to the event bus.
+    
+    Events are delivered in id order, at least once: a row is marked
+    processed only after all handlers succeeded, so events survive
+    restarts. Failed deliveries are retried with exponential backoff and
+    given up after `max_attempts`. notify() wakes the dispatcher right away,
+    `interval` is only the fallback for events written by other workers.
+    """
+    
+    def __init__(self, session_factory, event_bus: EventBus, interval: float = 5,
+                 batch_size: int = 100, max_attempts: int = 5, retention_hours: int = 24):
+        """
+        Initialize dispatcher.
+        
+        Args:
+            session_factory: Session factory for secrets.db (outbox_events)
+            event_bus: Bus to publish events to
+            interval: Max seconds between outbox scans
+            batch_size: Events read per scan
+            max_attempts: Deliveries tried before an event is given up
+            retention_hours: Delete processed events older than this
+        """
+        self.session_factory = session_factory
+        self.event_bus = event_bus
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retention_hours = retention_hours
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+        self._wake_event = threading.Event()
+    
+    def start(self):
+        """Start the dispatcher thread."""
+        if self.running:
+            logger.warning('Outbox dispatcher already running')
+            return
+        
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+        logger.info(f'Started outbox dispatcher with {self.interval}s interval')
+    
+    def stop(self):
+        """Stop the dispatcher thread."""
+        if not self.running:
+            return
+        
+        self.running = False
+        self._wake_event.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+        logger.info('Stopped outbox dispatcher')
+    
+    def notify(self):
+        """Wake the dispatcher: new events were committed."""
+        self._wake_event.set()
+    
+    def _loop(self):
+        while self.running:
+            self._wake_event.clear()
+            try:
+                while self.dispatch_pending() == self.batch_size and self.running:
+                    pass
+                self.purge_processed()
+            except Exception as e:
+                logger.error(f'Outbox dispatcher error: {str(e)}')
+            self._wake_event.wait(self.interval)
+    
+    def dispatch_pending(self, now: datetime = None) -> int:
+        """
+        Deliver one batch of due events.
+        
+        Returns:
+            Number of events read
+        """
+        now = now or datetime.now()
+        with session_scope(self.session_factory) as session:
+            events = session.query(OutboxEvent).filter(
+                OutboxEvent.processed_at.is_(None),
+                OutboxEvent.available_at <= now
+            ).order_by(OutboxEvent.id).limit(self.batch_size).all()
+        
+        for event in events:
+            error = None
+            try:
+                self.event_bus.publish(event.topic, json.loads(event.payload))
+            except Exception as e:
+                error = str(e)
+            self._record_delivery(event, error)
+        return len(events)
+    
+    def _record_delivery(self, event: OutboxEvent, error: Optional[str]):
+        with session_scope(self.session_factory) as session:
+            row = session.get(OutboxEvent, event.id)
+            if row is None:
+                return
+            row.attempts = (row.attempts or 0) + 1
+            now = datetime.now()
+            if error is None:
+                row.processed_at = now
+                row.last_error = None
+            elif row.attempts >= self.max_attempts:
+                logger.error(f'Giving up outbox event {row.id} ({row.topic}) after {row.attempts} attempts: {error}')
+                row.processed_at = now
+                row.last_error = error
+            else:
+                row.last_error = error
+                row.available_at = now + timedelta(seconds=2 ** row.attempts)
+    
+    def purge_processed(self, now: datetime = None) -> int:
+        """Delete events processed more than retention_hours ago."""
+        cutoff = (now or datetime.now()) - timedelta(hours=self.retention_hours)
+        with session_scope(self.session_factory) as session:
+            return session.query(OutboxEvent).filter(
+                OutboxEvent.processed_at < cutoff
+            ).delete(synchronize_session=False)
+
+
+def create_outbox_dispatcher(session_factory, event_bus: EventBus) -> OutboxDispatcher:
+    """
+    Create and configure outbox dispatcher from environment.
+    
+    Args:
+        session_factory: Session factory for secrets.db
+        event_bus: Bus to publish events to
+    
+    Returns:
+        Configured OutboxDispatcher instance
+    """
+    return OutboxDispatcher(
+        session_factory,
+        event_bus,
+        interval=float(os.environ.get('OUTBOX_DISPATCH_INTERVAL', '5')),
+        max_attempts=int(os.environ.get('OUTBOX_MAX_ATTEMPTS', '5')),
+        retention_hours=int(os.environ.get('OUTBOX_RETENTION_HOURS', '24'))
+    )
@@ -3,8 +3,8 @@
 
 import json
 from typing import Optional, List, Dict, Any
-from sqlalchemy.orm import Session
 from sqlalchemy import or_
+from models.database import session_scope
 
 
 class KeywordStore:
@@ -39,43 +39,37 @@ class KeywordStore:
         """
         from models.recognition_keyword import RecognitionKeyword
         
-        session = self.session_factory()
         try:
-            # Check if keyword already exists
-            existing = session.query(RecognitionKeyword).filter(
-                RecognitionKeyword.keyword == keyword
-            ).first()
-            
-            if existing:
-                # Update existing record
-                existing.match_count += 1
-                if normalized and normalized != existing.normalized:
-                    existing.normalized = normalized
-                if tmdb_id:
-                    existing.tmdb_id = tmdb_id
-                if extra_info:
-                    existing.extra_info = json.dumps(extra_info, ensure_ascii=False)
-                session.commit()
-                return {'success': True, 'data': existing.to_dict(), 'created': False}
-            else:
-                # Create new record
-                new_keyword = RecognitionKeyword(
-                    keyword=keyword,
-                    normalized=normalized,
-                    media_type=media_type,
-                    tmdb_id=tmdb_id,
-                    source=source,
-                    extra_info=json.dumps(extra_info, ensure_ascii=False) if extra_info else None
-                )
-                session.add(new_keyword)
-                session.commit()
-                session.refresh(new_keyword)
-                return {'success': True, 'data': new_keyword.to_dict(), 'created': True}
+            with session_scope(self.session_factory) as session:
+                # Check if keyword already exists
+                record = session.query(RecognitionKeyword).filter(
+                    RecognitionKeyword.keyword == keyword
+                ).first()
+                created = record is None
+                
+                if record:
+                    # Update existing record
+                    record.match_count += 1
+                    if normalized and normalized != record.normalized:
+                        record.normalized = normalized
+                    if tmdb_id:
+                        record.tmdb_id = tmdb_id
+                    if extra_info:
+                        record.extra_info = json.dumps(extra_info, ensure_ascii=False)
+                else:
+                    # Create new record
+                    record = RecognitionKeyword(
+                        keyword=keyword,
+                        normalized=normalized,
+                        media_type=media_type,
+                        tmdb_id=tmdb_id,
+                        source=source,
+                        extra_info=json.dumps(extra_info, ensure_ascii=False) if extra_info else None
+                    )
+                    session.add(record)
+            return {'success': True, 'data': record.to_dict(), 'created': created}
         except Exception as e:
-            session.rollback()
             return {'success': False, 'error': str(e)}
-        finally:
-            session.close()
     
     def find_keyword(self, keyword: str) -> Optional[Dict[str, Any]]:
         """
@@ -89,14 +83,11 @@ class KeywordStore:
         """
         from models.recognition_keyword import RecognitionKeyword
         
-        session = self.session_factory()
-        try:
+        with session_scope(self.session_factory) as session:
             result = session.query(RecognitionKeyword).filter(
                 RecognitionKeyword.keyword == keyword
             ).first()
             return result.to_dict() if result else None
-        finally:
-            session.close()
     
     def search_keywords(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
         """
@@ -111,8 +102,7 @@ class KeywordStore:
         """
         from models.recognition_keyword import RecognitionKeyword
         
-        session = self.session_factory()
-        try:
+        with session_scope(self.session_factory) as session:
             results = session.query(RecognitionKeyword).filter(
                 or_(
                     RecognitionKeyword.keyword.ilike(f'%{query}%'),
@@ -120,8 +110,6 @@ class KeywordStore:
                 )
             ).order_by(RecognitionKeyword.match_count.desc()).limit(limit).all()
             return [r.to_dict() for r in results]
-        finally:
-            session.close()
     
     def get_most_used(self, limit: int = 50, media_type: str = None) -> List[Dict[str, Any]]:
         """
@@ -136,15 +124,12 @@ class KeywordStore:
         """
         from models.recognition_keyword import RecognitionKeyword
         
-        session = self.session_factory()
-        try:
+        with session_scope(self.session_factory) as session:
             query = session.query(RecognitionKeyword)
             if media_type:
                 query = query.filter(RecognitionKeyword.media_type == media_type)
             results = query.order_by(RecognitionKeyword.match_count.desc()).limit(limit).all()
             return [r.to_dict() for r in results]
-        finally:
-            session.close()
     
     def delete_keyword(self, keyword_id: int) -> Dict[str, Any]:
         """
@@ -158,21 +143,17 @@ class KeywordStore:
         """
         from models.recognition_keyword import RecognitionKeyword
         
-        session = self.session_factory()
         try:
-            keyword = session.query(RecognitionKeyword).filter(
-                RecognitionKeyword.id == keyword_id
-            ).first()
-            if keyword:
-                session.delete(keyword)
-                session.commit()
-                return {'success': True, 'message': 'Keyword deleted'}
+            with session_scope(self.session_factory) as session:
+                keyword = session.query(RecognitionKeyword).filter(
+                    RecognitionKeyword.id == keyword_id
+                ).first()
+                if keyword:
+                    session.delete(keyword)
+                    return {'success': True, 'message': 'Keyword deleted'}
             return {'success': False, 'error': 'Keyword not found'}
         except Exception as e:
-            session.rollback()
             return {'success': False, 'error': str(e)}
-        finally:
-            session.close()
     
     def bulk_import(self, keywords: List[Dict[str, str]], source: str = 'import') -> Dict[str, Any]:
         """
@@ -225,8 +206,7 @@ class KeywordStore:
         from models.recognition_keyword import RecognitionKeyword
         from sqlalchemy import func
         
-        session = self.session_factory()
-        try:
+        with session_scope(self.session_factory) as session:
             total = session.query(func.count(RecognitionKeyword.id)).scalar()
             movie_count = session.query(func.count(RecognitionKeyword.id)).filter(
                 RecognitionKeyword.media_type == 'movie'
@@ -245,5 +225,3 @@ class KeywordStore:
                 'aiGenerated': ai_count,
                 'manual': total - ai_count
             }
-        finally:
-            session.close()
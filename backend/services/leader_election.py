@@ -0,0 +1,167 @@
+import os
+import uuid
+import time
+import socket
+import logging
+import threading
+from typing import Callable, Optional
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
+from models.app_data import Lease
+from models.database import session_scope
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderElector:
+    """
+    Lease-based leader election over a row in appdata.db.
+    
+    Every worker runs one elector; the one holding the lease runs the
+    background singletons (offline task poller, archiver). The leader
+    renews the lease every `renew_interval` seconds; if it dies, the lease
+    runs out after `ttl` seconds and another worker takes over.
+    """
+    
+    def __init__(self, session_factory, name: str = 'background-jobs', ttl: float = 30,
+                 renew_interval: float = None, on_elected: Callable[[], None] = None,
+                 on_demoted: Callable[[], None] = None):
+        """
+        Initialize elector.
+        
+        Args:
+            session_factory: Session factory for appdata.db
+            name: Lease name; processes competing for the same name elect one leader
+            ttl: Lease duration in seconds
+            renew_interval: Seconds between acquire/renew attempts (default ttl / 3)
+            on_elected: Called when this process becomes leader
+            on_demoted: Called when this process loses or releases leadership
+        """
+        self.session_factory = session_factory
+        self.name = name
+        self.ttl = ttl
+        self.renew_interval = renew_interval or ttl / 3
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.holder_id = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self.is_leader = False
+        self.lease_expires_at = 0.0
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+    
+    def try_acquire(self) -> Optional[bool]:
+        """
+        Acquire or renew the lease.
+        
+        Returns:
+            True if this process holds it, False if another does,
+            None if the database could not be reached
+        """
+        now = time.time()
+        try:
+            with session_scope(self.session_factory) as session:
+                # Atomic compare-and-set: take the lease if it is ours or has expired
+                result = session.execute(
+                    update(Lease)
+                    .where(Lease.name == self.name,
+                           or_(Lease.holder == self.holder_id, Lease.expires_at < now))
+                    .values(holder=self.holder_id, expires_at=now + self.ttl)
+                )
+                if not result.rowcount:
+                    if session.get(Lease, self.name) is not None:
+                        return False
+                    session.add(Lease(name=self.name, holder=self.holder_id, expires_at=now + self.ttl))
+            self.lease_expires_at = now + self.ttl
+            return True
+        except IntegrityError:
+            # Another process inserted the row first
+            return False
+        except Exception as e:
+            logger.warning(f'Failed to acquire lease {self.name}: {str(e)}')
+            return None
+    
+    def release(self):
+        """Give up the lease so another process can take over immediately."""
+        try:
+            with session_scope(self.session_factory) as session:
+                session.execute(
+                    update(Lease)
+                    .where(Lease.name == self.name, Lease.holder == self.holder_id)
+                    .values(holder=None, expires_at=0)
+                )
+        except Exception as e:
+            logger.warning(f'Failed to release lease {self.name}: {str(e)}')
+    
+    def tick(self):
+        """One election round: acquire/renew and fire callbacks on changes."""
+        acquired = self.try_acquire()
+        if acquired is None:
+            # Database hiccup: a leader keeps running until its lease would have run out
+            acquired = self.is_leader and time.time() < self.lease_expires_at
+        if acquired and not self.is_leader:
+            self.is_leader = True
+            logger.info(f'Elected leader for {self.name} ({self.holder_id})')
+            self._call(self.on_elected)
+        elif not acquired and self.is_leader:
+            self.is_leader = False
+            logger.warning(f'Lost leadership for {self.name} ({self.holder_id})')
+            self._call(self.on_demoted)
+    
+    def start(self):
+        """Start the election thread."""
+        if self.running:
+            return
+        
+        self.running = True
+        self._stop_event.clear()
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        """Stop electing; a leader stops its singletons and releases the lease."""
+        if not self.running:
+            return
+        
+        self.running = False
+        self._stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+        if self.is_leader:
+            self.is_leader = False
+            self._call(self.on_demoted)
+            self.release()
+    
+    def _loop(self):
+        while self.running:
+            self.tick()
+            self._stop_event.wait(self.renew_interval)
+    
+    @staticmethod
+    def _call(callback):
+        if not callback:
+            return
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f'Leader callback failed: {str(e)}')
+
+
+def create_leader_elector(session_factory, on_elected=None, on_demoted=None) -> LeaderElector:
+    """
+    Create and configure leader elector from environment.
+    
+    Args:
+        session_factory: Session factory for appdata.db
+        on_elected: Called when this process becomes leader
+        on_demoted: Called when this process loses leadership
+    
+    Returns:
+        Configured LeaderElector instance
+    """
+    return LeaderElector(
+        session_factory,
+        ttl=float(os.environ.get('LEADER_LEASE_TTL', '30')),
+        on_elected=on_elected,
+        on_demoted=on_demoted
+    )
@@ -1,19 +1,85 @@
+import os
 import uuid
+import base64
 import logging
-from typing import Dict, Any, List, Optional
-from datetime import datetime
-from sqlalchemy.orm import Session
+from typing import Callable, Dict, Any, List, Optional, Tuple
+from datetime import datetime, timedelta
+from sqlalchemy import bindparam, func, or_, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from models.database import session_scope
 from models.offline_task import OfflineTask, TaskStatus
+from services.event_bus import OFFLINE_TASK_COMPLETED, OFFLINE_TASK_FAILED, enqueue_event
+from utils.content_key import content_key
 from p115_bridge import get_p115_service, P115Service
 from persistence.store import DataStore
 
 logger = logging.getLogger(__name__)
 
+# Statuses the poller keeps syncing with 115
+ACTIVE_STATUSES = (TaskStatus.PENDING, TaskStatus.DOWNLOADING)
+
+
+# Status transitions written by sync_all() that emit an outbox event
+TRANSITION_TOPICS = {
+    TaskStatus.COMPLETED: OFFLINE_TASK_COMPLETED,
+    TaskStatus.FAILED: OFFLINE_TASK_FAILED,
+}
+
+
+# Adaptive polling bounds (seconds)
+MIN_POLL_DELAY = int(os.environ.get('OFFLINE_TASK_MIN_POLL_DELAY', '5'))
+MAX_POLL_DELAY = int(os.environ.get('OFFLINE_TASK_MAX_POLL_DELAY', '600'))
+
+
+def next_poll_delay(status: TaskStatus,
+                    progress: int,
+                    previous_progress: int,
+                    seconds_since_change: float,
+                    previous_delay: Optional[int],
+                    min_delay: int = MIN_POLL_DELAY,
+                    max_delay: int = MAX_POLL_DELAY) -> Optional[int]:
+    """
+    Seconds until a task should be polled again (None once it is terminal).
+    
+    - Near completion: poll at the minimum delay so completion is seen quickly.
+    - Making progress: estimate the ETA from the progress rate since the last
+      change and poll about four times before it.
+    - Queued or stalled: exponential backoff from the previous delay, so a
+      freshly created task is checked after min_delay * 2, then less often.
+    """
+    if status not in ACTIVE_STATUSES:
+        return None
+    progress = progress or 0
+    if progress >= 95:
+        return min_delay
+    gained = progress - (previous_progress or 0)
+    if gained > 0 and seconds_since_change > 0:
+        eta = (100 - progress) * seconds_since_change / gained
+        return int(max(min_delay, min(max_delay, eta / 4)))
+    return int(max(min_delay, min(max_delay, (previous_delay or min_delay) * 2)))
+
+
+def encode_cursor(task: OfflineTask) -> str:
+    """Opaque keyset cursor for the (created_at, id) position of `task`."""
+    raw = f'{task.created_at.isoformat()}|{task.id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str):
+    """Inverse of encode_cursor; raises ValueError for malformed cursors."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, task_id = raw.split('|', 1)
+        return datetime.fromisoformat(created_at), task_id
+    except Exception:
+        raise ValueError(f'Invalid cursor: {cursor}')
+
 
 class OfflineTaskService:
     """Service for managing offline tasks with 115 cloud integration."""
     
-    def __init__(self, session_factory, data_store: DataStore, p115_service: P115Service = None, cloud115_service=None):
+    def __init__(self, session_factory, data_store: DataStore, p115_service: P115Service = None, cloud115_service=None,
+                 cloud123_service=None):
         """
         Initialize OfflineTaskService.
         
@@ -22,36 +88,110 @@ class OfflineTaskService:
             data_store: DataStore instance for config
             p115_service: P115Service instance (optional, uses global if None)
             cloud115_service: Cloud115Service instance (optional, for real 115 API calls)
+            cloud123_service: Cloud123Service instance (optional, for syncing 123 tasks)
         """
         self.session_factory = session_factory
         self.data_store = data_store
         self.p115_service = p115_service or get_p115_service()
         self.cloud115_service = cloud115_service
+        self.cloud123_service = cloud123_service
+        # Called after sync_all() committed outbox events (wakes the dispatcher)
+        self.on_events_enqueued: Optional[Callable[[], None]] = None
+        # Called after new tasks were stored (wakes the poller for their first sync)
+        self.on_task_created: Optional[Callable[[], None]] = None
         self._qps_throttle = 1  # Default QPS from config
         self._update_qps_throttle()
+        self.data_store.subscribe_config('cloud115.qps', self._on_qps_changed)
     
     def _update_qps_throttle(self):
         """Update QPS throttle from config."""
         try:
-            config = self.data_store.get_config()
-            self._qps_throttle = config.get('cloud115', {}).get('qps', 1)
+            self._qps_throttle = self.data_store.get_compiled_config().cloud115.qps
         except Exception as e:
             logger.warning(f'Failed to update QPS throttle: {str(e)}')
             self._qps_throttle = 1
     
+    def _on_qps_changed(self, config):
+        """Config subscriber: pick up a new cloud115.qps without re-reading config."""
+        self._qps_throttle = config.cloud115.qps
+        logger.info(f'115 QPS throttle updated to {self._qps_throttle}')
+    
+    def find_active_task(self, source_url: str, provider: str = '115') -> Optional[OfflineTask]:
+        """
+        Find the pending/downloading task for the same content as `source_url`
+        on `provider` (a 115 and a 123 download of one link are separate tasks).
+        
+        Args:
+            source_url: URL or magnet link
+            provider: '115' or '123'
+        
+        Returns:
+            The active task, or None if there is none or the link has no content key
+        """
+        key = content_key(source_url)
+        if not key:
+            return None
+        with session_scope(self.session_factory) as session:
+            return self._active_by_content_key(session, [key], provider).get(key)
+    
+    @staticmethod
+    def _active_by_content_key(session, keys: List[str], provider: str = '115') -> Dict[str, OfflineTask]:
+        """Active tasks of `provider` by content key (served by idx_active_provider_content_key)."""
+        if not keys:
+            return {}
+        tasks = session.query(OfflineTask).filter(
+            OfflineTask.provider == provider,
+            OfflineTask.content_key.in_(keys),
+            OfflineTask.status.in_(ACTIVE_STATUSES)
+        ).all()
+        return {task.content_key: task for task in tasks}
+    
+    def _insert_or_attach(self, task: OfflineTask) -> Tuple[OfflineTask, bool]:
+        """
+        Insert `task`; if another worker stored an active task for the same
+        content first, return that one instead.
+        
+        Returns:
+            (task, duplicate) tuple
+        """
+        try:
+            with session_scope(self.session_factory) as session:
+                session.add(task)
+            return task, False
+        except IntegrityError:
+            if not task.content_key:
+                raise
+            with session_scope(self.session_factory) as session:
+                existing = self._active_by_content_key(
+                    session, [task.content_key], task.provider or '115'
+                ).get(task.content_key)
+            if not existing:
+                raise
+            return existing, True
+    
     def create_task(self, 
                    source_url: str,
                    save_cid: str,
                    requested_by: str,
-                   requested_chat: str) -> Dict[str, Any]:
+                   requested_chat: str,
+                   p115_task_id: Optional[str] = None,
+                   provider: str = '115',
+                   p123_task_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Create a new offline task.
         
+        A link whose content (info-hash / ed2k hash) already has an active
+        task on the same provider attaches to that task instead: the result carries the existing
+        task and `duplicate: True`.
+        
         Args:
             source_url: URL or magnet link
             save_cid: Target folder CID in 115
             requested_by: Telegram user ID
             requested_chat: Telegram chat ID
+            p115_task_id: 115 task ID if the task was already submitted
+            provider: '115' or '123'
+            p123_task_id: 123 task ID if the task was already submitted to 123
         
         Returns:
             Dict with success flag and task data or error
@@ -63,27 +203,46 @@ class OfflineTaskService:
             if not save_cid:
                 return {'success': False, 'error': 'save_cid is required'}
             
+            key = content_key(source_url)
+            existing = self.find_active_task(source_url, provider) if key else None
+            if existing:
+                logger.info(f'Attached {source_url} to active offline task {existing.id}')
+                return {
+                    'success': True,
+                    'data': existing.to_dict(),
+                    'duplicate': True
+                }
+            
             # Create task record
             task_id = str(uuid.uuid4())
             task = OfflineTask(
                 id=task_id,
                 source_url=source_url,
+                content_key=key,
                 save_cid=save_cid,
+                provider=provider,
+                p115_task_id=p115_task_id,
+                p123_task_id=p123_task_id,
                 status=TaskStatus.PENDING,
                 progress=0,
                 requested_by=requested_by,
                 requested_chat=requested_chat,
             )
             
-            session: Session = self.session_factory()
-            session.add(task)
-            session.commit()
+            task, duplicate = self._insert_or_attach(task)
             
-            # Convert to dict before closing session
             task_dict = task.to_dict()
-            session.close()
+            
+            if duplicate:
+                logger.info(f'Attached {source_url} to active offline task {task.id}')
+                return {
+                    'success': True,
+                    'data': task_dict,
+                    'duplicate': True
+                }
             
             logger.info(f'Created offline task {task_id} for URL {source_url}')
+            self._notify_task_created()
             
             return {
                 'success': True,
@@ -96,45 +255,292 @@ class OfflineTaskService:
                 'error': f'Failed to create task: {str(e)}'
             }
     
+    # Upper bound for one create_tasks() call
+    MAX_BATCH_SIZE = 500
+    
+    def create_tasks(self,
+                     source_urls: List[str],
+                     save_cid: str,
+                     requested_by: str,
+                     requested_chat: str) -> Dict[str, Any]:
+        """
+        Create many offline tasks at once.
+        
+        Links for the same content (within the batch or already active) attach
+        to one task. Local rows for the rest are inserted first, in one
+        transaction; only links that produced a new row are then sent to 115
+        in as few calls as possible (when a Cloud115Service is configured).
+        
+        Args:
+            source_urls: URLs or magnet links
+            save_cid: Target folder CID in 115
+            requested_by: Telegram user ID
+            requested_chat: Telegram chat ID
+        
+        Returns:
+            Dict with success flag and one result per input URL (same order)
+        """
+        if not save_cid:
+            return {'success': False, 'error': 'save_cid is required'}
+        if not source_urls:
+            return {'success': False, 'error': 'source_urls is required'}
+        if len(source_urls) > self.MAX_BATCH_SIZE:
+            return {'success': False, 'error': f'At most {self.MAX_BATCH_SIZE} URLs per batch'}
+        
+        results: List[Dict[str, Any]] = []
+        unique: Dict[str, int] = {}  # dedupe key -> index of the first occurrence in results
+        duplicates: Dict[int, int] = {}  # index in results -> index of the first occurrence
+        for raw_url in source_urls:
+            url = raw_url.strip() if isinstance(raw_url, str) else ''
+            if not url:
+                results.append({'sourceUrl': raw_url, 'success': False, 'error': 'Empty source URL'})
+                continue
+            key = content_key(url) or url
+            if key in unique:
+                duplicates[len(results)] = unique[key]
+            else:
+                unique[key] = len(results)
+            results.append({'sourceUrl': url, 'contentKey': content_key(url)})
+        
+        try:
+            with session_scope(self.session_factory) as session:
+                active = self._active_by_content_key(
+                    session, [results[i]['contentKey'] for i in unique.values() if results[i]['contentKey']], '115'
+                )
+        except Exception as e:
+            logger.error(f'Failed to look up active offline tasks: {str(e)}')
+            return {'success': False, 'error': f'Failed to create tasks: {str(e)}'}
+        
+        pending = []  # indexes that need a new task
+        for i in unique.values():
+            existing = active.get(results[i]['contentKey'])
+            if existing:
+                results[i].update(success=True, duplicate=True, data=existing.to_dict())
+            else:
+                pending.append(i)
+        
+        # Claim the content locally first: only links that produced a new row go
+        # to 115, so concurrent batches with the same magnet submit it once
+        tasks = {
+            i: OfflineTask(
+                id=str(uuid.uuid4()),
+                source_url=results[i]['sourceUrl'],
+                content_key=results[i]['contentKey'],
+                save_cid=save_cid,
+                provider='115',
+                status=TaskStatus.PENDING,
+                progress=0,
+                requested_by=requested_by,
+                requested_chat=requested_chat,
+            )
+            for i in pending
+        }
+        try:
+            with session_scope(self.session_factory) as session:
+                session.add_all(tasks.values())
+        except IntegrityError:
+            # Another worker stored some of the same content meanwhile: insert one by one
+            for i, task in list(tasks.items()):
+                try:
+                    task, duplicate = self._insert_or_attach(task)
+                except Exception as e:
+                    results[i].update(success=False, error=f'Failed to create task: {str(e)}')
+                    del tasks[i]
+                    continue
+                if duplicate:
+                    results[i].update(success=True, duplicate=True, data=task.to_dict())
+                    del tasks[i]
+        except Exception as e:
+            logger.error(f'Failed to store offline tasks: {str(e)}')
+            for i in tasks:
+                results[i].update(success=False, error=f'Failed to create task: {str(e)}')
+            self._resolve_duplicates(results, duplicates)
+            return {'success': False, 'error': f'Failed to create tasks: {str(e)}', 'data': self._strip_keys(results)}
+        
+        if self.cloud115_service and tasks:
+            submitted = self.cloud115_service.create_offline_tasks(
+                [results[i]['sourceUrl'] for i in tasks], save_cid
+            )
+            if submitted.get('success'):
+                outcomes = dict(zip(tasks, submitted['data']))
+            else:
+                outcomes = {i: {'success': False, 'error': submitted.get('error')} for i in tasks}
+            try:
+                tasks = self._record_submissions(tasks, outcomes)
+            except Exception as e:
+                logger.error(f'Failed to store 115 task ids: {str(e)}')
+                submitted = {'success': False, 'error': f'Failed to create tasks: {str(e)}'}
+                outcomes = {i: submitted for i in tasks}
+            for i, item in outcomes.items():
+                if not item.get('success'):
+                    results[i].update(success=False, error=item.get('error'))
+            if not submitted.get('success'):
+                self._resolve_duplicates(results, duplicates)
+                return {'success': False, 'error': submitted.get('error'), 'data': self._strip_keys(results)}
+        
+        for i, task in tasks.items():
+            results[i].update(success=True, data=task.to_dict())
+        created = len(tasks)
+        self._resolve_duplicates(results, duplicates)
+        
+        logger.info(f'Created {created} offline tasks from a batch of {len(source_urls)} URLs')
+        if created:
+            self._notify_task_created()
+        
+        return {
+            'success': True,
+            'data': self._strip_keys(results),
+            'created': created,
+            'failed': sum(1 for item in results if not item.get('success'))
+        }
+    
+    def _record_submissions(self, tasks: Dict[int, OfflineTask],
+                            outcomes: Dict[int, Dict[str, Any]]) -> Dict[int, OfflineTask]:
+        """
+        Store the 115 task ids of submitted links; claimed rows whose link
+        115 rejected become FAILED (freeing the content for a later retry).
+        
+        Returns:
+            The tasks that were submitted, refreshed from the database
+        """
+        with session_scope(self.session_factory) as session:
+            rows = {
+                task.id: task for task in
+                session.query(OfflineTask).filter(OfflineTask.id.in_([t.id for t in tasks.values()]))
+            }
+            submitted = {}
+            for i, task in tasks.items():
+                row = rows[task.id]
+                if outcomes[i].get('success'):
+                    row.p115_task_id = outcomes[i].get('p115TaskId')
+                    submitted[i] = row
+                else:
+                    row.status = TaskStatus.FAILED
+        return submitted
+    
+    def _notify_task_created(self):
+        if not self.on_task_created:
+            return
+        try:
+            self.on_task_created()
+        except Exception as e:
+            logger.warning(f'Task created callback failed: {str(e)}')
+    
+    @staticmethod
+    def _resolve_duplicates(results: List[Dict[str, Any]], duplicates: Dict[int, int]):
+        """Give in-batch duplicates the outcome of the first link for the same content."""
+        for i, first in duplicates.items():
+            original = results[first]
+            if original.get('success'):
+                results[i].update(success=True, duplicate=True, data=original['data'])
+            else:
+                results[i].update(success=False, duplicate=True, error=original.get('error'))
+    
+    @staticmethod
+    def _strip_keys(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        for item in results:
+            item.pop('contentKey', None)
+        return results
+    
+    @staticmethod
+    def _list_query(session, status: Optional[TaskStatus] = None, requested_by: Optional[str] = None):
+        """Filtered task query; each filter combination is served by a (filter, created_at, id) index."""
+        query = session.query(OfflineTask)
+        if status:
+            query = query.filter(OfflineTask.status == status)
+        if requested_by:
+            query = query.filter(OfflineTask.requested_by == requested_by)
+        return query
+    
+    @staticmethod
+    def _active_tasks_query(session):
+        """Non-terminal tasks already submitted to 115 or 123 (uses idx_status_p1xx_task_id)."""
+        return session.query(OfflineTask).filter(
+            OfflineTask.status.in_(ACTIVE_STATUSES),
+            or_(OfflineTask.p115_task_id.isnot(None), OfflineTask.p123_task_id.isnot(None))
+        )
+    
+    @classmethod
+    def _due_tasks_query(cls, session, now: datetime):
+        """Active tasks whose next_poll_at has passed (uses idx_status_next_poll_at)."""
+        return cls._active_tasks_query(session).filter(
+            or_(OfflineTask.next_poll_at.is_(None), OfflineTask.next_poll_at <= now)
+        )
+    
+    def count_due_tasks(self) -> int:
+        """Number of active tasks whose next poll is due now (poller backlog)."""
+        with session_scope(self.session_factory) as session:
+            return self._due_tasks_query(session, datetime.now()).count()
+    
+    def seconds_until_next_poll(self) -> Optional[float]:
+        """Seconds until the earliest active task is due (0 if overdue, None if nothing to poll)."""
+        with session_scope(self.session_factory) as session:
+            active = self._active_tasks_query(session)
+            if active.filter(OfflineTask.next_poll_at.is_(None)).first() is not None:
+                return 0.0
+            earliest = active.with_entities(func.min(OfflineTask.next_poll_at)).scalar()
+        if earliest is None:
+            return None
+        return max(0.0, (earliest - datetime.now()).total_seconds())
+    
+    @staticmethod
+    def _page(query, cursor: Optional[str], limit: int, offset: int):
+        """Apply newest-first ordering plus keyset (cursor) or offset pagination."""
+        if cursor:
+            created_at, task_id = decode_cursor(cursor)
+            # Row-value comparison lets SQLite seek straight into the index
+            query = query.filter(tuple_(OfflineTask.created_at, OfflineTask.id) < tuple_(created_at, task_id))
+        query = query.order_by(OfflineTask.created_at.desc(), OfflineTask.id.desc())
+        if not cursor and offset:
+            query = query.offset(offset)
+        return query.limit(limit)
+    
     def list_tasks(self,
                    status: Optional[str] = None,
                    requested_by: Optional[str] = None,
                    limit: int = 50,
-                   offset: int = 0) -> Dict[str, Any]:
+                   offset: int = 0,
+                   cursor: Optional[str] = None,
+                   include_total: Optional[bool] = None) -> Dict[str, Any]:
         """
         List offline tasks with optional filtering.
         
+        Pass the previous page's `nextCursor` as `cursor` for keyset
+        pagination, which costs the same for every page; `offset` is kept
+        for older clients.
+        
         Args:
             status: Filter by status
             requested_by: Filter by requesting user
             limit: Maximum number of results
-            offset: Offset for pagination
+            offset: Offset for pagination (ignored when cursor is given)
+            cursor: Keyset cursor from a previous page
+            include_total: Also count all matching rows (default: only without cursor)
         
         Returns:
             Dict with success flag and list of tasks
         """
         try:
-            session: Session = self.session_factory()
-            query = session.query(OfflineTask)
-            
+            status_enum = None
             if status:
                 try:
                     status_enum = TaskStatus(status)
-                    query = query.filter(OfflineTask.status == status_enum)
                 except ValueError:
-                    session.close()
                     return {'success': False, 'error': f'Invalid status: {status}'}
             
-            if requested_by:
-                query = query.filter(OfflineTask.requested_by == requested_by)
-            
-            # Get total count
-            total = query.count()
+            if include_total is None:
+                include_total = not cursor
             
-            # Apply pagination
-            tasks = query.order_by(OfflineTask.created_at.desc()).offset(offset).limit(limit).all()
-            
-            session.close()
+            try:
+                with session_scope(self.session_factory) as session:
+                    query = self._list_query(session, status_enum, requested_by)
+                    
+                    # Get total count
+                    total = query.count() if include_total else None
+                    
+                    tasks = self._page(query, cursor, limit, offset).all()
+            except ValueError as e:
+                return {'success': False, 'error': str(e)}
             
             return {
                 'success': True,
@@ -142,7 +548,8 @@ class OfflineTaskService:
                     'tasks': [task.to_dict() for task in tasks],
                     'total': total,
                     'limit': limit,
-                    'offset': offset
+                    'offset': offset,
+                    'nextCursor': encode_cursor(tasks[-1]) if tasks and len(tasks) == limit else None
                 }
             }
         except Exception as e:
@@ -155,10 +562,8 @@ class OfflineTaskService:
     def get_task(self, task_id: str) -> Optional[OfflineTask]:
         """Get a single task by ID."""
         try:
-            session: Session = self.session_factory()
-            task = session.query(OfflineTask).filter(OfflineTask.id == task_id).first()
-            session.close()
-            return task
+            with session_scope(self.session_factory) as session:
+                return session.query(OfflineTask).filter(OfflineTask.id == task_id).first()
         except Exception as e:
             logger.error(f'Failed to get task {task_id}: {str(e)}')
             return None
@@ -174,30 +579,26 @@ class OfflineTaskService:
             Dict with success flag
         """
         try:
-            session: Session = self.session_factory()
-            task = session.query(OfflineTask).filter(OfflineTask.id == task_id).first()
-            
-            if not task:
-                session.close()
-                return {'success': False, 'error': 'Task not found'}
-            
-            # Try to cancel on 115 if task ID exists
-            if task.p115_task_id:
-                try:
-                    # This would use p115_service to cancel, but without real p115client
-                    # we just update local status
-                    logger.info(f'Would cancel 115 task {task.p115_task_id}')
-                except Exception as e:
-                    logger.warning(f'Failed to cancel 115 task: {str(e)}')
-            
-            # Update local status
-            task.status = TaskStatus.CANCELLED
-            task.updated_at = datetime.now()
-            session.commit()
+            with session_scope(self.session_factory) as session:
+                task = session.query(OfflineTask).filter(OfflineTask.id == task_id).first()
+                
+                if not task:
+                    return {'success': False, 'error': 'Task not found'}
+                
+                # Try to cancel on 115 if task ID exists
+                if task.p115_task_id:
+                    try:
+                        # This would use p115_service to cancel, but without real p115client
+                        # we just update local status
+                        logger.info(f'Would cancel 115 task {task.p115_task_id}')
+                    except Exception as e:
+                        logger.warning(f'Failed to cancel 115 task: {str(e)}')
+                
+                # Update local status
+                task.status = TaskStatus.CANCELLED
+                task.updated_at = datetime.now()
             
-            # Convert to dict before closing session
             task_dict = task.to_dict()
-            session.close()
             
             logger.info(f'Cancelled offline task {task_id}')
             
@@ -223,27 +624,31 @@ class OfflineTaskService:
             Dict with success flag and updated task
         """
         try:
-            session: Session = self.session_factory()
-            task = session.query(OfflineTask).filter(OfflineTask.id == task_id).first()
+            with session_scope(self.session_factory) as session:
+                task = session.query(OfflineTask).filter(OfflineTask.id == task_id).first()
+                
+                if not task:
+                    return {'success': False, 'error': 'Task not found'}
+                
+                if task.status != TaskStatus.FAILED:
+                    return {'success': False, 'error': f'Task status is {task.status.value}, not failed'}
+                
+                # Only one active task per provider and content (idx_active_provider_content_key)
+                if task.content_key:
+                    active = self._active_by_content_key(
+                        session, [task.content_key], self._provider(task)
+                    ).get(task.content_key)
+                    if active:
+                        return {'success': False, 'error': f'Task {active.id} is already downloading this content'}
+                
+                # Reset to pending
+                task.status = TaskStatus.PENDING
+                task.progress = 0
+                task.p115_task_id = None
+                task.p123_task_id = None
+                task.updated_at = datetime.now()
             
-            if not task:
-                session.close()
-                return {'success': False, 'error': 'Task not found'}
-            
-            if task.status != TaskStatus.FAILED:
-                session.close()
-                return {'success': False, 'error': f'Task status is {task.status.value}, not failed'}
-            
-            # Reset to pending
-            task.status = TaskStatus.PENDING
-            task.progress = 0
-            task.p115_task_id = None
-            task.updated_at = datetime.now()
-            session.commit()
-            
-            # Convert to dict before closing session
             task_dict = task.to_dict()
-            session.close()
             
             logger.info(f'Retried offline task {task_id}')
             
@@ -258,67 +663,120 @@ class OfflineTaskService:
                 'error': f'Failed to retry task: {str(e)}'
             }
     
-    def sync_all(self) -> Dict[str, Any]:
+    def sync_all(self, due_only: bool = False) -> Dict[str, Any]:
         """
-        Sync all pending and downloading tasks with 115 API.
+        Sync all pending and downloading tasks with the 115 and 123 APIs.
+        
+        The 115 offline list is fetched once per call (all pages) and every
+        polled task is written with a single bulk UPDATE, so the number of
+        115 calls depends on the number of list pages, not on active tasks.
+        123 tasks are queried through Cloud123Service in the same cycle; each
+        provider's calls draw on its own rate limiter.
+        Each polled task also gets its next_poll_at (see next_poll_delay).
+        Tasks that turn COMPLETED or FAILED get an outbox event in the same
+        transaction, so downstream stages never miss a transition.
+        
+        Args:
+            due_only: Only sync tasks whose next_poll_at has passed (poller);
+                otherwise sync every active task (manual refresh)
         
         Returns:
             Dict with sync statistics
         """
         try:
-            session: Session = self.session_factory()
+            now = datetime.now()
+            with session_scope(self.session_factory) as session:
+                # Get all non-terminal tasks submitted to 115 or 123
+                query = self._due_tasks_query(session, now) if due_only else self._active_tasks_query(session)
+                tasks = query.with_entities(
+                    OfflineTask.id, OfflineTask.provider, OfflineTask.p115_task_id, OfflineTask.p123_task_id,
+                    OfflineTask.status,
+                    OfflineTask.progress, OfflineTask.speed, OfflineTask.updated_at,
+                    OfflineTask.poll_interval
+                ).all()
+            
+            # Skip if no cloud service is available
+            if not (self.cloud115_service or self.cloud123_service) or not tasks:
+                return {
+                    'success': True,
+                    'synced': len(tasks),
+                    'failed': 0,
+                    'total': len(tasks)
+                }
             
-            # Get all non-terminal tasks with p115_task_id
-            tasks = session.query(OfflineTask).filter(
-                OfflineTask.status.in_([TaskStatus.PENDING, TaskStatus.DOWNLOADING]),
-                OfflineTask.p115_task_id.isnot(None)
-            ).all()
+            remote = self._fetch_remote_statuses(tasks)
             
-            synced_count = 0
+            updates = []
+            transitions = {}  # task id -> new terminal status
             failed_count = 0
-            
+            changed_count = 0
             for task in tasks:
-                try:
-                    # Skip if cloud115_service is not available
-                    if not self.cloud115_service:
-                        synced_count += 1
-                        continue
-                    
-                    # Get task status from 115 API
-                    result = self.cloud115_service.get_offline_task_status(task.p115_task_id)
-                    
-                    if result.get('success'):
-                        data = result.get('data', {})
-                        
-                        # Update task with latest info
-                        status_str = data.get('status', 'pending')
-                        if status_str == 'downloading':
-                            task.status = TaskStatus.DOWNLOADING
-                        elif status_str == 'completed':
-                            task.status = TaskStatus.COMPLETED
-                        elif status_str == 'failed':
-                            task.status = TaskStatus.FAILED
-                        elif status_str == 'pending':
-                            task.status = TaskStatus.PENDING
-                        
-                        task.progress = data.get('progress', task.progress)
-                        task.speed = data.get('speed', task.speed)
-                        task.updated_at = datetime.now()
-                        
-                        session.merge(task)
-                        synced_count += 1
-                    else:
-                        logger.warning(f'Failed to get status for task {task.id}: {result.get("error")}')
-                        failed_count += 1
-                    
-                except Exception as e:
-                    logger.warning(f'Failed to sync task {task.id}: {str(e)}')
+                provider = self._provider(task)
+                fetched, statuses = remote.get(provider, (False, {}))
+                data = statuses.get(task.p123_task_id if provider == '123' else task.p115_task_id)
+                if data is None:
+                    if fetched:
+                        logger.warning(f'Failed to get status for task {task.id}: not in {provider} offline list')
                     failed_count += 1
-            
-            session.commit()
-            session.close()
-            
-            logger.info(f'Synced {synced_count} tasks, {failed_count} failed')
+                    data = {}
+                
+                try:
+                    status = TaskStatus(data['status']) if 'status' in data else task.status
+                except ValueError:
+                    status = task.status
+                progress = data.get('progress', task.progress)
+                speed = data.get('speed', task.speed)
+                changed = (status, progress, speed) != (task.status, task.progress, task.speed)
+                changed_count += changed
+                if status != task.status and status in TRANSITION_TOPICS:
+                    transitions[task.id] = status
+                
+                since_change = (now - task.updated_at).total_seconds() if task.updated_at else 0
+                delay = next_poll_delay(status, progress, task.progress, since_change, task.poll_interval)
+                updates.append({
+                    'task_id': task.id,
+                    'new_status': status,
+                    'new_progress': progress,
+                    'new_speed': speed,
+                    # updated_at marks the last change; it feeds the progress-rate estimate
+                    'new_updated_at': now if changed else task.updated_at,
+                    'new_next_poll_at': now + timedelta(seconds=delay) if delay is not None else None,
+                    'new_poll_interval': delay
+                })
+            
+            table = OfflineTask.__table__
+            # One executemany for all polled rows; the status guard keeps
+            # tasks cancelled meanwhile from being switched back
+            stmt = update(table).where(
+                table.c.id == bindparam('task_id'),
+                # executemany can't expand IN (...), so spell it out
+                or_(*(table.c.status == status for status in ACTIVE_STATUSES))
+            ).values(
+                status=bindparam('new_status'),
+                progress=bindparam('new_progress'),
+                speed=bindparam('new_speed'),
+                updated_at=bindparam('new_updated_at'),
+                next_poll_at=bindparam('new_next_poll_at'),
+                poll_interval=bindparam('new_poll_interval')
+            )
+            with session_scope(self.session_factory) as session:
+                session.execute(stmt, updates)
+                if transitions:
+                    # Rows the guarded UPDATE actually moved (not cancelled meanwhile)
+                    moved = session.query(OfflineTask).filter(
+                        OfflineTask.id.in_(list(transitions)),
+                        OfflineTask.updated_at == now
+                    ).all()
+                    for task in moved:
+                        if task.status == transitions[task.id]:
+                            enqueue_event(session, TRANSITION_TOPICS[task.status], task.id, task.to_dict())
+                    transitions = {task.id for task in moved}
+            
+            if transitions and self.on_events_enqueued:
+                self.on_events_enqueued()
+            
+            synced_count = len(tasks) - failed_count
+            logger.info(f'Synced {synced_count} tasks ({changed_count} changed), {failed_count} failed')
             
             return {
                 'success': True,
@@ -333,6 +791,36 @@ class OfflineTaskService:
                 'error': f'Failed to sync tasks: {str(e)}'
             }
     
+    @staticmethod
+    def _provider(task) -> str:
+        """Provider of a task row; rows from before 123 support have none."""
+        return '123' if task.provider == '123' else '115'
+    
+    def _fetch_remote_statuses(self, tasks) -> Dict[str, Tuple[bool, Dict[str, Any]]]:
+        """
+        Fetch remote statuses for the providers present in `tasks`.
+        
+        Returns:
+            {provider: (fetched, {remote_task_id: status dict})}
+        """
+        remote = {}
+        providers = {self._provider(task) for task in tasks}
+        
+        if '115' in providers and self.cloud115_service:
+            result = self.cloud115_service.list_offline_task_statuses()
+            if not result.get('success'):
+                logger.warning(f'Failed to fetch 115 offline list: {result.get("error")}')
+            remote['115'] = (bool(result.get('success')), result.get('data', {}) if result.get('success') else {})
+        
+        if '123' in providers and self.cloud123_service:
+            task_ids = [task.p123_task_id for task in tasks if self._provider(task) == '123' and task.p123_task_id]
+            result = self.cloud123_service.get_offline_task_statuses(task_ids)
+            if not result.get('success'):
+                logger.warning(f'Failed to fetch 123 offline tasks: {result.get("error")}')
+            remote['123'] = (bool(result.get('success')), result.get('data', {}) if result.get('success') else {})
+        
+        return remote
+    
     def delete_task(self, task_id: str) -> Dict[str, Any]:
         """
         Delete a task (soft delete by setting status to CANCELLED).
@@ -344,19 +832,16 @@ class OfflineTaskService:
             Dict with success flag
         """
         try:
-            session: Session = self.session_factory()
-            task = session.query(OfflineTask).filter(OfflineTask.id == task_id).first()
-            
-            if not task:
-                session.close()
-                return {'success': False, 'error': 'Task not found'}
-            
-            # Convert to dict before deleting
-            task_dict = task.to_dict()
-            
-            session.delete(task)
-            session.commit()
-            session.close()
+            with session_scope(self.session_factory) as session:
+                task = session.query(OfflineTask).filter(OfflineTask.id == task_id).first()
+                
+                if not task:
+                    return {'success': False, 'error': 'Task not found'}
+                
+                # Convert to dict before deleting
+                task_dict = task.to_dict()
+                
+                session.delete(task)
             
             logger.info(f'Deleted offline task {task_id}')
             
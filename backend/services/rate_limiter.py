@@ -0,0 +1,166 @@
+import time
+import logging
+from threading import Lock
+from typing import Any, Callable, Dict, Iterable, Optional
+from models.app_data import RateBucket
+from models.database import session_scope
+
+logger = logging.getLogger(__name__)
+
+# Outbound rate limiters by name ('cloud115', 'cloud123'), set up by configure_rate_limiters()
+_limiters: Dict[str, 'TokenBucketLimiter'] = {}
+
+
+class TokenBucketLimiter:
+    """
+    Token bucket shared by all gunicorn workers through a row in appdata.db.
+    
+    Each call reserves one token inside a short BEGIN IMMEDIATE transaction
+    and then sleeps outside of it until its token is due, so concurrent
+    callers in any process queue up at `rate` calls per second. The bucket
+    holds at most max(1, rate) tokens, i.e. one second worth of burst.
+    """
+    
+    def __init__(self, session_factory, name: str, rate_fn: Callable[[], float]):
+        """
+        Initialize limiter.
+        
+        Args:
+            session_factory: Session factory for appdata.db
+            name: Bucket name; limiters with the same name share the budget
+            rate_fn: Returns the current rate in calls per second (<= 0 disables limiting)
+        """
+        self.session_factory = session_factory
+        self.name = name
+        self.rate_fn = rate_fn
+        self._metrics_lock = Lock()
+        self._metrics = {
+            'calls': 0,
+            'throttled': 0,
+            'totalWaitSeconds': 0.0,
+            'maxWaitSeconds': 0.0,
+            'lastWaitSeconds': 0.0,
+            'errors': 0
+        }
+    
+    def _reserve(self, rate: float) -> float:
+        """Take one token (possibly ahead of time); returns seconds to wait for it."""
+        with session_scope(self.session_factory) as session:
+            if session.get_bind().dialect.name == 'sqlite':
+                session.connection().exec_driver_sql('BEGIN IMMEDIATE')
+            now = time.time()
+            capacity = max(1.0, rate)
+            bucket = session.get(RateBucket, self.name)
+            if bucket is None:
+                bucket = RateBucket(name=self.name, tokens=capacity, updated_at=now)
+                session.add(bucket)
+            elapsed = max(0.0, now - bucket.updated_at)
+            tokens = min(capacity, bucket.tokens + elapsed * rate) - 1
+            bucket.tokens = tokens
+            bucket.updated_at = now
+        return -tokens / rate if tokens < 0 else 0.0
+    
+    def acquire(self) -> float:
+        """
+        Block until the next call is allowed.
+        
+        Returns:
+            Seconds waited
+        """
+        try:
+            rate = float(self.rate_fn() or 0)
+        except Exception:
+            rate = 0.0
+        if rate <= 0:
+            self._record(0.0)
+            return 0.0
+        
+        try:
+            wait = self._reserve(rate)
+        except Exception as e:
+            # Fail open: a broken bucket must not take the cloud features down
+            logger.warning(f'Rate limiter {self.name} unavailable: {str(e)}')
+            with self._metrics_lock:
+                self._metrics['errors'] += 1
+            return 0.0
+        
+        if wait > 0:
+            time.sleep(wait)
+        self._record(wait)
+        return wait
+    
+    def _record(self, wait: float):
+        with self._metrics_lock:
+            metrics = self._metrics
+            metrics['calls'] += 1
+            metrics['lastWaitSeconds'] = wait
+            if wait > 0:
+                metrics['throttled'] += 1
+                metrics['totalWaitSeconds'] += wait
+                metrics['maxWaitSeconds'] = max(metrics['maxWaitSeconds'], wait)
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Wait-time metrics for calls made by this process."""
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        try:
+            metrics['qps'] = float(self.rate_fn() or 0)
+        except Exception:
+            metrics['qps'] = None
+        metrics['avgWaitSeconds'] = metrics['totalWaitSeconds'] / metrics['calls'] if metrics['calls'] else 0.0
+        return metrics
+
+
+class RateLimitedProxy:
+    """
+    Wraps an API client so calls to the listed API methods first take a token.
+    
+    `calls` are dotted attribute paths ('fs_files', 'offline.list'); the
+    objects along a path are wrapped so the nested method is throttled too.
+    Every other attribute (properties, helpers, unlisted methods) is
+    returned unwrapped and costs nothing.
+    """
+    
+    def __init__(self, target, limiter: TokenBucketLimiter, calls: Iterable[str], _path: str = ''):
+        self._target = target
+        self._limiter = limiter
+        self._calls = frozenset(calls)
+        self._path = _path
+    
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        path = f'{self._path}.{name}' if self._path else name
+        if path in self._calls or any(call.startswith(path + '.') for call in self._calls):
+            return RateLimitedProxy(attr, self._limiter, self._calls, path)
+        return attr
+    
+    def __call__(self, *args, **kwargs):
+        self._limiter.acquire()
+        return self._target(*args, **kwargs)
+
+
+def configure_rate_limiters(session_factory, data_store) -> Dict[str, TokenBucketLimiter]:
+    """
+    Create the cloud115/cloud123 limiters; rates follow cloudXXX.qps in config.
+    
+    Args:
+        session_factory: Session factory for appdata.db
+        data_store: DataStore providing the compiled config
+    """
+    _limiters['cloud115'] = TokenBucketLimiter(
+        session_factory, 'cloud115', lambda: data_store.get_compiled_config().cloud115.qps
+    )
+    _limiters['cloud123'] = TokenBucketLimiter(
+        session_factory, 'cloud123', lambda: data_store.get_compiled_config().cloud123.qps
+    )
+    return dict(_limiters)
+
+
+def get_rate_limiter(name: str) -> Optional[TokenBucketLimiter]:
+    """Get a configured limiter, or None when limiting is not set up (e.g. scripts)."""
+    return _limiters.get(name)
+
+
+def get_rate_limit_metrics() -> Dict[str, Dict[str, Any]]:
+    """Metrics of all configured limiters."""
+    return {name: limiter.get_metrics() for name, limiter in _limiters.items()}
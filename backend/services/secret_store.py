@@ -1,26 +1,66 @@
 import os
-from cryptography.fernet import Fernet
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from threading import Lock
+from cryptography.fernet import Fernet, MultiFernet, InvalidToken
+from sqlalchemy import update
 from sqlalchemy.orm import Session
-from models.secret import Secret
-from typing import Optional
+from models.database import session_scope
+from models.secret import Secret, SecretMeta
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Version counter bumped on every write; other workers compare it to drop stale cache entries
+VERSION_KEY = 'version'
+# Key rotation: value counts runs, data holds the JSON status of the latest one
+ROTATION_KEY = 'rotation'
+# A running rotation that saved no progress for this long is treated as dead
+ROTATION_STALE_SECONDS = 120
+
+_MISSING = object()
 
 
 class SecretStore:
     """Service for storing and retrieving encrypted secrets."""
     
-    def __init__(self, session_factory):
-        """Initialize SecretStore with session factory."""
+    def __init__(self, session_factory, cache_size: int = None, cache_ttl: float = None,
+                 version_check_interval: float = None):
+        """
+        Initialize SecretStore with session factory.
+        
+        Args:
+            session_factory: SQLAlchemy session factory for secrets.db
+            cache_size: Max decrypted values kept in memory (SECRETS_CACHE_SIZE, default 256)
+            cache_ttl: Seconds a cached value stays valid (SECRETS_CACHE_TTL, default 300)
+            version_check_interval: Min seconds between change-counter lookups
+                (SECRETS_VERSION_CHECK_INTERVAL, default 1); bounds how long a
+                write from another worker can go unnoticed
+        """
         self.session_factory = session_factory
         self._cipher = self._get_cipher()
+        self._cache_size = cache_size if cache_size is not None else int(os.environ.get('SECRETS_CACHE_SIZE', '256'))
+        self._cache_ttl = cache_ttl if cache_ttl is not None else float(os.environ.get('SECRETS_CACHE_TTL', '300'))
+        self._version_check_interval = (
+            version_check_interval if version_check_interval is not None
+            else float(os.environ.get('SECRETS_VERSION_CHECK_INTERVAL', '1'))
+        )
+        # key -> (decrypted value or None, expires_at)
+        self._cache: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._cache_lock = Lock()
+        self._version: Optional[int] = None
+        self._version_checked_at = 0.0
+        # Rotation started by this process (progress itself lives in secrets_meta)
+        self._rotation_thread: Optional[threading.Thread] = None
     
-    def _get_cipher(self) -> Fernet:
-        """Get or create encryption cipher."""
-        encryption_key = os.environ.get('SECRETS_ENCRYPTION_KEY')
-        
-        if not encryption_key:
-            # Generate a default key for development (should be overridden in production)
-            encryption_key = Fernet.generate_key().decode()
-        
+    @staticmethod
+    def _make_fernet(encryption_key) -> Fernet:
+        """Build a Fernet from a base64 key, or derive one from an arbitrary passphrase."""
         # If it's a string, encode it
         if isinstance(encryption_key, str):
             # If it's not already a valid base64 key, generate one from the string
@@ -37,60 +77,403 @@ class SecretStore:
         
         return Fernet(encryption_key)
     
+    def _get_cipher(self) -> MultiFernet:
+        """
+        Get or create encryption cipher.
+        
+        SECRETS_ENCRYPTION_KEY is the primary key used for encryption.
+        SECRETS_ENCRYPTION_KEY_PREVIOUS (comma-separated) lists retired keys
+        that are still accepted for decryption until `start_rotation` has
+        re-encrypted every row with the primary key.
+        """
+        encryption_key = os.environ.get('SECRETS_ENCRYPTION_KEY')
+        
+        if not encryption_key:
+            # Generate a default key for development (should be overridden in production)
+            logger.warning('SECRETS_ENCRYPTION_KEY is not set; using a random key, stored secrets '
+                           'will be unreadable after restart')
+            encryption_key = Fernet.generate_key().decode()
+        
+        self._primary_cipher = self._make_fernet(encryption_key)
+        previous = [
+            self._make_fernet(key.strip())
+            for key in os.environ.get('SECRETS_ENCRYPTION_KEY_PREVIOUS', '').split(',')
+            if key.strip()
+        ]
+        return MultiFernet([self._primary_cipher] + previous)
+    
+    # === Cache ===
+    
+    def _read_version(self, session: Session) -> int:
+        row = session.get(SecretMeta, VERSION_KEY)
+        return row.value if row else 0
+    
+    def _bump_version(self, session: Session) -> int:
+        """Increment the change counter inside the caller's transaction; returns the new value."""
+        result = session.execute(
+            update(SecretMeta).where(SecretMeta.key == VERSION_KEY).values(value=SecretMeta.value + 1)
+        )
+        if result.rowcount == 0:
+            session.add(SecretMeta(key=VERSION_KEY, value=1))
+            return 1
+        return self._read_version(session)
+    
+    def _check_version(self):
+        """Drop the cache if another process changed secrets since the last check."""
+        now = time.monotonic()
+        if now - self._version_checked_at < self._version_check_interval:
+            return
+        try:
+            with session_scope(self.session_factory) as session:
+                version = self._read_version(session)
+        except Exception:
+            self.clear_cache()
+            return
+        with self._cache_lock:
+            if version != self._version:
+                self._cache.clear()
+                self._version = version
+            self._version_checked_at = now
+    
+    def _cache_get(self, key: str):
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return _MISSING
+            value, expires_at = entry
+            if time.monotonic() >= expires_at:
+                del self._cache[key]
+                return _MISSING
+            self._cache.move_to_end(key)
+            return value
+    
+    def _cache_put(self, key: str, value: Optional[str]):
+        if self._cache_size <= 0:
+            return
+        with self._cache_lock:
+            self._cache[key] = (value, time.monotonic() + self._cache_ttl)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+    
+    def _after_local_write(self, values: Dict[str, Optional[str]], new_version: int):
+        """Write-through: refresh our entries; keep the rest only if no other writer slipped in."""
+        with self._cache_lock:
+            if self._version is not None and new_version == self._version + 1:
+                self._version = new_version
+            else:
+                self._cache.clear()
+                self._version_checked_at = 0.0
+        for key, value in values.items():
+            self._cache_put(key, value)
+    
+    def clear_cache(self):
+        """Forget all decrypted values held in memory."""
+        with self._cache_lock:
+            self._cache.clear()
+            self._version = None
+            self._version_checked_at = 0.0
+    
+    # === CRUD ===
+    
     def set_secret(self, key: str, value: str) -> bool:
         """Store or update an encrypted secret."""
         try:
             encrypted_value = self._cipher.encrypt(value.encode()).decode()
             
-            session: Session = self.session_factory()
-            
-            # Check if secret exists
-            existing = session.query(Secret).filter(Secret.key == key).first()
-            
-            if existing:
-                existing.encrypted_value = encrypted_value
-            else:
-                secret = Secret(key=key, encrypted_value=encrypted_value)
-                session.add(secret)
-            
-            session.commit()
-            session.close()
+            with session_scope(self.session_factory) as session:
+                # Check if secret exists
+                existing = session.query(Secret).filter(Secret.key == key).first()
+                
+                if existing:
+                    existing.encrypted_value = encrypted_value
+                else:
+                    secret = Secret(key=key, encrypted_value=encrypted_value)
+                    session.add(secret)
+                
+                new_version = self._bump_version(session)
+            self._after_local_write({key: value}, new_version)
             return True
         except Exception as e:
             return False
     
     def get_secret(self, key: str) -> Optional[str]:
-        """Retrieve and decrypt a secret."""
+        """Retrieve and decrypt a secret (served from the in-memory cache when fresh)."""
+        self._check_version()
+        cached = self._cache_get(key)
+        if cached is not _MISSING:
+            return cached
+        
         try:
-            session: Session = self.session_factory()
-            secret = session.query(Secret).filter(Secret.key == key).first()
-            session.close()
+            with session_scope(self.session_factory) as session:
+                encrypted_value = session.query(Secret.encrypted_value).filter(Secret.key == key).scalar()
             
-            if not secret:
+            if encrypted_value is None:
+                self._cache_put(key, None)
                 return None
             
-            decrypted_value = self._cipher.decrypt(secret.encrypted_value.encode()).decode()
+            decrypted_value = self._cipher.decrypt(encrypted_value.encode()).decode()
+            self._cache_put(key, decrypted_value)
             return decrypted_value
         except Exception as e:
             return None
     
+    def get_secrets(self, keys: Iterable[str]) -> Dict[str, Optional[str]]:
+        """
+        Retrieve several secrets with a single query.
+        
+        Returns:
+            Dict mapping every requested key to its decrypted value (None if missing)
+        """
+        self._check_version()
+        result: Dict[str, Optional[str]] = {}
+        missing = []
+        for key in dict.fromkeys(keys):
+            cached = self._cache_get(key)
+            if cached is _MISSING:
+                missing.append(key)
+            else:
+                result[key] = cached
+        
+        if not missing:
+            return result
+        
+        try:
+            with session_scope(self.session_factory) as session:
+                rows = session.query(Secret.key, Secret.encrypted_value).filter(Secret.key.in_(missing)).all()
+        except Exception as e:
+            result.update({key: None for key in missing})
+            return result
+        
+        found = dict(rows)
+        for key in missing:
+            encrypted_value = found.get(key)
+            if encrypted_value is None:
+                value = None
+            else:
+                try:
+                    value = self._cipher.decrypt(encrypted_value.encode()).decode()
+                except Exception:
+                    result[key] = None
+                    continue
+            self._cache_put(key, value)
+            result[key] = value
+        return result
+    
+    def set_secrets(self, secrets: Dict[str, str]) -> bool:
+        """Store or update several secrets in one transaction."""
+        if not secrets:
+            return True
+        try:
+            encrypted = {key: self._cipher.encrypt(value.encode()).decode() for key, value in secrets.items()}
+            
+            with session_scope(self.session_factory) as session:
+                existing = {
+                    secret.key: secret
+                    for secret in session.query(Secret).filter(Secret.key.in_(list(encrypted))).all()
+                }
+                for key, encrypted_value in encrypted.items():
+                    if key in existing:
+                        existing[key].encrypted_value = encrypted_value
+                    else:
+                        session.add(Secret(key=key, encrypted_value=encrypted_value))
+                
+                new_version = self._bump_version(session)
+            
+            self._after_local_write(dict(secrets), new_version)
+            return True
+        except Exception as e:
+            return False
+    
     def delete_secret(self, key: str) -> bool:
         """Delete a secret."""
         try:
-            session: Session = self.session_factory()
-            session.query(Secret).filter(Secret.key == key).delete()
-            session.commit()
-            session.close()
+            with session_scope(self.session_factory) as session:
+                session.query(Secret).filter(Secret.key == key).delete()
+                new_version = self._bump_version(session)
+            self._after_local_write({key: None}, new_version)
             return True
         except Exception as e:
             return False
     
     def secret_exists(self, key: str) -> bool:
-        """Check if a secret exists."""
+        """Check if a secret exists (never decrypts)."""
+        self._check_version()
+        cached = self._cache_get(key)
+        if cached is not _MISSING:
+            return cached is not None
+        
         try:
-            session: Session = self.session_factory()
-            exists = session.query(Secret).filter(Secret.key == key).first() is not None
-            session.close()
-            return exists
+            with session_scope(self.session_factory) as session:
+                return session.query(Secret.key).filter(Secret.key == key).first() is not None
         except Exception as e:
             return False
+    
+    def fingerprint(self, keys: Iterable[str]) -> Optional[str]:
+        """
+        Fingerprint the stored ciphertexts of `keys` without decrypting.
+        
+        Fernet tokens embed a random IV, so every write changes the
+        fingerprint; it is only meant for cache validators such as ETags.
+        """
+        try:
+            with session_scope(self.session_factory) as session:
+                rows = session.query(Secret.key, Secret.encrypted_value).filter(
+                    Secret.key.in_(list(keys))
+                ).order_by(Secret.key).all()
+            digest = hashlib.sha1()
+            for key, encrypted_value in rows:
+                digest.update(f'{key}={encrypted_value};'.encode())
+            return digest.hexdigest()
+        except Exception as e:
+            return None
+    
+    # === Key rotation ===
+    
+    def _load_rotation_status(self, session: Session) -> Optional[Dict[str, Any]]:
+        """Rotation status as stored by whichever worker runs (or ran) it."""
+        row = session.get(SecretMeta, ROTATION_KEY)
+        if row is None or not row.data:
+            return None
+        status = json.loads(row.data)
+        if status['state'] == 'running':
+            updated_at = datetime.fromisoformat(status['updatedAt'])
+            if (datetime.now() - updated_at).total_seconds() > ROTATION_STALE_SECONDS:
+                # The worker running it exited; a new rotation may be started
+                status.update(state='failed', error='Rotation stopped reporting progress')
+        return status
+    
+    def _save_rotation_status(self, session: Session, status: Dict[str, Any]):
+        """Store `status` unless another run has taken over the rotation row."""
+        status['updatedAt'] = datetime.now().isoformat()
+        row = session.get(SecretMeta, ROTATION_KEY)
+        if row is None:
+            session.add(SecretMeta(key=ROTATION_KEY, value=status['run'], data=json.dumps(status)))
+        elif row.value == status['run']:
+            row.data = json.dumps(status)
+    
+    def start_rotation(self, batch_size: int = 100, pause: float = 0.05) -> Dict[str, Any]:
+        """
+        Re-encrypt all secrets with the primary key in a background thread.
+        
+        Rows are processed in key order, `batch_size` per transaction, with
+        a short pause between batches so request threads are not starved.
+        Each row is updated only if its ciphertext is unchanged since it was
+        read, so concurrent set_secret calls are never overwritten. All
+        workers must be started with the same primary and previous keys.
+        
+        Progress is stored in secrets_meta, so every worker reports it and
+        only one rotation runs at a time across workers.
+        
+        Returns:
+            Current rotation status (see `get_rotation_status`)
+        
+        Raises:
+            RuntimeError: A rotation is already running (in any worker)
+        """
+        with session_scope(self.session_factory) as session:
+            # Serialize concurrent starts from different workers
+            if session.get_bind().dialect.name == 'sqlite':
+                session.connection().exec_driver_sql('BEGIN IMMEDIATE')
+            current = self._load_rotation_status(session)
+            if current and current['state'] == 'running':
+                raise RuntimeError('Secret key rotation already running')
+            row = session.get(SecretMeta, ROTATION_KEY)
+            if row is not None:
+                row.value += 1
+            status = {
+                'run': row.value if row is not None else 1,
+                'state': 'running',
+                'total': 0,
+                'processed': 0,
+                'rotated': 0,
+                'failed': 0,
+                'startedAt': datetime.now().isoformat(),
+                'finishedAt': None,
+                'error': None
+            }
+            self._save_rotation_status(session, status)
+        
+        self._rotation_thread = threading.Thread(
+            target=self._rotate_all, args=(dict(status), batch_size, pause), daemon=True
+        )
+        self._rotation_thread.start()
+        return self._public_rotation_status(status)
+    
+    @staticmethod
+    def _public_rotation_status(status: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: value for key, value in status.items() if key not in ('run', 'updatedAt')}
+    
+    def get_rotation_status(self) -> Dict[str, Any]:
+        """Return progress of the current or last key rotation, whichever worker runs it."""
+        with session_scope(self.session_factory) as session:
+            status = self._load_rotation_status(session)
+        return self._public_rotation_status(status) if status else {'state': 'idle'}
+    
+    def wait_for_rotation(self, timeout: float = None) -> Dict[str, Any]:
+        """Block until a rotation started by this process finishes (mainly for scripts and tests)."""
+        thread = self._rotation_thread
+        if thread:
+            thread.join(timeout)
+        return self.get_rotation_status()
+    
+    def _save_rotation_progress(self, status: Dict[str, Any]):
+        with session_scope(self.session_factory) as session:
+            self._save_rotation_status(session, status)
+    
+    def _rotate_batch(self, status: Dict[str, Any], after_key: Optional[str], batch_size: int) -> List[str]:
+        """Rotate one batch of rows after `after_key`; returns the keys processed."""
+        with session_scope(self.session_factory) as session:
+            query = session.query(Secret.key, Secret.encrypted_value).order_by(Secret.key)
+            if after_key is not None:
+                query = query.filter(Secret.key > after_key)
+            rows = query.limit(batch_size).all()
+            
+            for key, encrypted_value in rows:
+                token = encrypted_value.encode()
+                try:
+                    self._primary_cipher.decrypt(token)
+                    continue  # already encrypted with the primary key
+                except InvalidToken:
+                    pass
+                try:
+                    new_value = self._cipher.rotate(token).decode()
+                except InvalidToken:
+                    logger.warning(f'Secret {key} cannot be decrypted with any configured key')
+                    status['failed'] += 1
+                    continue
+                session.execute(
+                    update(Secret)
+                    .where(Secret.key == key, Secret.encrypted_value == encrypted_value)
+                    .values(encrypted_value=new_value)
+                )
+                status['rotated'] += 1
+            
+            # Progress commits together with the batch it describes
+            status['processed'] += len(rows)
+            self._save_rotation_status(session, status)
+        
+        return [key for key, _ in rows]
+    
+    def _rotate_all(self, status: Dict[str, Any], batch_size: int, pause: float):
+        try:
+            with session_scope(self.session_factory) as session:
+                status['total'] = session.query(Secret.key).count()
+                self._save_rotation_status(session, status)
+            
+            after_key = None
+            while True:
+                keys = self._rotate_batch(status, after_key, batch_size)
+                if len(keys) < batch_size:
+                    break
+                after_key = keys[-1]
+                time.sleep(pause)
+            
+            status.update(state='failed' if status['failed'] else 'completed', finishedAt=datetime.now().isoformat())
+            self._save_rotation_progress(status)
+            logger.info(f"Secret key rotation finished: {status['rotated']} rotated, "
+                        f"{status['failed']} undecryptable of {status['total']}")
+        except Exception as e:
+            logger.error(f'Secret key rotation failed: {str(e)}')
+            status.update(state='failed', error=str(e), finishedAt=datetime.now().isoformat())
+            self._save_rotation_progress(status)
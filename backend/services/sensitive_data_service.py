@@ -1,8 +1,7 @@
 # services/sensitive_data_service.py
 # 敏感数据管理服务 - 统一管理所有加密存储的敏感信息
 
-import json
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 from services.secret_store import SecretStore
 
 
@@ -43,6 +42,36 @@ class SensitiveKeys:
     WEBDAV_PASSWORD = 'webdav_password'
 
 
+# 配置中的敏感字段路径 -> SecretStore key
+SENSITIVE_CONFIG_FIELDS: Tuple[Tuple[Tuple[str, ...], str], ...] = (
+    (('telegram', 'botToken'), SensitiveKeys.TELEGRAM_BOT_TOKEN),
+    (('tmdb', 'apiKey'), SensitiveKeys.TMDB_API_KEY),
+    (('emby', 'apiKey'), SensitiveKeys.EMBY_API_KEY),
+    (('organize', 'ai', 'apiKey'), SensitiveKeys.AI_API_KEY),
+    (('openList', 'password'), SensitiveKeys.OPENLIST_PASSWORD),
+    (('proxy', 'password'), SensitiveKeys.PROXY_PASSWORD),
+    (('strm', 'webdav', 'password'), SensitiveKeys.WEBDAV_PASSWORD),
+)
+
+
+def _get_parent(config: Dict[str, Any], path: Tuple[str, ...]) -> Optional[Dict[str, Any]]:
+    """Return the dict holding the last path segment, or None if any level is missing."""
+    node = config
+    for part in path[:-1]:
+        node = node.get(part) if isinstance(node, dict) else None
+    return node if isinstance(node, dict) else None
+
+
+def _set_copied(result: Dict[str, Any], source: Dict[str, Any], path: Tuple[str, ...], value: Any):
+    """Set a nested value in `result`, copying only the dicts along `path` (copy-on-write)."""
+    node, src = result, source
+    for part in path[:-1]:
+        if node.get(part) is src.get(part):
+            node[part] = dict(src[part])
+        node, src = node[part], src[part]
+    node[path[-1]] = value
+
+
 class SensitiveDataService:
     """Service for managing all sensitive data with encryption."""
     
@@ -131,85 +160,32 @@ class SensitiveDataService:
         """
         从配置中提取敏感字段并存储到 SecretStore。
         返回清理后的配置（敏感字段被移除或替换为占位符）。
+        所有字段在一个事务中写入；只复制被修改的嵌套字典。
         """
-        cleaned_config = json.loads(json.dumps(config))  # Deep copy
-        
-        # Telegram bot token
-        if cleaned_config.get('telegram', {}).get('botToken'):
-            self.set_telegram_bot_token(cleaned_config['telegram']['botToken'])
-            cleaned_config['telegram']['botToken'] = '[ENCRYPTED]'
-        
-        # TMDB API key
-        if cleaned_config.get('tmdb', {}).get('apiKey'):
-            self.set_tmdb_api_key(cleaned_config['tmdb']['apiKey'])
-            cleaned_config['tmdb']['apiKey'] = '[ENCRYPTED]'
-        
-        # Emby API key
-        if cleaned_config.get('emby', {}).get('apiKey'):
-            self.set_emby_api_key(cleaned_config['emby']['apiKey'])
-            cleaned_config['emby']['apiKey'] = '[ENCRYPTED]'
+        cleaned_config = dict(config)
+        to_store = {}
         
-        # AI API key
-        if cleaned_config.get('organize', {}).get('ai', {}).get('apiKey'):
-            self.set_ai_api_key(cleaned_config['organize']['ai']['apiKey'])
-            cleaned_config['organize']['ai']['apiKey'] = '[ENCRYPTED]'
-        
-        # OpenList password
-        if cleaned_config.get('openList', {}).get('password'):
-            self.set_openlist_password(cleaned_config['openList']['password'])
-            cleaned_config['openList']['password'] = '[ENCRYPTED]'
-        
-        # Proxy password
-        if cleaned_config.get('proxy', {}).get('password'):
-            self.set_proxy_password(cleaned_config['proxy']['password'])
-            cleaned_config['proxy']['password'] = '[ENCRYPTED]'
-        
-        # WebDAV password
-        if cleaned_config.get('strm', {}).get('webdav', {}).get('password'):
-            self.set_webdav_password(cleaned_config['strm']['webdav']['password'])
-            cleaned_config['strm']['webdav']['password'] = '[ENCRYPTED]'
+        for path, secret_key in SENSITIVE_CONFIG_FIELDS:
+            parent = _get_parent(config, path)
+            value = parent.get(path[-1]) if parent else None
+            if value:
+                to_store[secret_key] = value
+                _set_copied(cleaned_config, config, path, '[ENCRYPTED]')
         
+        self.secret_store.set_secrets(to_store)
         return cleaned_config
     
     def inject_sensitive_to_config(self, config: Dict[str, Any]) -> Dict[str, Any]:
         """
         将加密存储的敏感数据注入回配置对象。
+        所有字段通过一次查询读取。
         """
-        result = json.loads(json.dumps(config))  # Deep copy
-        
-        # Telegram bot token
-        token = self.get_telegram_bot_token()
-        if token and 'telegram' in result:
-            result['telegram']['botToken'] = token
-        
-        # TMDB API key
-        tmdb_key = self.get_tmdb_api_key()
-        if tmdb_key and 'tmdb' in result:
-            result['tmdb']['apiKey'] = tmdb_key
-        
-        # Emby API key
-        emby_key = self.get_emby_api_key()
-        if emby_key and 'emby' in result:
-            result['emby']['apiKey'] = emby_key
-        
-        # AI API key
-        ai_key = self.get_ai_api_key()
-        if ai_key and result.get('organize', {}).get('ai'):
-            result['organize']['ai']['apiKey'] = ai_key
-        
-        # OpenList password
-        openlist_pwd = self.get_openlist_password()
-        if openlist_pwd and 'openList' in result:
-            result['openList']['password'] = openlist_pwd
-        
-        # Proxy password
-        proxy_pwd = self.get_proxy_password()
-        if proxy_pwd and 'proxy' in result:
-            result['proxy']['password'] = proxy_pwd
+        result = dict(config)
+        secrets = self.secret_store.get_secrets(key for _, key in SENSITIVE_CONFIG_FIELDS)
         
-        # WebDAV password
-        webdav_pwd = self.get_webdav_password()
-        if webdav_pwd and result.get('strm', {}).get('webdav'):
-            result['strm']['webdav']['password'] = webdav_pwd
+        for path, secret_key in SENSITIVE_CONFIG_FIELDS:
+            value = secrets.get(secret_key)
+            if value and _get_parent(config, path) is not None:
+                _set_copied(result, config, path, value)
         
         return result
@@ -0,0 +1,193 @@
+import os
+import json
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from models.app_data import TaskHistory
+from models.database import session_scope
+from models.offline_task import OfflineTask, TaskStatus
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = (TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED)
+
+
+class TaskArchiver:
+    """
+    Background job that moves finished offline tasks into task_history.
+    
+    offline_tasks (secrets.db) only keeps live and recently finished tasks,
+    so the poller and the task list never wade through old rows. History
+    rows older than the retention period are deleted and both databases
+    are VACUUMed afterwards to give the space back.
+    """
+    
+    def __init__(self, secrets_session_factory, appdata_session_factory,
+                 archive_after_days: int = 7, retention_days: int = 90,
+                 batch_size: int = 500, interval: int = 3600):
+        """
+        Initialize archiver.
+        
+        Args:
+            secrets_session_factory: Session factory for secrets.db (offline_tasks)
+            appdata_session_factory: Session factory for appdata.db (task_history)
+            archive_after_days: Archive terminal tasks not updated for this many days
+            retention_days: Delete history rows completed more than this many days ago (0 = keep forever)
+            batch_size: Rows moved per transaction
+            interval: Seconds between runs
+        """
+        self.secrets_session_factory = secrets_session_factory
+        self.appdata_session_factory = appdata_session_factory
+        self.archive_after_days = archive_after_days
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+        self.interval = interval
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+    
+    def start(self):
+        """Start the archiver thread."""
+        if self.running:
+            logger.warning('Task archiver already running')
+            return
+        
+        self.running = True
+        self._stop_event.clear()
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+        logger.info(f'Started task archiver with {self.interval}s interval')
+    
+    def stop(self):
+        """Stop the archiver thread."""
+        if not self.running:
+            return
+        
+        self.running = False
+        self._stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+        logger.info('Stopped task archiver')
+    
+    def _loop(self):
+        while self.running:
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f'Task archiver error: {str(e)}')
+            self._stop_event.wait(self.interval)
+    
+    def run_once(self) -> Dict[str, Any]:
+        """Archive, apply retention and compact; returns counts."""
+        archived = self.archive()
+        purged = self.purge_history()
+        if archived:
+            self._vacuum(self.secrets_session_factory)
+        if purged:
+            self._vacuum(self.appdata_session_factory)
+        if archived or purged:
+            logger.info(f'Task archiver: {archived} tasks archived, {purged} history rows purged')
+        return {'archived': archived, 'purged': purged}
+    
+    def archive(self, now: datetime = None) -> int:
+        """Move terminal tasks older than archive_after_days into task_history."""
+        cutoff = (now or datetime.now()) - timedelta(days=self.archive_after_days)
+        total = 0
+        while True:
+            moved = self._archive_batch(cutoff)
+            total += moved
+            if moved < self.batch_size:
+                return total
+    
+    def _archive_batch(self, cutoff: datetime) -> int:
+        with session_scope(self.secrets_session_factory) as session:
+            tasks = session.query(OfflineTask).filter(
+                OfflineTask.status.in_(TERMINAL_STATUSES),
+                OfflineTask.updated_at < cutoff
+            ).order_by(OfflineTask.updated_at).limit(self.batch_size).all()
+        if not tasks:
+            return 0
+        
+        ids = [task.id for task in tasks]
+        # Write history first: a crash before the delete below only leaves
+        # tasks that the next run skips via the unique source_id
+        with session_scope(self.appdata_session_factory) as session:
+            already = {
+                source_id for (source_id,) in
+                session.query(TaskHistory.source_id).filter(TaskHistory.source_id.in_(ids))
+            }
+            session.add_all([
+                TaskHistory(
+                    task_type='offline',
+                    status=task.status.value,
+                    details=json.dumps(task.to_dict(), ensure_ascii=False),
+                    created_at=task.created_at,
+                    completed_at=task.updated_at,
+                    source_id=task.id
+                )
+                for task in tasks if task.id not in already
+            ])
+        
+        with session_scope(self.secrets_session_factory) as session:
+            # Status guard: a task retried meanwhile stays in the hot table
+            session.query(OfflineTask).filter(
+                OfflineTask.id.in_(ids),
+                OfflineTask.status.in_(TERMINAL_STATUSES)
+            ).delete(synchronize_session=False)
+        return len(tasks)
+    
+    def purge_history(self, now: datetime = None) -> int:
+        """Delete history rows completed more than retention_days ago."""
+        if self.retention_days <= 0:
+            return 0
+        cutoff = (now or datetime.now()) - timedelta(days=self.retention_days)
+        total = 0
+        while True:
+            with session_scope(self.appdata_session_factory) as session:
+                ids = [
+                    row_id for (row_id,) in
+                    session.query(TaskHistory.id).filter(
+                        TaskHistory.completed_at < cutoff
+                    ).limit(self.batch_size)
+                ]
+                if ids:
+                    session.query(TaskHistory).filter(TaskHistory.id.in_(ids)).delete(synchronize_session=False)
+            total += len(ids)
+            if len(ids) < self.batch_size:
+                return total
+    
+    @staticmethod
+    def _vacuum(session_factory):
+        """Rebuild the database file to release pages freed by deletes."""
+        engine = session_factory.kw['bind']
+        if engine.dialect.name != 'sqlite':
+            return
+        try:
+            with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                conn.exec_driver_sql('VACUUM')
+                conn.exec_driver_sql('PRAGMA wal_checkpoint(TRUNCATE)')
+        except Exception as e:
+            # VACUUM needs a moment without other writers; retry next run
+            logger.warning(f'VACUUM failed: {str(e)}')
+
+
+def create_task_archiver(secrets_session_factory, appdata_session_factory) -> TaskArchiver:
+    """
+    Create and configure task archiver from environment.
+    
+    Args:
+        secrets_session_factory: Session factory for secrets.db
+        appdata_session_factory: Session factory for appdata.db
+    
+    Returns:
+        Configured TaskArchiver instance
+    """
+    return TaskArchiver(
+        secrets_session_factory,
+        appdata_session_factory,
+        archive_after_days=int(os.environ.get('OFFLINE_TASK_ARCHIVE_DAYS', '7')),
+        retention_days=int(os.environ.get('TASK_HISTORY_RETENTION_DAYS', '90')),
+        batch_size=int(os.environ.get('TASK_ARCHIVE_BATCH_SIZE', '500')),
+        interval=int(os.environ.get('TASK_ARCHIVE_INTERVAL', '3600'))
+    )
@@ -2,7 +2,8 @@ import os
 import logging
 import threading
 import time
-from typing import Optional
+from datetime import datetime
+from typing import Any, Dict, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -10,18 +11,33 @@ logger = logging.getLogger(__name__)
 class OfflineTaskPoller:
     """Background task poller for syncing offline tasks."""
     
-    def __init__(self, offline_task_service, interval: int = 60):
+    def __init__(self, offline_task_service, interval: int = 60, due_check_interval: float = 3):
         """
         Initialize poller.
         
         Args:
             offline_task_service: OfflineTaskService instance
-            interval: Poll interval in seconds (default: 60)
+            interval: Longest sleep between polls in seconds (default: 60);
+                tasks are polled when their own next_poll_at comes due
+            due_check_interval: How often a sleeping poller checks the database
+                for tasks that became due, e.g. created by another worker (default: 3)
         """
         self.offline_task_service = offline_task_service
         self.interval = interval
+        self.due_check_interval = due_check_interval
         self.running = False
         self.thread: Optional[threading.Thread] = None
+        # Set by wake() and stop(); the loop waits on it instead of sleeping
+        self._wake_event = threading.Event()
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            'cycles': 0,
+            'lastCycleAt': None,
+            'lastCycleSeconds': None,
+            'lastSynced': None,
+            'lastFailed': None,
+            'backlog': None
+        }
     
     def start(self):
         """Start the polling thread."""
@@ -30,6 +46,7 @@ class OfflineTaskPoller:
             return
         
         self.running = True
+        self._wake_event.clear()
         self.thread = threading.Thread(target=self._poll_loop, daemon=True)
         self.thread.start()
         logger.info(f'Started offline task poller with {self.interval}s interval')
@@ -40,25 +57,106 @@ class OfflineTaskPoller:
             return
         
         self.running = False
+        self._wake_event.set()
         if self.thread:
             self.thread.join(timeout=5)
         logger.info('Stopped offline task poller')
     
+    def wake(self):
+        """Run a sync cycle now (e.g. a task was just created in this process)."""
+        self._wake_event.set()
+    
+    def _next_delay(self) -> float:
+        """Sleep until the earliest task is due, but never longer than interval."""
+        try:
+            due_in = self.offline_task_service.seconds_until_next_poll()
+        except Exception as e:
+            logger.warning(f'Failed to compute next poll time: {str(e)}')
+            return self.interval
+        if due_in is None:
+            return self.interval
+        # Small floor so overdue tasks that keep failing don't spin the loop
+        return min(self.interval, max(due_in, 1.0))
+    
+    def _has_due_tasks(self) -> bool:
+        try:
+            due_in = self.offline_task_service.seconds_until_next_poll()
+        except Exception as e:
+            logger.warning(f'Failed to check for due tasks: {str(e)}')
+            return False
+        return due_in is not None and due_in <= 0
+    
+    def _wait_for_next_cycle(self):
+        """
+        Wait until the next task is due, wake() is called or we are stopped.
+        
+        wake() only reaches this process, and the poller runs in the leader
+        worker alone; tasks created in other workers are stored with
+        next_poll_at NULL (due now), so the wait is cut into short slices
+        that check the database for due tasks.
+        """
+        deadline = time.monotonic() + self._next_delay()
+        while self.running:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if self._wake_event.wait(min(remaining, self.due_check_interval)):
+                return
+            if self._has_due_tasks():
+                return
+    
     def _poll_loop(self):
         """Main polling loop."""
         while self.running:
-            try:
-                # Sync all tasks
-                result = self.offline_task_service.sync_all()
-                if result.get('success'):
-                    logger.debug(f'Sync completed: {result.get("synced")} synced, {result.get("failed")} failed')
-                else:
-                    logger.warning(f'Sync failed: {result.get("error")}')
-            except Exception as e:
-                logger.error(f'Polling error: {str(e)}')
-            
-            # Wait before next poll
-            time.sleep(self.interval)
+            # Wake-ups arriving during the cycle below trigger another one right after it
+            self._wake_event.clear()
+            self.poll_once()
+            self._wait_for_next_cycle()
+    
+    def poll_once(self) -> Dict[str, Any]:
+        """Run one sync cycle and record its metrics."""
+        started = time.monotonic()
+        result = {}
+        try:
+            # Sync tasks that are due
+            result = self.offline_task_service.sync_all(due_only=True)
+            if result.get('success'):
+                logger.debug(f'Sync completed: {result.get("synced")} synced, {result.get("failed")} failed')
+            else:
+                logger.warning(f'Sync failed: {result.get("error")}')
+        except Exception as e:
+            logger.error(f'Polling error: {str(e)}')
+        duration = time.monotonic() - started
+        
+        try:
+            backlog = self.offline_task_service.count_due_tasks()
+        except Exception as e:
+            logger.warning(f'Failed to count due tasks: {str(e)}')
+            backlog = None
+        
+        with self._metrics_lock:
+            self._metrics.update(
+                cycles=self._metrics['cycles'] + 1,
+                lastCycleAt=datetime.now().isoformat(),
+                lastCycleSeconds=round(duration, 3),
+                lastSynced=result.get('synced'),
+                lastFailed=result.get('failed'),
+                backlog=backlog
+            )
+        return result
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Poller metrics of this process.
+        
+        backlog is the number of active tasks already due after the last
+        cycle; a growing value means cycles can't keep up.
+        """
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        metrics['running'] = self.running
+        metrics['interval'] = self.interval
+        return metrics
 
 
 def create_task_poller(offline_task_service) -> OfflineTaskPoller:
@@ -72,4 +170,5 @@ def create_task_poller(offline_task_service) -> OfflineTaskPoller:
         Configured OfflineTaskPoller instance
     """
     interval = int(os.environ.get('OFFLINE_TASK_POLL_INTERVAL', '60'))
-    return OfflineTaskPoller(offline_task_service, interval=interval)
+    due_check_interval = float(os.environ.get('OFFLINE_TASK_DUE_CHECK_INTERVAL', '3'))
+    return OfflineTaskPoller(offline_task_service, interval=interval, due_check_interval=due_check_interval)
@@ -5,11 +5,12 @@ Workflow Service
 import logging
 import threading
 import time
-from typing import Dict, Any, Optional, Callable
+from typing import Dict, Any, Optional, Callable, Set
 from dataclasses import dataclass, field
 from enum import Enum
 
 from services.link_parser import LinkParser, ParsedLink, LinkType, CloudSource
+from services.event_bus import OFFLINE_TASK_COMPLETED, OFFLINE_TASK_FAILED
 
 logger = logging.getLogger(__name__)
 
@@ -43,6 +44,8 @@ class WorkflowTask:
     media_info: Optional[Dict] = None
     error: Optional[str] = None
     created_at: float = field(default_factory=time.time)
+    # 已完成的后续步骤（ORGANIZING/STRM/REFRESHING/NOTIFYING），事件重投时跳过
+    completed_steps: Set[WorkflowStatus] = field(default_factory=set)
     
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -303,13 +306,26 @@ class WorkflowService:
                 return {'success': False, 'error': task.error}
             
             save_dir = self._get_save_dir('123')
-            result = self.cloud123_service.add_offline_task(
-                url=task.parsed_link.url,
-                save_path=save_dir
+            result = self.cloud123_service.create_offline_task(
+                source_url=task.parsed_link.url,
+                save_dir_id=save_dir
             )
             
             if result.get('success'):
-                task.offline_task_id = result.get('task_id')
+                p123_task_id = result.get('data', {}).get('p123TaskId')
+                task.offline_task_id = p123_task_id
+                # 记录到离线任务表，由轮询器跟踪完成状态
+                if self.offline_service:
+                    local = self.offline_service.create_task(
+                        source_url=task.parsed_link.url,
+                        save_cid=save_dir,
+                        requested_by=task.user_id,
+                        requested_chat=task.chat_id,
+                        provider='123',
+                        p123_task_id=p123_task_id
+                    )
+                    if local.get('success'):
+                        task.offline_task_id = local['data']['id']
                 return {
                     'success': True,
                     'task_id': task.id,
@@ -325,66 +341,158 @@ class WorkflowService:
         task.error = '未知目标网盘'
         return {'success': False, 'error': task.error}
     
-    def on_offline_complete(self, offline_task_id: str, file_path: str = None) -> None:
+    def subscribe_events(self, event_bus) -> None:
+        """订阅离线任务状态事件（由 OutboxDispatcher 从发件箱投递）"""
+        event_bus.subscribe(
+            OFFLINE_TASK_COMPLETED,
+            lambda event: self.on_offline_complete(event['id'], task_data=event)
+        )
+        event_bus.subscribe(
+            OFFLINE_TASK_FAILED,
+            lambda event: self.on_offline_failed(event['id'], task_data=event)
+        )
+    
+    def _find_offline_tasks(self, offline_task_id: str, task_data: Dict = None) -> list:
+        """
+        查找等待该离线任务的工作流任务
+        
+        同一内容的重复链接会挂到同一个离线任务上，因此可能有多个；
+        若本进程中没有（其他 worker 创建或服务已重启），根据离线任务记录重建。
+        """
+        tasks = [t for t in self.tasks.values() if t.offline_task_id == offline_task_id]
+        if tasks or not task_data:
+            return tasks
+        
+        import uuid
+        task = WorkflowTask(
+            id=str(uuid.uuid4()),
+            chat_id=task_data.get('requestedChat') or '',
+            user_id=task_data.get('requestedBy') or '',
+            parsed_link=self.link_parser.parse(task_data.get('sourceUrl') or ''),
+            target_cloud=task_data.get('provider') or '115',
+            status=WorkflowStatus.OFFLINE,
+            offline_task_id=offline_task_id
+        )
+        self.tasks[task.id] = task
+        return [task]
+    
+    def on_offline_complete(self, offline_task_id: str, file_path: str = None, task_data: Dict = None) -> None:
         """
         离线任务完成回调
         
+        在调用方线程中同步执行后续流程（OutboxDispatcher 自有线程）：
+        流程失败时抛出异常，事件不会被标记为已处理，由发件箱退避重试。
+        重投时每个工作流任务只执行尚未完成的步骤，已通知的用户不会再收到通知。
+        
         Args:
             offline_task_id: 离线任务ID
             file_path: 下载完成的文件路径
+            task_data: 离线任务记录（事件负载，OfflineTask.to_dict()）
+        
+        Raises:
+            Exception: 任一工作流任务的后续流程失败
         """
         # 查找对应的工作流任务
-        task = None
-        for t in self.tasks.values():
-            if t.offline_task_id == offline_task_id:
-                task = t
-                break
+        tasks = self._find_offline_tasks(offline_task_id, task_data)
         
-        if not task:
+        if not tasks:
             logger.warning(f"No workflow task found for offline task {offline_task_id}")
             return
         
-        # 启动后续流程
-        self._start_post_save_workflow(task, file_path)
+        # 执行后续流程，全部执行完后再抛出第一个错误
+        error = None
+        for task in tasks:
+            try:
+                self._execute_post_save_workflow(task, file_path)
+            except Exception as e:
+                error = error or e
+        if error:
+            raise error
+    
+    def on_offline_failed(self, offline_task_id: str, task_data: Dict = None) -> None:
+        """
+        离线任务失败回调：标记工作流失败并通知用户
+        
+        Args:
+            offline_task_id: 离线任务ID
+            task_data: 离线任务记录（事件负载，OfflineTask.to_dict()）
+        """
+        for task in self._find_offline_tasks(offline_task_id, task_data):
+            task.status = WorkflowStatus.FAILED
+            task.error = '离线下载失败'
+            if not self.telegram_service or not task.chat_id:
+                continue
+            try:
+                self.telegram_service.send_message(
+                    chat_id=task.chat_id,
+                    text=f"❌ 离线下载失败\n🔗 {task.parsed_link.url}"
+                )
+            except Exception as e:
+                logger.error(f"Notification error: {e}")
     
     def _start_post_save_workflow(self, task: WorkflowTask, file_path: str = None) -> None:
         """启动保存/离线完成后的工作流（整理、STRM、通知）"""
+        def run():
+            try:
+                self._execute_post_save_workflow(task, file_path)
+            except Exception:
+                pass  # 已记录并标记任务失败
+        
         # 在后台线程执行
-        thread = threading.Thread(
-            target=self._execute_post_save_workflow,
-            args=(task, file_path)
-        )
+        thread = threading.Thread(target=run)
         thread.daemon = True
         thread.start()
     
     def _execute_post_save_workflow(self, task: WorkflowTask, file_path: str = None) -> None:
-        """执行保存后工作流"""
+        """
+        执行保存后工作流
+        
+        已完成的步骤记录在 task.completed_steps 中，再次执行时（事件重投）
+        只从失败的步骤继续。通知失败只记录日志，不会让流程失败。
+        
+        Raises:
+            Exception: 整理/STRM/Emby 步骤失败（任务已标记为 FAILED）
+        """
         try:
             # 1. 整理分类
-            task.status = WorkflowStatus.ORGANIZING
-            organized_result = self._organize_files(task)
-            if organized_result:
-                task.organized_path = organized_result.get('path')
-                task.media_info = organized_result.get('media_info')
+            self._run_step(task, WorkflowStatus.ORGANIZING, self._apply_organize_result)
             
             # 2. 生成 STRM
-            task.status = WorkflowStatus.STRM
-            self._generate_strm(task)
+            self._run_step(task, WorkflowStatus.STRM, self._generate_strm)
             
             # 3. 刷新 Emby
-            task.status = WorkflowStatus.REFRESHING
-            self._refresh_emby(task)
-            
-            # 4. 发送通知
-            task.status = WorkflowStatus.NOTIFYING
-            self._send_notification(task)
-            
-            task.status = WorkflowStatus.COMPLETED
+            self._run_step(task, WorkflowStatus.REFRESHING, self._refresh_emby)
             
         except Exception as e:
             logger.error(f"Post-save workflow error: {e}")
             task.status = WorkflowStatus.FAILED
             task.error = str(e)
+            raise
+        
+        # 4. 发送通知（不重试：重投会打扰已收到通知的用户）
+        try:
+            self._run_step(task, WorkflowStatus.NOTIFYING, self._send_notification)
+        except Exception as e:
+            logger.error(f"Notification error: {e}")
+            task.completed_steps.add(WorkflowStatus.NOTIFYING)
+        
+        task.status = WorkflowStatus.COMPLETED
+        task.error = None
+    
+    @staticmethod
+    def _run_step(task: WorkflowTask, step: WorkflowStatus, run: Callable[[WorkflowTask], Any]) -> None:
+        """执行一个尚未完成的步骤并记录完成"""
+        if step in task.completed_steps:
+            return
+        task.status = step
+        run(task)
+        task.completed_steps.add(step)
+    
+    def _apply_organize_result(self, task: WorkflowTask) -> None:
+        organized_result = self._organize_files(task)
+        if organized_result:
+            task.organized_path = organized_result.get('path')
+            task.media_info = organized_result.get('media_info')
     
     def _organize_files(self, task: WorkflowTask) -> Optional[Dict]:
         """整理文件"""
@@ -399,19 +507,16 @@ class WorkflowService:
             logger.warning("STRM service not initialized")
             return
         
-        try:
-            config = {}
-            if self.config_store:
-                full_config = self.config_store.get_config()
-                config = full_config.get('strm', {})
-            
-            self.strm_service.generate_strm(
-                strm_type=task.target_cloud,
-                config=config
-            )
-            logger.info(f"STRM generated for task {task.id}")
-        except Exception as e:
-            logger.error(f"STRM generation error: {e}")
+        config = {}
+        if self.config_store:
+            full_config = self.config_store.get_config()
+            config = full_config.get('strm', {})
+        
+        self.strm_service.generate_strm(
+            strm_type=task.target_cloud,
+            config=config
+        )
+        logger.info(f"STRM generated for task {task.id}")
     
     def _refresh_emby(self, task: WorkflowTask) -> None:
         """刷新 Emby 媒体库"""
@@ -419,11 +524,8 @@ class WorkflowService:
             logger.warning("Emby service not initialized")
             return
         
-        try:
-            self.emby_service.refresh_library()
-            logger.info(f"Emby refreshed for task {task.id}")
-        except Exception as e:
-            logger.error(f"Emby refresh error: {e}")
+        self.emby_service.refresh_library()
+        logger.info(f"Emby refreshed for task {task.id}")
     
     def _send_notification(self, task: WorkflowTask) -> None:
         """发送 Telegram 通知（海报+详情）"""
@@ -431,26 +533,27 @@ class WorkflowService:
             logger.warning("Telegram service not initialized")
             return
         
-        try:
-            # 构建通知消息
-            message = self._build_notification_message(task)
-            
-            # 如果有媒体信息和海报，发送带图片的消息
-            if task.media_info and task.media_info.get('poster_url'):
-                self.telegram_service.send_photo_with_caption(
-                    chat_id=task.chat_id,
-                    photo_url=task.media_info['poster_url'],
-                    caption=message
-                )
-            else:
-                self.telegram_service.send_message(
-                    chat_id=task.chat_id,
-                    text=message
-                )
-            
-            logger.info(f"Notification sent for task {task.id}")
-        except Exception as e:
-            logger.error(f"Notification error: {e}")
+        # 网页端创建的任务没有会话可通知
+        if not task.chat_id:
+            return
+        
+        # 构建通知消息
+        message = self._build_notification_message(task)
+        
+        # 如果有媒体信息和海报，发送带图片的消息
+        if task.media_info and task.media_info.get('poster_url'):
+            self.telegram_service.send_photo_with_caption(
+                chat_id=task.chat_id,
+                photo_url=task.media_info['poster_url'],
+                caption=message
+            )
+        else:
+            self.telegram_service.send_message(
+                chat_id=task.chat_id,
+                text=message
+            )
+        
+        logger.info(f"Notification sent for task {task.id}")
     
     def _build_notification_message(self, task: WorkflowTask) -> str:
         """构建通知消息"""
@@ -481,9 +584,9 @@ class WorkflowService:
             return '0' if cloud_type == '115' else '/'
         
         try:
-            config = self.config_store.get_config()
-            cloud_config = config.get(f'cloud{cloud_type}', {})
-            return cloud_config.get('downloadDir', '0' if cloud_type == '115' else '/')
+            config = self.config_store.get_compiled_config()
+            cloud_config = config.cloud115 if cloud_type == '115' else config.cloud123
+            return cloud_config.download_path
         except:
             return '0' if cloud_type == '115' else '/'
     
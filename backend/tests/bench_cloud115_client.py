@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark for directory browsing latency of Cloud115Service.list_directory.
+Compares building a new P115Client for every call (the old behaviour)
+against reusing the client cached per cookie fingerprint.
+
+p115client is replaced by a stand-in whose HTTP session pays a simulated
+TLS handshake on its first request and a fixed round trip on every request,
+so the numbers show the connection setup saved by keep-alive plus the local
+decrypt/parse/construct overhead.
+
+Usage:
+  cd backend && python tests/bench_cloud115_client.py [calls_per_case] [handshake_ms] [rtt_ms]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+os.environ.setdefault('SECRETS_ENCRYPTION_KEY', 'bench-encryption-key-32-chars-long!!')
+
+from models.database import _create_engine, get_session_factory, SecretsBase
+from services.secret_store import SecretStore
+from services.cloud115_service import Cloud115Service, clear_client_cache
+
+
+def _fake_p115client(handshake: float, rtt: float):
+    """Module stand-in: P115Client(cookies).fs.listdir(cid) over a keep-alive session."""
+
+    class FakeFs:
+        def __init__(self, client):
+            self.client = client
+
+        def listdir(self, cid):
+            self.client.request()
+            return [SimpleNamespace(id=str(i), name=f'文件夹{i}', is_directory=True, timestamp=1700000000)
+                    for i in range(50)]
+
+    class P115Client:
+        def __init__(self, cookies):
+            self.cookies = cookies
+            self.connected = False
+            self.fs = FakeFs(self)
+
+        def request(self):
+            if not self.connected:
+                time.sleep(handshake)
+                self.connected = True
+            time.sleep(rtt)
+
+    return SimpleNamespace(P115Client=P115Client)
+
+
+def _measure(fn, calls: int) -> float:
+    """Call fn `calls` times and return the mean latency in milliseconds."""
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1000
+
+
+def run_benchmark(calls: int = 50, handshake_ms: float = 60.0, rtt_ms: float = 10.0):
+    temp_dir = tempfile.mkdtemp()
+    engine = _create_engine(f"sqlite:///{os.path.join(temp_dir, 'secrets.db')}")
+    SecretsBase.metadata.create_all(engine)
+    secret_store = SecretStore(get_session_factory(engine))
+    secret_store.set_secret('cloud115_cookies', json.dumps({'UID': 'bench', 'CID': 'x' * 32, 'SEID': 'y' * 64}))
+
+    service = Cloud115Service(secret_store)
+    service.p115client = _fake_p115client(handshake_ms / 1000, rtt_ms / 1000)
+
+    def uncached():
+        clear_client_cache()
+        assert service.list_directory('0')['success']
+
+    def cached():
+        assert service.list_directory('0')['success']
+
+    print(f"Benchmarking Cloud115Service.list_directory ({calls} calls per case, "
+          f"handshake {handshake_ms:.0f}ms, rtt {rtt_ms:.0f}ms)")
+    print("=" * 60)
+
+    new_client = _measure(uncached, calls)
+    print(f"  new client per call : {new_client:>10.2f} ms/call")
+
+    clear_client_cache()
+    reused = _measure(cached, calls)
+    print(f"  cached client       : {reused:>10.2f} ms/call")
+
+    print(f"  speedup             : {new_client / reused:>10.1f}x")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    args = [float(arg) for arg in sys.argv[1:4]]
+    run_benchmark(int(args[0]) if args else 50, *args[1:])
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Benchmark for ConfigStore.get_config.
+Compares reads per second of a full YAML parse + merge on every call (the
+old behaviour) against the mtime/inode-validated in-process snapshot.
+
+Usage:
+  cd backend && python tests/bench_config_store.py [seconds_per_case]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from persistence.config_store import ConfigStore
+
+
+def _measure(fn, duration: float) -> float:
+    """Call fn repeatedly for duration seconds and return calls per second."""
+    calls = 0
+    start = time.perf_counter()
+    deadline = start + duration
+    while time.perf_counter() < deadline:
+        fn()
+        calls += 1
+    return calls / (time.perf_counter() - start)
+
+
+def run_benchmark(duration: float = 2.0):
+    temp_dir = tempfile.mkdtemp()
+    yaml_path = os.path.join(temp_dir, 'config.yml')
+    json_path = os.path.join(temp_dir, 'appdata.json')
+    store = ConfigStore(yaml_path=yaml_path, json_path=json_path)
+
+    # Populate a realistic config with organize rules
+    config = store.get_config()
+    config['organize']['movieRules'] = [
+        {'id': f'm{i}', 'name': f'规则{i}', 'targetCid': str(i), 'conditions': {'genre_ids': '16'}}
+        for i in range(20)
+    ]
+    store.update_config(config)
+
+    print(f"Benchmarking ConfigStore.get_config ({duration:.1f}s per case)")
+    print("=" * 60)
+
+    uncached = _measure(store._load_config, duration)
+    print(f"  parse on every read : {uncached:>12,.0f} reads/s")
+
+    cached = _measure(store.get_config, duration)
+    print(f"  snapshot            : {cached:>12,.0f} reads/s")
+
+    print(f"  speedup             : {cached / uncached:>12.1f}x")
+
+
+if __name__ == "__main__":
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+    run_benchmark(seconds)
@@ -296,6 +296,23 @@ class TestBotBlueprint(unittest.TestCase):
             self.assertIn('desc', cmd)
             self.assertIn('example', cmd)
     
+    def test_get_bot_commands_not_modified(self):
+        """Test that bot commands honor If-None-Match until they are saved again."""
+        first = self.client.get('/api/bot/commands')
+        etag = first.headers.get('ETag')
+        self.assertTrue(etag)
+        
+        cached = self.client.get('/api/bot/commands', headers={'If-None-Match': etag})
+        self.assertEqual(cached.status_code, 304)
+        
+        self.app.secret_store.set_secret('telegram_bot_commands', json.dumps([
+            {'cmd': '/start', 'desc': 'Start', 'example': '/start'}
+        ]))
+        
+        changed = self.client.get('/api/bot/commands', headers={'If-None-Match': etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(len(json.loads(changed.data)['data']), 1)
+    
     def test_update_bot_commands_invalid_format(self):
         """Test updating bot commands with invalid format."""
         response = self.client.put('/api/bot/commands',
@@ -2,6 +2,7 @@ import unittest
 import json
 import tempfile
 import os
+from datetime import datetime, timedelta
 from unittest.mock import Mock, patch, MagicMock
 from werkzeug.security import generate_password_hash
 
@@ -282,6 +283,137 @@ class TestSecretStore(unittest.TestCase):
         self.secret_store.set_secret(key, value2)
         self.assertEqual(self.secret_store.get_secret(key), value2)
 
+    
+    def test_get_secret_served_from_cache(self):
+        """Test that repeated reads decrypt only once."""
+        self.secret_store.set_secret('cached_key', 'cached_value')
+        self.secret_store.clear_cache()
+        
+        with patch.object(self.secret_store, '_cipher', wraps=self.secret_store._cipher) as cipher:
+            self.assertEqual(self.secret_store.get_secret('cached_key'), 'cached_value')
+            self.assertEqual(self.secret_store.get_secret('cached_key'), 'cached_value')
+            self.assertTrue(self.secret_store.secret_exists('cached_key'))
+            self.assertEqual(cipher.decrypt.call_count, 1)
+    
+    def test_secret_exists_never_decrypts(self):
+        """Test that secret_exists does not decrypt values."""
+        self.secret_store.set_secret('exists_key', 'value')
+        self.secret_store.clear_cache()
+        
+        with patch.object(self.secret_store, '_cipher', wraps=self.secret_store._cipher) as cipher:
+            self.assertTrue(self.secret_store.secret_exists('exists_key'))
+            self.assertFalse(self.secret_store.secret_exists('missing_key'))
+            cipher.decrypt.assert_not_called()
+    
+    def test_cache_invalidated_by_other_worker_writes(self):
+        """Test that a write through another SecretStore is seen via the change counter."""
+        from services.secret_store import SecretStore
+        reader = SecretStore(self.secret_store.session_factory, version_check_interval=0)
+        
+        self.secret_store.set_secret('shared_key', 'v1')
+        self.assertEqual(reader.get_secret('shared_key'), 'v1')
+        
+        self.secret_store.set_secret('shared_key', 'v2')
+        self.assertEqual(reader.get_secret('shared_key'), 'v2')
+        
+        self.secret_store.delete_secret('shared_key')
+        self.assertIsNone(reader.get_secret('shared_key'))
+
+    
+    def test_get_and_set_secrets_batch(self):
+        """Test multi-key reads and writes."""
+        self.assertTrue(self.secret_store.set_secrets({'batch_a': 'A', 'batch_b': 'B'}))
+        self.secret_store.clear_cache()
+        
+        with patch.object(self.secret_store, 'session_factory', wraps=self.secret_store.session_factory) as factory:
+            values = self.secret_store.get_secrets(['batch_a', 'batch_b', 'batch_missing'])
+            # one version check + one query
+            self.assertEqual(factory.call_count, 2)
+        self.assertEqual(values, {'batch_a': 'A', 'batch_b': 'B', 'batch_missing': None})
+    
+    def test_sensitive_config_round_trip(self):
+        """Test extracting and re-injecting sensitive config fields."""
+        from services.sensitive_data_service import SensitiveDataService
+        service = SensitiveDataService(self.secret_store)
+        config = {
+            'telegram': {'botToken': 'bot-token', 'adminUserId': '1'},
+            'organize': {'ai': {'apiKey': 'sk-ai', 'model': 'gpt'}, 'enabled': True},
+            'strm': {'webdav': {'password': 'dav-pass'}},
+            'proxy': {'password': ''},
+        }
+        
+        cleaned = service.extract_sensitive_from_config(config)
+        self.assertEqual(cleaned['telegram']['botToken'], '[ENCRYPTED]')
+        self.assertEqual(cleaned['organize']['ai']['apiKey'], '[ENCRYPTED]')
+        self.assertEqual(cleaned['strm']['webdav']['password'], '[ENCRYPTED]')
+        # Input left untouched, unchanged sections shared
+        self.assertEqual(config['telegram']['botToken'], 'bot-token')
+        self.assertIs(cleaned['proxy'], config['proxy'])
+        
+        restored = service.inject_sensitive_to_config(cleaned)
+        self.assertEqual(restored['telegram']['botToken'], 'bot-token')
+        self.assertEqual(restored['organize']['ai']['apiKey'], 'sk-ai')
+        self.assertEqual(restored['strm']['webdav']['password'], 'dav-pass')
+        self.assertEqual(cleaned['telegram']['botToken'], '[ENCRYPTED]')
+    
+    def test_key_rotation_reencrypts_with_primary_key(self):
+        """Test that rotation moves secrets written with an old key to the new key."""
+        from services.secret_store import SecretStore
+        for i in range(5):
+            self.secret_store.set_secret(f'rotate_{i}', f'value_{i}')
+        
+        with patch.dict(os.environ, {
+            'SECRETS_ENCRYPTION_KEY': 'new-encryption-key',
+            'SECRETS_ENCRYPTION_KEY_PREVIOUS': 'test-encryption-key-32-chars-long!!'
+        }):
+            rotating = SecretStore(self.secret_store.session_factory)
+            self.assertEqual(rotating.get_secret('rotate_0'), 'value_0')
+            
+            rotating.start_rotation(batch_size=2, pause=0)
+            status = rotating.wait_for_rotation(timeout=10)
+            self.assertEqual(status['state'], 'completed')
+            self.assertEqual(status['total'], 5)
+            self.assertEqual(status['rotated'], 5)
+        
+        with patch.dict(os.environ, {'SECRETS_ENCRYPTION_KEY': 'new-encryption-key'}):
+            new_only = SecretStore(self.secret_store.session_factory)
+            self.assertEqual(new_only.get_secrets([f'rotate_{i}' for i in range(5)]),
+                             {f'rotate_{i}': f'value_{i}' for i in range(5)})
+    
+    def test_rotation_status_is_shared_between_workers(self):
+        """Test that any worker reports a running rotation and refuses to start a second one."""
+        from services.secret_store import SecretStore
+        for i in range(3):
+            self.secret_store.set_secret(f'rotate_{i}', f'value_{i}')
+        worker_a = SecretStore(self.secret_store.session_factory)
+        worker_b = SecretStore(self.secret_store.session_factory)
+        self.assertEqual(worker_b.get_rotation_status(), {'state': 'idle'})
+        
+        worker_a.start_rotation(batch_size=1, pause=0.3)
+        
+        self.assertEqual(worker_b.get_rotation_status()['state'], 'running')
+        with self.assertRaises(RuntimeError):
+            worker_b.start_rotation()
+        self.assertEqual(worker_a.wait_for_rotation(timeout=10)['state'], 'completed')
+        status = worker_b.get_rotation_status()
+        self.assertEqual((status['state'], status['total'], status['processed']), ('completed', 3, 3))
+    
+    def test_abandoned_rotation_can_be_restarted(self):
+        """Test that a rotation whose worker stopped reporting progress no longer blocks a new one."""
+        from services.secret_store import ROTATION_KEY, ROTATION_STALE_SECONDS
+        from models.secret import SecretMeta
+        from models.database import session_scope
+        stale = (datetime.now() - timedelta(seconds=ROTATION_STALE_SECONDS + 1)).isoformat()
+        with session_scope(self.secret_store.session_factory) as session:
+            session.add(SecretMeta(key=ROTATION_KEY, value=1, data=json.dumps({
+                'run': 1, 'state': 'running', 'total': 10, 'processed': 2, 'rotated': 2, 'failed': 0,
+                'startedAt': stale, 'finishedAt': None, 'error': None, 'updatedAt': stale
+            })))
+        
+        self.assertEqual(self.secret_store.get_rotation_status()['state'], 'failed')
+        self.secret_store.start_rotation(pause=0)
+        self.assertEqual(self.secret_store.wait_for_rotation(timeout=10)['state'], 'completed')
+
 
 class TestConfigSecretMasking(unittest.TestCase):
     """Test config secret masking functionality."""
@@ -305,7 +437,7 @@ class TestConfigSecretMasking(unittest.TestCase):
         })
         
         self.client = self.app.test_client()
-        self.store = DataStore(self.temp_file.name)
+        self.store = DataStore(self.temp_file.name, session_factory=self.app.appdata_session_factory)
         
         # Set up admin for authentication
         self.store.update_admin_password(generate_password_hash('testpass'))
@@ -12,7 +12,7 @@ from main import create_app
 from persistence.store import DataStore
 from models.database import init_db, get_session_factory
 from services.secret_store import SecretStore
-from services.cloud115_service import Cloud115Service
+from services.cloud115_service import Cloud115Service, clear_client_cache
 
 
 class TestCloud115Service(unittest.TestCase):
@@ -36,6 +36,28 @@ class TestCloud115Service(unittest.TestCase):
         if os.path.exists(self.temp_db.name):
             os.unlink(self.temp_db.name)
     
+    def test_client_reused_until_cookies_change(self):
+        """Test that one P115Client is kept per cookie value, across service instances."""
+        clear_client_cache()
+        self.addCleanup(clear_client_cache)
+        p115client = Mock()
+        p115client.P115Client.side_effect = lambda cookies: Mock(cookies=cookies)
+        self.service.p115client = p115client
+        other = Cloud115Service(self.secret_store)
+        other.p115client = p115client
+        self.secret_store.set_secret('cloud115_cookies', json.dumps({'UID': 'a'}))
+        
+        first = self.service._get_authenticated_client()
+        self.assertIs(self.service._get_authenticated_client(), first)
+        self.assertIs(other._get_authenticated_client(), first)
+        self.assertEqual(p115client.P115Client.call_count, 1)
+        
+        self.secret_store.set_secret('cloud115_cookies', json.dumps({'UID': 'b'}))
+        second = self.service._get_authenticated_client()
+        
+        self.assertIsNot(second, first)
+        self.assertEqual(second.cookies, {'UID': 'b'})
+    
     def test_list_directory_no_cookies(self):
         """Test listing directory without cookies stored."""
         result = self.service.list_directory('0')
@@ -170,6 +192,29 @@ class TestCloud115Service(unittest.TestCase):
         self.assertEqual(result['data']['sourceUrl'], 'https://example.com/file.zip')
         self.assertEqual(result['data']['saveCid'], '67890')
     
+    @patch('services.cloud115_service.Cloud115Service._get_authenticated_client')
+    def test_create_offline_tasks_in_batches(self, mock_client):
+        """Test that URLs are submitted in chunks and mapped back to per-URL results."""
+        def add_urls(payload):
+            urls = payload['urls'].split('\n')
+            return {'state': True, 'result': [
+                {'state': False, 'error_msg': 'bad link'} if url == 'bad' else {'state': True, 'info_hash': f'hash_{url}'}
+                for url in urls
+            ]}
+        client = Mock(spec=['offline_add_urls'])
+        client.offline_add_urls.side_effect = add_urls
+        mock_client.return_value = client
+        self.service.OFFLINE_ADD_BATCH_SIZE = 2
+        
+        result = self.service.create_offline_tasks(['a', 'bad', 'c'], '67890')
+        
+        self.assertTrue(result['success'])
+        self.assertEqual(client.offline_add_urls.call_count, 2)
+        self.assertEqual(client.offline_add_urls.call_args_list[0][0][0]['wp_path_id'], '67890')
+        self.assertEqual([item['success'] for item in result['data']], [True, False, True])
+        self.assertEqual(result['data'][0]['p115TaskId'], 'hash_a')
+        self.assertEqual(result['data'][1]['error'], 'bad link')
+    
     @patch('services.cloud115_service.Cloud115Service._get_authenticated_client')
     def test_get_offline_task_status(self, mock_client):
         """Test getting offline task status."""
@@ -195,6 +240,94 @@ class TestCloud115Service(unittest.TestCase):
         self.assertEqual(result['data']['status'], 'downloading')
         self.assertEqual(result['data']['progress'], 45)
         self.assertEqual(result['data']['speed'], 1024000)
+    
+    @patch('services.cloud115_service.Cloud115Service._get_authenticated_client')
+    def test_list_offline_task_statuses_fetches_every_page(self, mock_client):
+        """Test that the paged offline list is read once per page and indexed by id and info_hash."""
+        pages = {
+            1: {'state': True, 'page_count': 2, 'tasks': [
+                {'info_hash': 'hash_a', 'status': 1, 'percentDone': 12.5, 'rateDownload': 10},
+            ]},
+            2: {'state': True, 'page_count': 2, 'tasks': [
+                {'info_hash': 'hash_b', 'status': 2, 'percentDone': 100},
+            ]},
+        }
+        client = Mock(spec=['offline_list'])
+        client.offline_list.side_effect = lambda page: pages[page]
+        mock_client.return_value = client
+        
+        result = self.service.list_offline_task_statuses()
+        
+        self.assertTrue(result['success'])
+        self.assertEqual(client.offline_list.call_count, 2)
+        self.assertEqual(result['data']['hash_a']['status'], 'downloading')
+        self.assertEqual(result['data']['hash_a']['progress'], 12)
+        self.assertEqual(result['data']['hash_b']['status'], 'completed')
+    
+    @patch('services.cloud115_service.Cloud115Service._get_authenticated_client')
+    def test_list_offline_task_statuses_pages_offline_list_api(self, mock_client):
+        """Test that the client.offline.list() shape is asked for each page, not page 1 repeatedly."""
+        pages = {
+            page: {'state': True, 'data': {'page_count': 3, 'tasks': [
+                {'info_hash': f'hash_{page}', 'status': 1, 'percentDone': 50},
+            ]}}
+            for page in (1, 2, 3)
+        }
+        client = Mock(spec=['offline'])
+        client.offline.list.side_effect = lambda page: pages[page]
+        mock_client.return_value = client
+        
+        result = self.service.list_offline_task_statuses()
+        
+        self.assertTrue(result['success'])
+        self.assertEqual([call.args[0] for call in client.offline.list.call_args_list], [1, 2, 3])
+        self.assertEqual(set(result['data']), {'hash_1', 'hash_2', 'hash_3'})
+    
+    @patch('services.cloud115_service.Cloud115Service._get_authenticated_client')
+    def test_move_files_in_batches(self, mock_client):
+        """Test that ids are moved with fid arrays per chunk and reported per id."""
+        client = Mock(spec=['fs_move'])
+        client.fs_move.side_effect = [{'state': True}, {'state': False, 'error': '目标目录不存在'}]
+        mock_client.return_value = client
+        self.service.FILE_OP_BATCH_SIZE = 2
+        
+        result = self.service.move_files(['1', '2', '2', '3'], '99')
+        
+        self.assertTrue(result['success'])
+        client.fs_move.assert_any_call(['1', '2'], pid='99')
+        client.fs_move.assert_any_call(['3'], pid='99')
+        self.assertEqual([item['fileId'] for item in result['data']], ['1', '2', '3'])
+        self.assertEqual([item['success'] for item in result['data']], [True, True, False])
+        self.assertEqual(result['data'][2]['error'], '目标目录不存在')
+        self.assertEqual((result['succeeded'], result['failed']), (2, 1))
+    
+    @patch('services.cloud115_service.Cloud115Service._get_authenticated_client')
+    def test_rename_and_delete_files_batch(self, mock_client):
+        """Test that renames are sent as (id, name) pairs and deletes as one fid array."""
+        client = Mock(spec=['fs_rename', 'fs_delete'])
+        client.fs_rename.return_value = {'state': True}
+        client.fs_delete.return_value = {'state': True}
+        mock_client.return_value = client
+        
+        renamed = self.service.rename_files([('1', 'S01E01.mkv'), ('2', 'S01E02.mkv')])
+        deleted = self.service.delete_files(['1', '2'])
+        
+        client.fs_rename.assert_called_once_with([('1', 'S01E01.mkv'), ('2', 'S01E02.mkv')])
+        client.fs_delete.assert_called_once_with(['1', '2'])
+        self.assertEqual(renamed['data'][1], {'fileId': '2', 'newName': 'S01E02.mkv', 'success': True})
+        self.assertEqual(deleted['succeeded'], 2)
+    
+    @patch('services.cloud115_service.Cloud115Service._get_authenticated_client')
+    def test_delete_files_without_batch_api(self, mock_client):
+        """Test that clients without fs_delete fall back to one request per id."""
+        client = Mock(spec=['fs'])
+        client.fs.delete.side_effect = [None, Exception('file not found')]
+        mock_client.return_value = client
+        
+        result = self.service.delete_files(['1', '2'])
+        
+        self.assertEqual(client.fs.delete.call_count, 2)
+        self.assertEqual([item['success'] for item in result['data']], [True, False])
 
 
 class TestCloud115Endpoints(unittest.TestCase):
@@ -399,6 +532,47 @@ class TestCloud115Endpoints(unittest.TestCase):
         self.assertEqual(response.status_code, 201)
         data = json.loads(response.data)
         self.assertTrue(data['success'])
+    
+    @patch('services.cloud115_service.Cloud115Service._get_authenticated_client')
+    def test_batch_endpoints(self, mock_client):
+        """Test the /files/batch endpoints and their validation."""
+        client = Mock(spec=['fs_move', 'fs_rename', 'fs_delete'])
+        client.fs_move.return_value = {'state': True}
+        client.fs_rename.return_value = {'state': True}
+        client.fs_delete.return_value = {'state': False, 'error': '操作失败'}
+        mock_client.return_value = client
+        
+        response = self.client.post('/api/115/files/batch/move',
+            json={'fileIds': ['1', '2'], 'targetCid': '99'},
+            headers=self.auth_header
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)['succeeded'], 2)
+        
+        response = self.client.post('/api/115/files/batch/rename',
+            json={'items': [{'fileId': '1', 'newName': 'a.mkv'}]},
+            headers=self.auth_header
+        )
+        self.assertEqual(response.status_code, 200)
+        
+        response = self.client.delete('/api/115/files/batch',
+            json={'fileIds': ['1']},
+            headers=self.auth_header
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.data)['data'][0]['error'], '操作失败')
+        
+        response = self.client.post('/api/115/files/batch/rename',
+            json={'items': [{'fileId': '1'}]},
+            headers=self.auth_header
+        )
+        self.assertEqual(response.status_code, 400)
+        
+        response = self.client.post('/api/115/files/batch/move',
+            json={'fileIds': ['1']},
+            headers=self.auth_header
+        )
+        self.assertEqual(response.status_code, 400)
 
 
 class TestOfflineTaskSync(unittest.TestCase):
@@ -441,8 +615,8 @@ class TestOfflineTaskSync(unittest.TestCase):
         if os.path.exists(self.temp_file.name):
             os.unlink(self.temp_file.name)
     
-    @patch('services.cloud115_service.Cloud115Service.get_offline_task_status')
-    def test_sync_updates_task_status(self, mock_get_status):
+    @patch('services.cloud115_service.Cloud115Service.list_offline_task_statuses')
+    def test_sync_updates_task_status(self, mock_list_statuses):
         """Test that sync updates task status from 115 API."""
         # Create a task with p115_task_id
         from models.offline_task import TaskStatus
@@ -466,12 +640,14 @@ class TestOfflineTaskSync(unittest.TestCase):
         session.close()
         
         # Mock status response
-        mock_get_status.return_value = {
+        mock_list_statuses.return_value = {
             'success': True,
             'data': {
-                'status': 'downloading',
-                'progress': 50,
-                'speed': 1024000
+                'p115_task_123': {
+                    'status': 'downloading',
+                    'progress': 50,
+                    'speed': 1024000
+                }
             }
         }
         
@@ -486,6 +662,8 @@ class TestOfflineTaskSync(unittest.TestCase):
         self.assertEqual(updated_task.status, TaskStatus.DOWNLOADING)
         self.assertEqual(updated_task.progress, 50)
         self.assertEqual(updated_task.speed, 1024000)
+        # One list fetch per cycle, however many tasks are active
+        mock_list_statuses.assert_called_once()
 
 
 if __name__ == '__main__':
@@ -330,6 +330,48 @@ class TestCloud123Blueprint(unittest.TestCase):
         self.assertFalse(data['success'])
         self.assertIn('fileId', data['error'])
     
+    @patch('services.cloud123_service.Cloud123Service._make_api_request')
+    def test_batch_move_files(self, mock_request):
+        """Test moving many files through /files/batch/move."""
+        mock_request.return_value = {'success': True, 'data': {}}
+        
+        response = self.client.post('/api/123/files/batch/move',
+            json={'fileIds': ['1', '2'], 'targetDirId': '99'},
+            headers=self.auth_header,
+            content_type='application/json'
+        )
+        
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['succeeded'], 2)
+        self.assertEqual([item['fileId'] for item in data['data']], ['1', '2'])
+    
+    @patch('services.cloud123_service.Cloud123Service._make_api_request')
+    def test_batch_delete_files_failure(self, mock_request):
+        """Test that a batch where nothing succeeded returns 400 with per-id errors."""
+        mock_request.return_value = {'success': False, 'error': 'token expired'}
+        
+        response = self.client.delete('/api/123/files/batch',
+            json={'fileIds': ['1']},
+            headers=self.auth_header,
+            content_type='application/json'
+        )
+        
+        self.assertEqual(response.status_code, 400)
+        data = json.loads(response.data)
+        self.assertEqual(data['data'][0]['error'], 'token expired')
+    
+    def test_batch_rename_missing_items(self):
+        """Test batch rename validation."""
+        response = self.client.post('/api/123/files/batch/rename',
+            json={'items': [{'fileId': '1'}]},
+            headers=self.auth_header,
+            content_type='application/json'
+        )
+        
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('newName', json.loads(response.data)['error'])
+    
     @patch('services.cloud123_service.Cloud123Service._get_authenticated_client')
     def test_create_offline_task_success(self, mock_get_client):
         """Test creating offline task."""
@@ -377,18 +419,10 @@ class TestCloud123Blueprint(unittest.TestCase):
         
         self.assertEqual(response.status_code, 401)
     
-    @patch('services.cloud123_service.Cloud123Service._get_authenticated_client')
-    def test_get_offline_task_status_success(self, mock_get_client):
+    @patch('services.cloud123_service.Cloud123Service._make_api_request')
+    def test_get_offline_task_status_success(self, mock_request):
         """Test getting offline task status."""
-        mock_task = Mock()
-        mock_task.task_id = 'task-123'
-        mock_task.status = '2'
-        mock_task.progress = 50
-        mock_task.speed = 512000
-        
-        mock_client = Mock()
-        mock_client.list_offline_tasks.return_value = [mock_task]
-        mock_get_client.return_value = mock_client
+        mock_request.return_value = {'success': True, 'data': {'process': 50, 'status': 0}}
         
         response = self.client.get('/api/123/offline/tasks/task-123',
             headers=self.auth_header
@@ -397,7 +431,7 @@ class TestCloud123Blueprint(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         data = json.loads(response.data)
         self.assertTrue(data['success'])
-        self.assertEqual(data['data']['status'], 'completed')
+        self.assertEqual(data['data']['status'], 'downloading')
         self.assertEqual(data['data']['progress'], 50)
     
     def test_get_offline_task_without_auth(self):
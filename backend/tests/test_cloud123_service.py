@@ -152,38 +152,91 @@ class TestCloud123Service(unittest.TestCase):
         self.assertEqual(result['data']['sourceUrl'], 'https://example.com/file.zip')
         self.assertEqual(result['data']['saveDirId'], '/')
     
-    @patch.object(Cloud123Service, '_get_authenticated_client')
-    def test_get_offline_task_status_success(self, mock_get_client):
-        """Test getting offline task status."""
-        mock_task = Mock()
-        mock_task.task_id = 'task-123'
-        mock_task.status = '2'  # completed
-        mock_task.progress = 100
-        mock_task.speed = 1024000
+    @patch.object(Cloud123Service, '_make_api_request')
+    def test_get_offline_task_status_success(self, mock_request):
+        """Test getting offline task status from the progress endpoint."""
+        mock_request.return_value = {'success': True, 'data': {'process': 100, 'status': 2}}
         
-        mock_client = Mock()
-        mock_client.list_offline_tasks.return_value = [mock_task]
-        mock_get_client.return_value = mock_client
-        
-        result = self.service.get_offline_task_status('task-123')
+        result = self.service.get_offline_task_status('123')
         
         self.assertTrue(result.get('success'))
         self.assertEqual(result['data']['status'], 'completed')
         self.assertEqual(result['data']['progress'], 100)
-        self.assertEqual(result['data']['speed'], 1024000.0)
+        mock_request.assert_called_once_with('GET', '/api/v1/offline/download/process', params={'taskID': 123})
     
-    @patch.object(Cloud123Service, '_get_authenticated_client')
-    def test_get_offline_task_status_not_found(self, mock_get_client):
+    @patch.object(Cloud123Service, '_make_api_request')
+    def test_get_offline_task_status_not_found(self, mock_request):
         """Test getting status of non-existent task."""
-        mock_client = Mock()
-        mock_client.list_offline_tasks.return_value = []
-        mock_get_client.return_value = mock_client
+        mock_request.return_value = {'success': False, 'error': 'task not exist', 'code': 1}
         
         result = self.service.get_offline_task_status('non-existent')
         
         self.assertFalse(result.get('success'))
         self.assertIn('not found', result.get('error', '').lower())
     
+    @patch.object(Cloud123Service, '_get_access_token', return_value='token')
+    @patch.object(Cloud123Service, '_make_api_request')
+    def test_get_offline_task_statuses(self, mock_request, mock_token):
+        """Test that batch status skips tasks whose query failed."""
+        responses = {
+            1: {'success': True, 'data': {'process': 42.5, 'status': 0}},
+            2: {'success': True, 'data': {'process': 0, 'status': 1}},
+            3: {'success': False, 'error': 'task not exist'},
+        }
+        mock_request.side_effect = lambda method, endpoint, params: responses[params['taskID']]
+        
+        result = self.service.get_offline_task_statuses(['1', '2', '3'])
+        
+        self.assertTrue(result['success'])
+        self.assertEqual(result['data']['1'], {'status': 'downloading', 'progress': 42, 'speed': None})
+        self.assertEqual(result['data']['2']['status'], 'failed')
+        self.assertNotIn('3', result['data'])
+    
+    @patch.object(Cloud123Service, '_make_api_request')
+    def test_move_and_delete_files_in_chunks_of_100(self, mock_request):
+        """Test that batch move/trash send at most 100 fileIds per call and report per id."""
+        mock_request.side_effect = [
+            {'success': True, 'data': {}},
+            {'success': False, 'error': '文件不存在'},
+            {'success': True, 'data': {}},
+        ]
+        file_ids = [str(i) for i in range(1, 151)]
+        
+        moved = self.service.move_files(file_ids, '99')
+        deleted = self.service.delete_files(['7'])
+        
+        first, second, third = mock_request.call_args_list
+        self.assertEqual(first.args[:2], ('POST', '/api/v1/file/move'))
+        self.assertEqual(len(first.kwargs['json_data']['fileIds']), 100)
+        self.assertEqual(second.kwargs['json_data']['fileIds'][0], 101)
+        self.assertEqual(second.kwargs['json_data']['toParentFileId'], 99)
+        self.assertEqual(third.args[1], '/api/v1/file/trash')
+        self.assertTrue(moved['success'])
+        self.assertEqual((moved['succeeded'], moved['failed']), (100, 50))
+        self.assertEqual(moved['data'][100], {'fileId': '101', 'success': False, 'error': '文件不存在'})
+        self.assertEqual(deleted['data'], [{'fileId': '7', 'success': True}])
+    
+    @patch.object(Cloud123Service, '_make_api_request')
+    def test_rename_files_uses_rename_list(self, mock_request):
+        """Test that batch rename sends renameList entries in chunks of 30."""
+        mock_request.return_value = {'success': True, 'data': {}}
+        renames = [(str(i), f'S01E{i:02d}.mkv') for i in range(1, 32)]
+        
+        result = self.service.rename_files(renames)
+        
+        self.assertEqual(mock_request.call_count, 2)
+        payload = mock_request.call_args_list[0].kwargs['json_data']
+        self.assertEqual(len(payload['renameList']), 30)
+        self.assertEqual(payload['renameList'][0], '1|S01E01.mkv')
+        self.assertEqual(result['succeeded'], 31)
+    
+    def test_batch_rejects_invalid_ids(self):
+        """Test that non-numeric ids are rejected before any request."""
+        result = self.service.delete_files(['abc'])
+        
+        self.assertFalse(result['success'])
+        self.assertIn('error', result)
+    
     def test_get_session_metadata_empty(self):
         """Test getting session metadata when none exists."""
         metadata = self.service.get_session_metadata()
@@ -1,7 +1,10 @@
 import unittest
+import unittest.mock
+import dataclasses
 import json
 import yaml
 import tempfile
+import time
 import os
 from werkzeug.security import generate_password_hash
 
@@ -11,6 +14,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 from main import create_app
 from persistence.store import DataStore
 from persistence.config_store import ConfigStore
+from models.database import _create_engine, get_session_factory, AppDataBase
 
 
 class TestConfigStore(unittest.TestCase):
@@ -149,6 +153,104 @@ class TestConfigStore(unittest.TestCase):
         self.assertEqual(config['cloud115']['cookies'], 'json-cookies')
         self.assertEqual(config['cloud115']['downloadPath'], '999')
 
+    def test_get_config_returns_independent_copies(self):
+        """Test that mutating a returned config does not leak into the snapshot."""
+        config = self.config_store.get_config()
+        config['telegram']['botToken'] = 'mutated-in-place'
+        
+        loaded = self.config_store.get_config()
+        self.assertEqual(loaded['telegram']['botToken'], '')
+    
+    def test_snapshot_reused_until_file_changes(self):
+        """Test that YAML is only re-parsed when the file signature changes."""
+        self.config_store.get_config()
+        
+        with unittest.mock.patch.object(self.config_store, '_read_yaml', wraps=self.config_store._read_yaml) as read_yaml:
+            self.config_store.get_config()
+            self.config_store.get_config()
+            self.assertEqual(read_yaml.call_count, 0)
+            
+            config = self.config_store.get_config()
+            config['telegram']['adminUserId'] = '42'
+            self.config_store.update_config(config)
+            
+            self.assertEqual(self.config_store.get_config()['telegram']['adminUserId'], '42')
+            self.assertEqual(read_yaml.call_count, 1)
+    
+    def test_snapshot_picks_up_external_writes(self):
+        """Test that edits written by another process invalidate the snapshot."""
+        self.assertEqual(self.config_store.get_config()['telegram']['botToken'], '')
+        
+        # Simulate another gunicorn worker writing the file in place
+        with open(self.temp_yaml.name, 'w') as f:
+            yaml.dump({'telegram': {'botToken': 'written-by-other-worker'}}, f)
+        
+        config = self.config_store.get_config()
+        self.assertEqual(config['telegram']['botToken'], 'written-by-other-worker')
+        self.assertIn('cloud115', config)
+
+    def test_compiled_config_is_typed_and_frozen(self):
+        """Test that the compiled config normalizes values and cannot be mutated."""
+        config = self.config_store.get_config()
+        config['emby']['serverUrl'] = '  http://emby.local:8096/  '
+        config['emby']['apiKey'] = ' emby-key '
+        config['cloud115']['qps'] = '2.5'
+        self.config_store.update_config(config)
+        
+        compiled = self.config_store.get_compiled_config()
+        self.assertEqual(compiled.emby.server_url, 'http://emby.local:8096')
+        self.assertEqual(compiled.emby.api_key, 'emby-key')
+        self.assertEqual(compiled.cloud115.qps, 2.5)
+        self.assertIs(compiled, self.config_store.get_compiled_config())
+        
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            compiled.emby.api_key = 'other'
+        self.assertFalse(hasattr(compiled.emby, '__dict__'))
+    
+    def test_subscribers_notified_only_for_watched_paths(self):
+        """Test that subscriptions fire for changed paths and sections only."""
+        qps_events = []
+        emby_events = []
+        self.config_store.subscribe('cloud115.qps', lambda c: qps_events.append(c.cloud115.qps))
+        self.config_store.subscribe('emby.*', lambda c: emby_events.append(c.emby.server_url))
+        self.config_store.get_config()
+        
+        config = self.config_store.get_config()
+        config['cloud115']['qps'] = 3
+        self.config_store.update_config(config)
+        self.assertEqual(qps_events, [3.0])
+        self.assertEqual(emby_events, [])
+        
+        config['emby']['notifications']['enabled'] = False
+        self.config_store.update_config(config)
+        self.assertEqual(qps_events, [3.0])
+        self.assertEqual(len(emby_events), 1)
+    
+    def test_section_precedence_follows_version_counter(self):
+        """Test that section rows beat the YAML until an import records a newer version, whatever the file mtime."""
+        temp_db = tempfile.NamedTemporaryFile(delete=False, suffix='.db')
+        temp_db.close()
+        self.addCleanup(os.unlink, temp_db.name)
+        engine = _create_engine(f'sqlite:///{temp_db.name}')
+        AppDataBase.metadata.create_all(engine)
+        self.addCleanup(engine.dispose)
+        store = ConfigStore(yaml_path=self.temp_yaml.name, json_path=self.temp_json.name,
+                            session_factory=get_session_factory(engine))
+        
+        store.patch_section('emby', {'serverUrl': 'http://patched:8096'})
+        # Touching the YAML (editor save, restore from backup) is not an import
+        future = time.time() + 3600
+        os.utime(self.temp_yaml.name, (future, future))
+        self.assertEqual(store.get_config()['emby']['serverUrl'], 'http://patched:8096')
+        
+        config = store.get_config()
+        config['emby']['serverUrl'] = 'http://imported:8096'
+        store.update_config(config)
+        self.assertEqual(store.get_config()['emby']['serverUrl'], 'http://imported:8096')
+        self.assertEqual(store.patch_section('emby', {'apiKey': 'k'})['serverUrl'], 'http://imported:8096')
+        
+        store.patch_section('emby', {'serverUrl': 'http://patched-again:8096'})
+        self.assertEqual(store.get_config()['emby']['serverUrl'], 'http://patched-again:8096')
 
 class TestDataStoreWithConfigStore(unittest.TestCase):
     """Test DataStore integration with ConfigStore."""
@@ -208,6 +310,27 @@ class TestDataStoreWithConfigStore(unittest.TestCase):
         self.assertIn('twoFactorSecret', config)
         self.assertEqual(config['twoFactorSecret'], secret)
 
+    def test_get_config_parses_appdata_at_most_once(self):
+        """Test that repeated config fetches reuse the cached admin record."""
+        self.store.update_two_factor_secret('JBSWY3DPEHPK3PXP')
+        self.store.get_config()
+        
+        with unittest.mock.patch('persistence.store.json.load', wraps=json.load) as json_load:
+            for _ in range(3):
+                config = self.store.get_config()
+            self.assertEqual(json_load.call_count, 0)
+        self.assertEqual(config['twoFactorSecret'], 'JBSWY3DPEHPK3PXP')
+    
+    def test_admin_record_picks_up_external_writes(self):
+        """Test that another worker's write to appdata.json is observed."""
+        self.assertFalse(self.store.is_two_factor_enabled())
+        
+        other_worker = DataStore(data_path=self.temp_json.name, config_yaml_path=self.temp_yaml.name)
+        other_worker.update_two_factor_secret('OTHERWORKERSECRET')
+        
+        self.assertTrue(self.store.is_two_factor_enabled())
+        self.assertEqual(self.store.get_two_factor_secret(), 'OTHERWORKERSECRET')
+
 
 class TestConfigAPIEndpoints(unittest.TestCase):
     """Test config API endpoints with YAML store."""
@@ -465,6 +588,97 @@ class TestConfigAPIEndpoints(unittest.TestCase):
         self.assertEqual(retrieved_config['proxy']['password'], sensitive_values['proxy.password'])
         self.assertEqual(retrieved_config['strm']['webdav']['password'], sensitive_values['strm.webdav.password'])
         self.assertEqual(retrieved_config['organize']['ai']['apiKey'], sensitive_values['organize.ai.apiKey'])
+    
+    def test_patch_config_section_writes_single_section(self):
+        """Test that PATCH /api/config/<section> stores one section without touching YAML."""
+        token = self._get_token()
+        headers = {'Authorization': f'Bearer {token}'}
+        
+        with open(self.temp_yaml.name, 'r') as f:
+            yaml_before = f.read()
+        
+        response = self.client.patch('/api/config/telegram',
+            json={'whitelistMode': False, 'adminUserId': '424242'},
+            headers=headers
+        )
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertTrue(data['success'])
+        self.assertEqual(data['data']['telegram']['adminUserId'], '424242')
+        self.assertIn('notificationChannelId', data['data']['telegram'])
+        
+        # YAML untouched, section stored as one app_config row
+        with open(self.temp_yaml.name, 'r') as f:
+            self.assertEqual(f.read(), yaml_before)
+        
+        from models.app_data import AppConfig
+        session = self.app.appdata_session_factory()
+        try:
+            row = session.get(AppConfig, 'telegram')
+            self.assertEqual(json.loads(row.value)['adminUserId'], '424242')
+        finally:
+            session.close()
+        
+        response = self.client.get('/api/config', headers=headers)
+        config = json.loads(response.data)['data']
+        self.assertEqual(config['telegram']['adminUserId'], '424242')
+        self.assertFalse(config['telegram']['whitelistMode'])
+    
+    def test_patch_config_unknown_section(self):
+        """Test that PATCH on an unknown section returns 404."""
+        token = self._get_token()
+        
+        response = self.client.patch('/api/config/notASection',
+            json={'foo': 'bar'},
+            headers={'Authorization': f'Bearer {token}'}
+        )
+        self.assertEqual(response.status_code, 404)
+    
+    def test_yaml_import_supersedes_patched_sections(self):
+        """Test that a newer YAML import wins over earlier section saves."""
+        token = self._get_token()
+        headers = {'Authorization': f'Bearer {token}'}
+        
+        self.client.patch('/api/config/emby', json={'serverUrl': 'http://patched:8096'}, headers=headers)
+        
+        exported = self.client.get('/api/config/export', headers=headers)
+        self.assertEqual(exported.status_code, 200)
+        exported_config = yaml.safe_load(exported.data)
+        self.assertEqual(exported_config['emby']['serverUrl'], 'http://patched:8096')
+        
+        exported_config['emby']['serverUrl'] = 'http://imported:8096'
+        response = self.client.post('/api/config/import',
+            data=yaml.dump(exported_config, allow_unicode=True),
+            headers=headers,
+            content_type='application/x-yaml'
+        )
+        self.assertEqual(response.status_code, 200)
+        
+        response = self.client.get('/api/config', headers=headers)
+        config = json.loads(response.data)['data']
+        self.assertEqual(config['emby']['serverUrl'], 'http://imported:8096')
+
+    
+    def test_get_config_etag_and_not_modified(self):
+        """Test that GET /api/config honors If-None-Match until the config changes."""
+        token = self._get_token()
+        headers = {'Authorization': f'Bearer {token}'}
+        
+        first = self.client.get('/api/config', headers=headers)
+        self.assertEqual(first.status_code, 200)
+        etag = first.headers.get('ETag')
+        self.assertTrue(etag)
+        
+        cached = self.client.get('/api/config', headers={**headers, 'If-None-Match': etag})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.data, b'')
+        
+        self.client.patch('/api/config/tmdb', json={'language': 'en-US'}, headers=headers)
+        
+        changed = self.client.get('/api/config', headers={**headers, 'If-None-Match': etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers.get('ETag'), etag)
+        self.assertEqual(json.loads(changed.data)['data']['tmdb']['language'], 'en-US')
 
 
 if __name__ == '__main__':
@@ -0,0 +1,38 @@
+import unittest
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.content_key import content_key
+
+
+class TestContentKey(unittest.TestCase):
+    """Test normalization of offline links to content keys."""
+    
+    HEX = 'c12fe1c06bba254a9dc9f519b335aa7c1367a88a'
+    
+    def test_magnet_hex_and_base32_match(self):
+        """Test that hex and base32 info-hashes give the same key regardless of trackers."""
+        self.assertEqual(content_key(f'magnet:?xt=urn:btih:{self.HEX.upper()}&tr=udp://t'), f'btih:{self.HEX}')
+        self.assertEqual(
+            content_key('magnet:?dn=name&xt=urn:btih:YEX6DQDLXISUVHOJ6UM3GNNKPQJWPKEK'),
+            f'btih:{self.HEX}'
+        )
+    
+    def test_ed2k(self):
+        """Test that ed2k links are keyed by their MD4 hash."""
+        self.assertEqual(
+            content_key('ed2k://|file|My%20File.mkv|1234|0123456789ABCDEF0123456789ABCDEF|/'),
+            'ed2k:0123456789abcdef0123456789abcdef'
+        )
+    
+    def test_links_without_content_hash(self):
+        """Test that other links have no key."""
+        self.assertIsNone(content_key('https://example.com/file.zip'))
+        self.assertIsNone(content_key('magnet:?xt=urn:btih:nothex'))
+        self.assertIsNone(content_key(None))
+
+
+if __name__ == '__main__':
+    unittest.main()
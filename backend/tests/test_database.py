@@ -0,0 +1,156 @@
+import unittest
+import tempfile
+import shutil
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import text
+from sqlalchemy.pool import QueuePool, StaticPool
+from models.database import _create_engine, _upgrade_schema, get_session_factory, session_scope, SecretsBase
+from models.offline_task import OfflineTask, TaskStatus
+
+
+class TestSQLiteEngine(unittest.TestCase):
+    """Test SQLite engine configuration."""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_url = f"sqlite:///{os.path.join(self.temp_dir, 'test.db')}"
+    
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_file_database_uses_wal_and_pool(self):
+        """Test that file databases get a real pool and the connect pragmas."""
+        engine = _create_engine(self.db_url)
+        try:
+            self.assertIsInstance(engine.pool, QueuePool)
+            with engine.connect() as conn:
+                self.assertEqual(conn.execute(text('PRAGMA journal_mode')).scalar(), 'wal')
+                self.assertEqual(conn.execute(text('PRAGMA synchronous')).scalar(), 1)  # NORMAL
+                self.assertEqual(conn.execute(text('PRAGMA busy_timeout')).scalar(), 5000)
+        finally:
+            engine.dispose()
+    
+    def test_memory_database_keeps_static_pool(self):
+        """Test that in-memory databases still share a single connection."""
+        engine = _create_engine('sqlite:///:memory:')
+        try:
+            self.assertIsInstance(engine.pool, StaticPool)
+            with engine.begin() as conn:
+                conn.execute(text('CREATE TABLE t (id INTEGER)'))
+            with engine.connect() as conn:
+                self.assertEqual(conn.execute(text('SELECT COUNT(*) FROM t')).scalar(), 0)
+        finally:
+            engine.dispose()
+    
+    def test_reads_not_blocked_by_open_write_transaction(self):
+        """Test that a reader sees committed data while another connection holds a write lock."""
+        engine = _create_engine(self.db_url)
+        try:
+            with engine.begin() as conn:
+                conn.execute(text('CREATE TABLE t (id INTEGER)'))
+                conn.execute(text('INSERT INTO t VALUES (1)'))
+            
+            writer = engine.connect()
+            try:
+                writer.exec_driver_sql('BEGIN IMMEDIATE')
+                writer.execute(text('INSERT INTO t VALUES (2)'))
+                with engine.connect() as reader:
+                    self.assertEqual(reader.execute(text('SELECT COUNT(*) FROM t')).scalar(), 1)
+                writer.rollback()
+            finally:
+                writer.close()
+        finally:
+            engine.dispose()
+
+
+
+class TestSessionScope(unittest.TestCase):
+    """Test the unit-of-work session helper."""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.engine = _create_engine(f"sqlite:///{os.path.join(self.temp_dir, 'secrets.db')}")
+        SecretsBase.metadata.create_all(self.engine)
+        self.session_factory = get_session_factory(self.engine)
+    
+    def tearDown(self):
+        self.engine.dispose()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def _task(self, task_id):
+        return OfflineTask(id=task_id, source_url='magnet:?xt=urn:btih:abc', save_cid='0',
+                           status=TaskStatus.PENDING, requested_by='u', requested_chat='c')
+    
+    def test_commits_and_keeps_objects_usable(self):
+        """Test that objects can be serialized after the scope closes."""
+        with session_scope(self.session_factory) as session:
+            task = self._task('t1')
+            session.add(task)
+        
+        data = task.to_dict()
+        self.assertEqual(data['id'], 't1')
+        self.assertIsNotNone(data['createdAt'])
+        with session_scope(self.session_factory) as session:
+            self.assertEqual(session.query(OfflineTask).count(), 1)
+    
+    def test_rolls_back_and_releases_connection_on_error(self):
+        """Test that an exception rolls back the transaction and returns the connection."""
+        with self.assertRaises(RuntimeError):
+            with session_scope(self.session_factory) as session:
+                session.add(self._task('t2'))
+                session.flush()
+                raise RuntimeError('boom')
+        
+        self.assertEqual(self.engine.pool.checkedout(), 0)
+        with session_scope(self.session_factory) as session:
+            self.assertEqual(session.query(OfflineTask).count(), 0)
+
+
+class TestUpgradeSchema(unittest.TestCase):
+    """Test in-place upgrades of existing databases."""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.engine = _create_engine(f"sqlite:///{os.path.join(self.temp_dir, 'secrets.db')}")
+        SecretsBase.metadata.create_all(self.engine)
+    
+    def tearDown(self):
+        self.engine.dispose()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_single_column_task_indexes_are_dropped(self):
+        """Test that indexes superseded by the composite keyset indexes are removed from old databases."""
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql('CREATE INDEX idx_status ON offline_tasks (status)')
+            conn.exec_driver_sql('CREATE INDEX idx_requested_by ON offline_tasks (requested_by)')
+            conn.exec_driver_sql('CREATE INDEX idx_created_at ON offline_tasks (created_at)')
+        
+        _upgrade_schema(SecretsBase.metadata, self.engine)
+        
+        with self.engine.connect() as conn:
+            indexes = {row[1] for row in conn.exec_driver_sql('PRAGMA index_list(offline_tasks)')}
+        self.assertFalse(indexes & {'idx_status', 'idx_requested_by', 'idx_created_at'})
+        self.assertIn('idx_status_created_at_id', indexes)
+    
+    def test_tasks_from_before_providers_become_115_tasks(self):
+        """Test that rows without a provider are backfilled so the per-provider dedup index covers them."""
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql(
+                "INSERT INTO offline_tasks (id, source_url, content_key, save_cid, status, progress, requested_by, "
+                "requested_chat, created_at, updated_at) "
+                "VALUES ('old', 'm', 'btih:aa', '0', 'PENDING', 0, 'u', 'c', '2024-01-01', '2024-01-01')"
+            )
+        
+        _upgrade_schema(SecretsBase.metadata, self.engine)
+        
+        with self.engine.connect() as conn:
+            provider = conn.execute(text("SELECT provider FROM offline_tasks WHERE id = 'old'")).scalar()
+        self.assertEqual(provider, '115')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+import unittest
+import tempfile
+import shutil
+import os
+import sys
+import time
+from unittest.mock import Mock, patch
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from models.database import _create_engine, get_session_factory, session_scope, AppDataBase
+from models.app_data import DirCacheEntry, DirCacheItem
+from services.dir_cache import DirectoryCache
+from services.cloud115_service import Cloud115Service
+
+
+class TestDirectoryCache(unittest.TestCase):
+    """Test the persistent directory listing cache."""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.engine = _create_engine(f"sqlite:///{os.path.join(self.temp_dir, 'appdata.db')}")
+        AppDataBase.metadata.create_all(self.engine)
+        self.session_factory = get_session_factory(self.engine)
+        self.cache = DirectoryCache(self.session_factory, ttl=60, stale_ttl=600)
+        self.loader = Mock(return_value={'success': True, 'data': [
+            {'id': '11', 'name': '电影', 'children': True, 'date': '2024-01-01'},
+            {'id': '12', 'name': 'a.mkv', 'children': False, 'date': '2024-01-01'},
+        ]})
+    
+    def tearDown(self):
+        self.engine.dispose()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_fresh_hit_skips_loader(self):
+        """Test that a listing within ttl is served from the cache, also by a new instance."""
+        self.cache.get_or_load('0', self.loader)
+        
+        restarted = DirectoryCache(self.session_factory, ttl=60, stale_ttl=600)
+        result = restarted.get_or_load('0', self.loader)
+        
+        self.assertTrue(result['cached'])
+        self.assertEqual(result['data'][0]['name'], '电影')
+        self.loader.assert_called_once()
+    
+    def test_stale_hit_revalidates_in_background(self):
+        """Test that an expired listing is served stale while it is refreshed."""
+        self.cache.get_or_load('0', self.loader)
+        
+        with patch('services.dir_cache.time.time', return_value=time.time() + 120), \
+                patch('services.dir_cache.threading.Thread') as mock_thread:
+            result = self.cache.get_or_load('0', self.loader)
+            self.assertTrue(result['stale'])
+            mock_thread.return_value.start.assert_called_once()
+            mock_thread.call_args[1]['target']()
+        
+        self.assertEqual(self.loader.call_count, 2)
+    
+    def test_expired_listing_is_loaded_live(self):
+        """Test that listings past the stale window are not served."""
+        self.cache.get_or_load('0', self.loader)
+        
+        with patch('services.dir_cache.time.time', return_value=time.time() + 3600):
+            result = self.cache.get_or_load('0', self.loader)
+        
+        self.assertNotIn('cached', result)
+        self.assertEqual(self.loader.call_count, 2)
+    
+    @patch('services.cloud115_service.Cloud115Service._get_authenticated_client')
+    @patch('services.cloud115_service.get_dir_cache')
+    def test_mutations_invalidate_parents(self, mock_get_cache, mock_client):
+        """Test that move invalidates the old parent and the target directory."""
+        mock_get_cache.return_value = self.cache
+        self.cache.get_or_load('0', self.loader)
+        self.cache.put('99', [])
+        service = Cloud115Service(Mock())
+        
+        result = service.move_file('12', '99')
+        
+        self.assertTrue(result['success'])
+        self.assertIsNone(self.cache.get('0'))
+        self.assertIsNone(self.cache.get('99'))    
+    @patch('services.cloud115_service.get_dir_cache')
+    def test_listings_are_scoped_to_the_login(self, mock_get_cache):
+        """Test that another account's cached listing is never served, and logout clears the cache."""
+        mock_get_cache.return_value = self.cache
+        secret_store = Mock()
+        secret_store.get_secret.return_value = '{"UID": "alice"}'
+        service = Cloud115Service(secret_store)
+        service._list_directory_live = self.loader
+        
+        service.list_directory('0')
+        self.assertTrue(service.list_directory('0')['cached'])
+        
+        secret_store.get_secret.return_value = '{"UID": "bob"}'
+        self.assertNotIn('cached', service.list_directory('0'))
+        self.assertEqual(self.loader.call_count, 2)
+        
+        secret_store.get_secret.return_value = None
+        service.p115client = Mock()
+        with self.assertRaises(ValueError):
+            service._get_authenticated_client()
+        with session_scope(self.session_factory) as session:
+            self.assertEqual(session.query(DirCacheEntry).count(), 0)
+            self.assertEqual(session.query(DirCacheItem).count(), 0)    
+    def _item_parents(self):
+        with session_scope(self.session_factory) as session:
+            return {item.item_id: item.parent_cid for item in session.query(DirCacheItem).all()}
+    
+    def test_put_writes_item_links_in_bulk(self):
+        """Test that caching a large folder costs a constant number of statements and re-parents moved items."""
+        self.cache.put('5', [{'id': 'f0', 'name': 'moved.mkv', 'children': False}])
+        children = [{'id': f'f{i}', 'name': f'{i}.mkv', 'children': False} for i in range(1000)]
+        statements = []
+        
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+        event.listen(self.engine, 'before_cursor_execute', record)
+        self.cache.put('0', children)
+        event.remove(self.engine, 'before_cursor_execute', record)
+        
+        self.assertLess(len(statements), 10)
+        parents = self._item_parents()
+        self.assertEqual(len(parents), 1000)
+        self.assertEqual(parents['f0'], '0')
+    
+    def test_prune_drops_items_of_missing_listings(self):
+        """Test that prune removes parent links whose listing expired or was invalidated."""
+        self.cache.put('0', [{'id': '11', 'name': '电影', 'children': True}])
+        self.cache.put('11', [{'id': '21', 'name': 'a.mkv', 'children': False}])
+        self.cache.put('5', [{'id': '51', 'name': 'b.mkv', 'children': False}])
+        self.cache.invalidate('5')
+        
+        with patch('services.dir_cache.time.time', return_value=time.time() + 3600):
+            self.cache.put('11', [{'id': '21', 'name': 'a.mkv', 'children': False}])
+            self.assertEqual(self.cache.prune(), 1)
+        
+        self.assertIsNone(self.cache.get('0'))
+        self.assertEqual(self._item_parents(), {'21': '11'})
+    
+    @patch('services.cloud115_service.Cloud115Service._get_authenticated_client')
+    @patch('services.cloud115_service.get_dir_cache')
+    def test_folder_delete_invalidates_cached_subtree(self, mock_get_cache, mock_client):
+        """Test that deleting a folder forgets its parent's listing and every cached listing below it."""
+        mock_get_cache.return_value = self.cache
+        self.cache.put('0', [{'id': '11', 'name': '电影', 'children': True}])
+        self.cache.put('11', [{'id': '12', 'name': '2024', 'children': True}])
+        self.cache.put('12', [{'id': '13', 'name': 'a.mkv', 'children': False}])
+        self.cache.put('99', [{'id': '98', 'name': 'b.mkv', 'children': False}])
+        service = Cloud115Service(Mock())
+        
+        result = service.delete_file('11')
+        
+        self.assertTrue(result['success'])
+        for cid in ('0', '11', '12'):
+            self.assertIsNone(self.cache.get(cid), cid)
+        self.assertIsNotNone(self.cache.get('99'))
+        self.assertEqual(self._item_parents(), {'98': '99'})
+
+
+if __name__ == '__main__':
+    unittest.main()
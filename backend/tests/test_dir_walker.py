@@ -0,0 +1,206 @@
+import unittest
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from services.dir_walker import walk_tree
+from services.cloud115_service import Cloud115Service
+from services.cloud123_service import Cloud123Service
+
+
+# folder id -> list of pages; a page is a list of (id, name, is_dir)
+TREE = {
+    '0': [[('1', '电影', True), ('2', 'readme.txt', False)], [('3', '剧集', True)]],
+    '1': [[('11', 'a.mkv', False), ('12', '2024', True)]],
+    '12': [[('121', 'b.mkv', False)]],
+    '3': [[('31', 'S01E01.mkv', False)]],
+}
+
+
+def tree_page(dir_id, cursor):
+    pages = TREE.get(dir_id, [[]])
+    index = cursor or 0
+    entries = [{'id': i, 'name': n, 'isDir': d, 'parentId': dir_id} for i, n, d in pages[index]]
+    return entries, index + 1 if index + 1 < len(pages) else None
+
+
+class TestWalkTree(unittest.TestCase):
+    """Test the concurrent recursive directory walker."""
+    
+    def test_walks_all_pages_and_folders(self):
+        """Test that every page of every folder is yielded with its parent path."""
+        entries = {entry['id']: entry for entry in walk_tree(tree_page, '0', '/115')}
+        
+        self.assertEqual(set(entries), {'1', '2', '3', '11', '12', '121', '31'})
+        self.assertEqual(entries['2']['parentPath'], '/115')
+        self.assertEqual(entries['3']['parentPath'], '/115')
+        self.assertEqual(entries['121']['parentPath'], '/115/电影/2024')
+        self.assertEqual(entries['31']['parentPath'], '/115/剧集')
+    
+    def test_root_path_defaults_to_slash(self):
+        """Test that children of an unnamed root get parentPath '/'."""
+        entries = {entry['id']: entry for entry in walk_tree(tree_page)}
+        
+        self.assertEqual(entries['1']['parentPath'], '/')
+        self.assertEqual(entries['11']['parentPath'], '/电影')
+    
+    def test_max_depth(self):
+        """Test that folders below max_depth are not listed."""
+        list_page = Mock(side_effect=tree_page)
+        ids = {entry['id'] for entry in walk_tree(list_page, max_depth=2)}
+        
+        self.assertEqual(ids, {'1', '2', '3', '11', '12', '31'})
+        self.assertNotIn('12', [call.args[0] for call in list_page.call_args_list])
+    
+    def test_concurrency_is_bounded(self):
+        """Test that sibling folders are listed in parallel but never above max_workers."""
+        lock = threading.Lock()
+        state = {'active': 0, 'peak': 0}
+        
+        def slow_page(dir_id, cursor):
+            with lock:
+                state['active'] += 1
+                state['peak'] = max(state['peak'], state['active'])
+            time.sleep(0.02)
+            with lock:
+                state['active'] -= 1
+            if dir_id == '0':
+                return [{'id': f'd{i}', 'name': str(i), 'isDir': True} for i in range(10)], None
+            return [], None
+        
+        entries = list(walk_tree(slow_page, max_workers=3))
+        
+        self.assertEqual(len(entries), 10)
+        self.assertEqual(state['peak'], 3)
+    
+    def test_error_propagates(self):
+        """Test that a failed page ends the walk with its error."""
+        def failing_page(dir_id, cursor):
+            if dir_id == '1':
+                raise RuntimeError('boom')
+            return tree_page(dir_id, cursor)
+        
+        with self.assertRaises(RuntimeError):
+            list(walk_tree(failing_page))
+    
+    def test_early_close_stops_listing(self):
+        """Test that closing the generator stops further page requests."""
+        list_page = Mock(side_effect=tree_page)
+        walker = walk_tree(list_page, max_workers=1)
+        next(walker)
+        walker.close()
+        
+        self.assertLessEqual(list_page.call_count, 2)
+
+
+class TestCloudWalkers(unittest.TestCase):
+    """Test the provider page functions behind Cloud115Service.walk / Cloud123Service.walk."""
+    
+    def test_115_fs_files_paging(self):
+        """Test that fs_files is paged by offset and items are normalized."""
+        service = Cloud115Service(Mock())
+        service.WALK_PAGE_SIZE = 2
+        client = Mock(spec=['fs_files'])
+        client.fs_files.side_effect = [
+            {'state': True, 'count': 3, 'data': [
+                {'cid': '5', 'pid': '0', 'n': '电影', 'pc': 'fa1'},
+                {'fid': '6', 'cid': '0', 'n': 'a.mkv', 's': '1024', 'sha': 'abc123', 'pc': 'eb2'},
+            ]},
+            {'state': True, 'count': 3, 'data': [
+                {'fid': '7', 'cid': '0', 'n': 'b.mkv', 's': 2048, 'sha': 'DEF456', 'pc': 'eb3'},
+            ]},
+            {'state': True, 'count': 0, 'data': []},
+        ]
+        
+        with patch.object(Cloud115Service, '_get_authenticated_client', return_value=client):
+            entries = {entry['id']: entry for entry in service.walk('0', max_workers=1)}
+        
+        self.assertEqual(set(entries), {'5', '6', '7'})
+        self.assertEqual(entries['5'], {
+            'id': '5', 'name': '电影', 'isDir': True, 'size': None, 'sha1': None, 'md5': None,
+            'pickcode': 'fa1', 'parentId': '0', 'parentPath': '/'
+        })
+        self.assertEqual(entries['6']['size'], 1024)
+        self.assertEqual(entries['6']['sha1'], 'ABC123')
+        self.assertEqual(entries['7']['pickcode'], 'eb3')
+        offsets = [(call.args[0]['cid'], call.args[0]['offset']) for call in client.fs_files.call_args_list]
+        self.assertEqual(offsets, [('0', 0), ('0', 2), ('5', 0)])
+    
+    def test_115_listdir_fallback(self):
+        """Test that clients without fs_files are listed through fs.listdir_attr."""
+        service = Cloud115Service(Mock())
+        client = Mock(spec=['fs'])
+        client.fs.listdir_attr.return_value = [
+            SimpleNamespace(id='6', name='a.mkv', is_directory=False, size=10, sha1='aa', pickcode='p6')
+        ]
+        
+        entries, next_offset = service._walk_page(client, '0', None)
+        
+        self.assertIsNone(next_offset)
+        self.assertEqual(entries[0]['sha1'], 'AA')
+        self.assertEqual(entries[0]['size'], 10)
+    
+    def test_115_failed_page_raises(self):
+        """Test that an error response from fs_files raises."""
+        service = Cloud115Service(Mock())
+        client = Mock(spec=['fs_files'])
+        client.fs_files.return_value = {'state': False, 'error': '登录超时'}
+        
+        with self.assertRaises(RuntimeError):
+            service._walk_page(client, '0', None)
+    
+    def _page(self, items, last_file_id):
+        return {'success': True, 'data': {'fileList': items, 'lastFileId': last_file_id}}
+    
+    def test_123_list_directory_pages_past_100(self):
+        """Test that list_directory follows lastFileId and skips trashed files."""
+        service = Cloud123Service(Mock())
+        first = [{'fileId': i, 'filename': f'{i}.mkv', 'type': 0} for i in range(1, 101)]
+        second = [
+            {'fileId': 101, 'filename': '101.mkv', 'type': 0},
+            {'fileId': 102, 'filename': 'old.mkv', 'type': 0, 'trashed': 1},
+        ]
+        
+        with patch.object(Cloud123Service, '_make_api_request',
+                          side_effect=[self._page(first, 100), self._page(second, -1)]) as request:
+            result = service.list_directory('0')
+        
+        self.assertTrue(result['success'])
+        self.assertEqual(len(result['data']), 101)
+        self.assertNotIn('lastFileId', request.call_args_list[0].kwargs['params'])
+        self.assertEqual(request.call_args_list[1].kwargs['params']['lastFileId'], 100)
+    
+    def test_123_walk(self):
+        """Test that Cloud123Service.walk descends folders and maps etag to md5."""
+        service = Cloud123Service(Mock())
+        pages = {
+            0: self._page([{'fileId': 5, 'filename': '电影', 'type': 1}], -1),
+            5: self._page([{'fileId': 6, 'filename': 'a.mkv', 'type': 0, 'size': 1024, 'etag': 'md5hash'}], -1),
+        }
+        
+        with patch.object(Cloud123Service, '_make_api_request',
+                          side_effect=lambda method, endpoint, params: pages[params['parentFileId']]):
+            entries = {entry['id']: entry for entry in service.walk('0', root_path='/123')}
+        
+        self.assertEqual(entries['6']['md5'], 'md5hash')
+        self.assertEqual(entries['6']['size'], 1024)
+        self.assertEqual(entries['6']['parentPath'], '/123/电影')
+        self.assertEqual(entries['6']['parentId'], '5')
+    
+    def test_123_failed_page_raises(self):
+        """Test that a failed page request ends the walk with RuntimeError."""
+        service = Cloud123Service(Mock())
+        
+        with patch.object(Cloud123Service, '_make_api_request',
+                          return_value={'success': False, 'error': 'token expired'}):
+            with self.assertRaises(RuntimeError):
+                list(service.walk('0'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+import unittest
+import json
+import tempfile
+import shutil
+import os
+import sys
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from models.database import _create_engine, get_session_factory, session_scope, SecretsBase
+from models.offline_task import OfflineTask, TaskStatus
+from models.outbox_event import OutboxEvent
+from services.event_bus import EventBus, OutboxDispatcher, OFFLINE_TASK_COMPLETED, enqueue_event
+from services.offline_tasks import OfflineTaskService
+from services.link_parser import LinkParser
+from services.workflow_service import WorkflowService, WorkflowTask, WorkflowStatus
+
+
+class TestOutbox(unittest.TestCase):
+    """Test offline task transitions flowing through the outbox."""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.engine = _create_engine(f"sqlite:///{os.path.join(self.temp_dir, 'secrets.db')}")
+        SecretsBase.metadata.create_all(self.engine)
+        self.session_factory = get_session_factory(self.engine)
+        self.cloud115 = Mock()
+        self.service = OfflineTaskService(self.session_factory, Mock(), Mock(), self.cloud115)
+        self.bus = EventBus()
+        self.dispatcher = OutboxDispatcher(self.session_factory, self.bus, max_attempts=2)
+        self.service.on_events_enqueued = Mock()
+        with session_scope(self.session_factory) as session:
+            for task_id in ('t1', 't2'):
+                session.add(OfflineTask(
+                    id=task_id, source_url=f'https://example.com/{task_id}.zip', save_cid='0',
+                    p115_task_id=f'p115_{task_id}', status=TaskStatus.DOWNLOADING,
+                    requested_by='user1', requested_chat='chat1'
+                ))
+    
+    def tearDown(self):
+        self.engine.dispose()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def _events(self):
+        with session_scope(self.session_factory) as session:
+            return session.query(OutboxEvent).order_by(OutboxEvent.id).all()
+    
+    def test_sync_enqueues_completion_once_and_dispatches(self):
+        """Test that a COMPLETED transition is written to the outbox and delivered once."""
+        self.cloud115.list_offline_task_statuses.return_value = {'success': True, 'data': {
+            'p115_t1': {'status': 'completed', 'progress': 100},
+            'p115_t2': {'status': 'downloading', 'progress': 50},
+        }}
+        received = []
+        self.bus.subscribe(OFFLINE_TASK_COMPLETED, received.append)
+        
+        self.service.sync_all()
+        self.service.sync_all()  # already completed: no second event
+        
+        events = self._events()
+        self.assertEqual([(e.topic, e.aggregate_id) for e in events], [(OFFLINE_TASK_COMPLETED, 't1')])
+        self.assertEqual(json.loads(events[0].payload)['requestedChat'], 'chat1')
+        self.service.on_events_enqueued.assert_called_once()
+        
+        self.assertEqual(self.dispatcher.dispatch_pending(), 1)
+        self.assertEqual(self.dispatcher.dispatch_pending(), 0)
+        self.assertEqual([event['id'] for event in received], ['t1'])
+        self.assertIsNotNone(self._events()[0].processed_at)
+    
+    def test_failed_handler_is_retried_then_given_up(self):
+        """Test that a failing handler keeps the event until max_attempts."""
+        with session_scope(self.session_factory) as session:
+            enqueue_event(session, OFFLINE_TASK_COMPLETED, 't1', {'id': 't1'})
+        handler = Mock(side_effect=RuntimeError('boom'))
+        self.bus.subscribe(OFFLINE_TASK_COMPLETED, handler)
+        
+        self.dispatcher.dispatch_pending()
+        event = self._events()[0]
+        self.assertIsNone(event.processed_at)
+        self.assertEqual(event.attempts, 1)
+        self.assertEqual(self.dispatcher.dispatch_pending(), 0)  # backing off
+        
+        self.dispatcher.dispatch_pending(now=datetime.now() + timedelta(minutes=1))
+        event = self._events()[0]
+        self.assertIsNotNone(event.processed_at)
+        self.assertEqual(event.last_error, 'boom')
+        self.assertEqual(handler.call_count, 2)
+    
+    def test_workflow_rebuilds_task_from_event(self):
+        """Test that a completion for a task unknown to this process still runs the pipeline."""
+        workflow = WorkflowService(LinkParser())
+        workflow._execute_post_save_workflow = Mock()
+        workflow.subscribe_events(self.bus)
+        
+        self.bus.publish(OFFLINE_TASK_COMPLETED, {
+            'id': 't1', 'sourceUrl': 'magnet:?xt=urn:btih:c12fe1c06bba254a9dc9f519b335aa7c1367a88a',
+            'requestedBy': 'user1', 'requestedChat': 'chat1'
+        })
+        
+        task = workflow._execute_post_save_workflow.call_args[0][0]
+        self.assertEqual(task.chat_id, 'chat1')
+        self.assertEqual(task.offline_task_id, 't1')
+        self.assertEqual(task.target_cloud, '115')
+    
+    def test_workflow_failure_keeps_event_for_retry(self):
+        """Test that the pipeline runs inside delivery and a failure leaves the event to be retried."""
+        strm_service = Mock()
+        strm_service.generate_strm.side_effect = [RuntimeError('STRM 目录不可写'), None]
+        telegram_service = Mock()
+        workflow = WorkflowService(LinkParser(), strm_service=strm_service,
+                                   emby_service=Mock(), telegram_service=telegram_service)
+        workflow.subscribe_events(self.bus)
+        with session_scope(self.session_factory) as session:
+            enqueue_event(session, OFFLINE_TASK_COMPLETED, 't1', {
+                'id': 't1', 'sourceUrl': 'https://example.com/t1.zip',
+                'requestedBy': 'user1', 'requestedChat': 'chat1'
+            })
+        
+        self.dispatcher.dispatch_pending()
+        event = self._events()[0]
+        self.assertIsNone(event.processed_at)
+        self.assertEqual(event.last_error, 'STRM 目录不可写')
+        telegram_service.send_message.assert_not_called()
+        
+        self.dispatcher.dispatch_pending(now=datetime.now() + timedelta(minutes=1))
+        self.assertIsNotNone(self._events()[0].processed_at)
+        self.assertIsNone(self._events()[0].last_error)
+        telegram_service.send_message.assert_called_once()    
+    def test_redelivery_only_retries_unfinished_steps(self):
+        """Test that a retried event skips steps that already ran and notification errors don't fail it."""
+        strm_service = Mock()
+        emby_service = Mock()
+        telegram_service = Mock()
+        telegram_service.send_message.side_effect = [RuntimeError('Forbidden: bot was blocked by the user'), None]
+        workflow = WorkflowService(LinkParser(), strm_service=strm_service,
+                                   emby_service=emby_service, telegram_service=telegram_service)
+        workflow.subscribe_events(self.bus)
+        parser = LinkParser()
+        for i, chat in enumerate(('chat1', 'chat2')):
+            workflow.tasks[f'w{i}'] = WorkflowTask(
+                id=f'w{i}', chat_id=chat, user_id=f'user{i}',
+                parsed_link=parser.parse('https://example.com/t1.zip'),
+                target_cloud='115', status=WorkflowStatus.OFFLINE, offline_task_id='t1'
+            )
+        # chat1's notification fails, then chat2's STRM step fails once
+        strm_service.generate_strm.side_effect = [None, RuntimeError('STRM 目录不可写'), None]
+        with session_scope(self.session_factory) as session:
+            enqueue_event(session, OFFLINE_TASK_COMPLETED, 't1', {'id': 't1'})
+        
+        self.dispatcher.dispatch_pending()
+        self.assertEqual(self._events()[0].last_error, 'STRM 目录不可写')
+        self.assertEqual(workflow.tasks['w0'].status, WorkflowStatus.COMPLETED)
+        
+        self.dispatcher.dispatch_pending(now=datetime.now() + timedelta(minutes=1))
+        self.assertIsNotNone(self._events()[0].processed_at)
+        self.assertIsNone(self._events()[0].last_error)
+        self.assertEqual(strm_service.generate_strm.call_count, 3)
+        self.assertEqual(emby_service.refresh_library.call_count, 2)
+        chats = [call.kwargs['chat_id'] for call in telegram_service.send_message.call_args_list]
+        self.assertEqual(chats, ['chat1', 'chat2'])
+
+
+if __name__ == '__main__':
+    unittest.main()
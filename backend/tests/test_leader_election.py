@@ -0,0 +1,68 @@
+import unittest
+import tempfile
+import shutil
+import os
+import sys
+from unittest.mock import Mock, patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from models.database import _create_engine, get_session_factory, AppDataBase
+from services.leader_election import LeaderElector
+
+
+class TestLeaderElector(unittest.TestCase):
+    """Test lease-based leader election between workers."""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.engine = _create_engine(f"sqlite:///{os.path.join(self.temp_dir, 'appdata.db')}")
+        AppDataBase.metadata.create_all(self.engine)
+        self.session_factory = get_session_factory(self.engine)
+    
+    def tearDown(self):
+        self.engine.dispose()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def _elector(self, **kwargs):
+        return LeaderElector(self.session_factory, ttl=30, on_elected=Mock(), on_demoted=Mock(), **kwargs)
+    
+    def test_only_one_worker_is_elected(self):
+        """Test that a second worker does not get the lease while the first holds it."""
+        first, second = self._elector(), self._elector()
+        
+        first.tick()
+        second.tick()
+        first.tick()  # renewal
+        
+        self.assertTrue(first.is_leader)
+        self.assertFalse(second.is_leader)
+        first.on_elected.assert_called_once()
+        second.on_elected.assert_not_called()
+    
+    def test_failover_after_lease_expires(self):
+        """Test that another worker takes over once the leader stops renewing."""
+        first, second = self._elector(), self._elector()
+        first.tick()
+        
+        with patch('services.leader_election.time.time', return_value=10 ** 10):
+            second.tick()
+            first.tick()
+        
+        self.assertTrue(second.is_leader)
+        self.assertFalse(first.is_leader)
+        first.on_demoted.assert_called_once()
+    
+    def test_release_hands_over_immediately(self):
+        """Test that a released lease can be taken without waiting for expiry."""
+        first, second = self._elector(), self._elector()
+        first.tick()
+        first.release()
+        
+        second.tick()
+        
+        self.assertTrue(second.is_leader)
+
+
+if __name__ == '__main__':
+    unittest.main()
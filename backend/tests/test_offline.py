@@ -3,6 +3,7 @@ import json
 import tempfile
 import os
 import sys
+from datetime import datetime
 from unittest.mock import Mock, patch, MagicMock
 from werkzeug.security import generate_password_hash
 
@@ -11,7 +12,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 from main import create_app
 from persistence.store import DataStore
 from services.offline_tasks import OfflineTaskService
-from models.offline_task import TaskStatus
+from models.offline_task import OfflineTask, TaskStatus
 
 
 class TestOfflineTaskAPI(unittest.TestCase):
@@ -327,6 +328,52 @@ class TestOfflineTaskAPI(unittest.TestCase):
         self.assertEqual(data['data']['status'], 'pending')
         self.assertEqual(data['data']['progress'], 0)
     
+    def test_create_tasks_batch(self):
+        """Test creating a batch of tasks with in-batch duplicates."""
+        cloud115 = Mock()
+        cloud115.create_offline_tasks.side_effect = lambda urls, cid: {
+            'success': True,
+            'data': [{'sourceUrl': url, 'success': True, 'p115TaskId': f'p115_{i}'} for i, url in enumerate(urls)]
+        }
+        self.app.offline_task_service.cloud115_service = cloud115
+        
+        response = self.client.post('/api/115/offline/tasks/batch',
+            json={
+                'sourceUrls': [
+                    'magnet:?xt=urn:btih:C12FE1C06BBA254A9DC9F519B335AA7C1367A88A',
+                    'https://example.com/file.zip',
+                    'magnet:?xt=urn:btih:YEX6DQDLXISUVHOJ6UM3GNNKPQJWPKEK&tr=udp://t',
+                ],
+                'saveCid': '123456789'
+            },
+            headers=self.headers,
+            content_type='application/json'
+        )
+        
+        self.assertEqual(response.status_code, 201)
+        data = json.loads(response.data)
+        self.assertEqual(data['created'], 2)
+        self.assertEqual([item['success'] for item in data['data']], [True, True, True])
+        self.assertTrue(data['data'][2]['duplicate'])
+        self.assertEqual(data['data'][2]['data']['id'], data['data'][0]['data']['id'])
+        self.assertEqual(data['data'][1]['data']['p115TaskId'], 'p115_1')
+        cloud115.create_offline_tasks.assert_called_once_with(
+            ['magnet:?xt=urn:btih:C12FE1C06BBA254A9DC9F519B335AA7C1367A88A', 'https://example.com/file.zip'], '123456789'
+        )
+        
+        response = self.client.get('/api/115/offline/tasks', headers=self.headers)
+        self.assertEqual(json.loads(response.data)['data']['total'], 2)
+    
+    def test_create_tasks_batch_missing_urls(self):
+        """Test creating a batch without source URLs."""
+        response = self.client.post('/api/115/offline/tasks/batch',
+            json={'saveCid': '123456789'},
+            headers=self.headers,
+            content_type='application/json'
+        )
+        
+        self.assertEqual(response.status_code, 400)
+    
     def test_list_with_refresh(self):
         """Test listing tasks with refresh parameter."""
         # Create a task
@@ -390,6 +437,79 @@ class TestOfflineTaskService(unittest.TestCase):
         self.assertIn('data', result)
         self.assertEqual(result['data']['status'], 'pending')
     
+    def test_create_task_wakes_poller(self):
+        """Test that a new task nudges the poller for its first sync."""
+        self.service.on_task_created = Mock()
+        
+        self.service.create_task(
+            source_url='https://example.com/file.zip',
+            save_cid='123456789',
+            requested_by='user1',
+            requested_chat='chat1'
+        )
+        
+        self.service.on_task_created.assert_called_once()
+    
+    def test_batch_submits_only_links_it_claimed(self):
+        """Test that a magnet claimed by a concurrent batch is attached, not sent to 115 again."""
+        magnet = 'magnet:?xt=urn:btih:C12FE1C06BBA254A9DC9F519B335AA7C1367A88A'
+        other = self.service.create_task(source_url=magnet, save_cid='1', requested_by='user2',
+                                         requested_chat='chat2', p115_task_id='hash_other')['data']
+        cloud115 = Mock()
+        cloud115.create_offline_tasks.side_effect = lambda urls, cid: {
+            'success': True,
+            'data': [{'sourceUrl': url, 'success': url.endswith('ok.zip'), 'p115TaskId': 'p115_ok',
+                      'error': None if url.endswith('ok.zip') else '链接无效'} for url in urls]
+        }
+        self.service.cloud115_service = cloud115
+        
+        # The other batch inserts between this batch's lookup and its insert
+        with patch.object(OfflineTaskService, '_active_by_content_key', side_effect=[{}, {
+            other['contentKey']: self.service.find_active_task(magnet)
+        }]):
+            result = self.service.create_tasks(
+                [magnet, 'https://example.com/ok.zip', 'https://example.com/bad.zip'], '1', 'user1', 'chat1'
+            )
+        
+        cloud115.create_offline_tasks.assert_called_once_with(
+            ['https://example.com/ok.zip', 'https://example.com/bad.zip'], '1'
+        )
+        self.assertEqual(result['created'], 1)
+        self.assertTrue(result['data'][0]['duplicate'])
+        self.assertEqual(result['data'][0]['data']['id'], other['id'])
+        self.assertEqual(result['data'][1]['data']['p115TaskId'], 'p115_ok')
+        self.assertEqual(result['data'][2], {'sourceUrl': 'https://example.com/bad.zip',
+                                             'success': False, 'error': '链接无效'})
+        statuses = {task['sourceUrl']: task['status'] for task in self.service.list_tasks()['data']['tasks']}
+        self.assertEqual(statuses['https://example.com/bad.zip'], 'failed')
+    
+    def test_leader_poller_picks_up_tasks_created_in_another_worker(self):
+        """Test that a task created in a non-leader process is synced long before the poll interval."""
+        import threading
+        from services.task_poller import OfflineTaskPoller
+        
+        # Leader: its own service instance; the creating worker never calls its wake()
+        leader_service = OfflineTaskService(self.app.session_factory, self.store, None,
+                                            self.app.cloud115_service, self.app.cloud123_service)
+        cycles = threading.Semaphore(0)
+        poller = OfflineTaskPoller(leader_service, interval=60, due_check_interval=0.05)
+        self.addCleanup(poller.stop)
+        with patch.object(leader_service, 'sync_all',
+                          side_effect=lambda due_only: cycles.release() or {'success': True}):
+            poller.start()
+            self.assertTrue(cycles.acquire(timeout=2))
+            
+            self.service.on_task_created = None
+            self.service.create_task(
+                source_url='https://example.com/file.zip',
+                save_cid='123456789',
+                requested_by='user1',
+                requested_chat='chat1',
+                p115_task_id='hash_new'
+            )
+            
+            self.assertTrue(cycles.acquire(timeout=2))
+    
     def test_list_tasks(self):
         """Test listing tasks via service."""
         # Create a task
@@ -500,6 +620,192 @@ class TestOfflineTaskService(unittest.TestCase):
         # Verify it's gone
         task = self.service.get_task(task_id)
         self.assertIsNone(task)
+    
+    def test_sync_all_covers_both_providers(self):
+        """Test that one sync cycle updates 115 and 123 tasks from their own APIs."""
+        self.service.create_task(source_url='https://example.com/a.zip', save_cid='1',
+                                 requested_by='u', requested_chat='c', p115_task_id='hash_a')
+        result_123 = self.service.create_task(source_url='https://example.com/b.zip', save_cid='/',
+                                              requested_by='u', requested_chat='c',
+                                              provider='123', p123_task_id='77')
+        self.service.cloud115_service = Mock()
+        self.service.cloud115_service.list_offline_task_statuses.return_value = {
+            'success': True, 'data': {'hash_a': {'status': 'downloading', 'progress': 30}}
+        }
+        self.service.cloud123_service = Mock()
+        self.service.cloud123_service.get_offline_task_statuses.return_value = {
+            'success': True, 'data': {'77': {'status': 'completed', 'progress': 100, 'speed': None}}
+        }
+        
+        result = self.service.sync_all()
+        
+        self.assertEqual((result['synced'], result['failed']), (2, 0))
+        self.service.cloud123_service.get_offline_task_statuses.assert_called_once_with(['77'])
+        task = self.service.get_task(result_123['data']['id'])
+        self.assertEqual(task.status, TaskStatus.COMPLETED)
+        self.assertEqual(task.to_dict()['provider'], '123')
+    
+    def test_create_task_attaches_to_active_duplicate(self):
+        """Test that the same content sent twice yields one active task."""
+        first = self.service.create_task(
+            source_url='magnet:?xt=urn:btih:c12fe1c06bba254a9dc9f519b335aa7c1367a88a&tr=udp://a',
+            save_cid='1', requested_by='user1', requested_chat='chat1'
+        )
+        # Same info-hash in base32 with other trackers
+        second = self.service.create_task(
+            source_url='magnet:?xt=urn:btih:YEX6DQDLXISUVHOJ6UM3GNNKPQJWPKEK&dn=x&tr=udp://b',
+            save_cid='1', requested_by='user2', requested_chat='chat2'
+        )
+        
+        self.assertNotIn('duplicate', first)
+        self.assertTrue(second['duplicate'])
+        self.assertEqual(second['data']['id'], first['data']['id'])
+        self.assertEqual(self.service.list_tasks()['data']['total'], 1)
+        
+        # A finished download can be requested again
+        session = self.app.session_factory()
+        session.query(OfflineTask).update({'status': TaskStatus.FAILED})
+        session.commit()
+        session.close()
+        third = self.service.create_task(
+            source_url='magnet:?xt=urn:btih:C12FE1C06BBA254A9DC9F519B335AA7C1367A88A',
+            save_cid='1', requested_by='user3', requested_chat='chat3'
+        )
+        self.assertNotIn('duplicate', third)
+        
+        # ...but the failed one cannot be retried while the new one is active
+        retried = self.service.retry_task(first['data']['id'])
+        self.assertFalse(retried['success'])
+    
+    def test_same_content_on_115_and_123_are_separate_tasks(self):
+        """Test that dedup is per provider: a 123 download of an active 115 magnet gets its own row."""
+        magnet = 'magnet:?xt=urn:btih:c12fe1c06bba254a9dc9f519b335aa7c1367a88a'
+        on_115 = self.service.create_task(
+            source_url=magnet, save_cid='1', requested_by='user1', requested_chat='chat1',
+            p115_task_id='c12fe1c06bba254a9dc9f519b335aa7c1367a88a'
+        )
+        on_123 = self.service.create_task(
+            source_url=magnet, save_cid='2', requested_by='user1', requested_chat='chat1',
+            provider='123', p123_task_id='777'
+        )
+        
+        self.assertNotIn('duplicate', on_123)
+        self.assertNotEqual(on_123['data']['id'], on_115['data']['id'])
+        self.assertEqual(on_123['data']['p123TaskId'], '777')
+        self.assertEqual(self.service.find_active_task(magnet).id, on_115['data']['id'])
+        self.assertEqual(self.service.find_active_task(magnet, provider='123').id, on_123['data']['id'])
+        
+        # Still one active task per provider
+        again = self.service.create_task(
+            source_url=magnet, save_cid='2', requested_by='user2', requested_chat='chat2',
+            provider='123', p123_task_id='778'
+        )
+        self.assertTrue(again['duplicate'])
+        self.assertEqual(again['data']['id'], on_123['data']['id'])
+    
+    def test_list_tasks_keyset_pagination(self):
+        """Test walking all pages with nextCursor returns every task once, newest first."""
+        created = [
+            self.service.create_task(
+                source_url=f'https://example.com/file{i}.zip',
+                save_cid='123456789',
+                requested_by='user1',
+                requested_chat='chat1'
+            )['data']['id']
+            for i in range(7)
+        ]
+        
+        seen = []
+        cursor = None
+        while True:
+            result = self.service.list_tasks(limit=3, cursor=cursor)
+            self.assertTrue(result['success'])
+            seen.extend(task['id'] for task in result['data']['tasks'])
+            cursor = result['data']['nextCursor']
+            if not cursor:
+                break
+        
+        self.assertEqual(seen, list(reversed(created)))
+        self.assertFalse(self.service.list_tasks(cursor='not-a-cursor')['success'])
+    
+    def test_task_queries_use_indexes(self):
+        """Test that listing and poller queries are planned on an index, not a table scan."""
+        from models.database import session_scope
+        from services.offline_tasks import encode_cursor
+        
+        def plan(query):
+            compiled = query.statement.compile(dialect=session.get_bind().dialect,
+                                              compile_kwargs={'render_postcompile': True})
+            params = tuple(None for _ in compiled.positiontup)
+            rows = session.connection().exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled}', params).fetchall()
+            return ' | '.join(row[-1] for row in rows)
+        
+        with session_scope(self.app.session_factory) as session:
+            task = OfflineTask(id='x', created_at=datetime(2024, 1, 1))
+            cursor = encode_cursor(task)
+            queries = {
+                'all': self.service._page(self.service._list_query(session), None, 50, 0),
+                'cursor': self.service._page(self.service._list_query(session), cursor, 50, 0),
+                'status': self.service._page(self.service._list_query(session, TaskStatus.PENDING), cursor, 50, 0),
+                'user': self.service._page(self.service._list_query(session, requested_by='user1'), cursor, 50, 0),
+                'poller': self.service._active_tasks_query(session),
+            }
+            for name, query in queries.items():
+                detail = plan(query)
+                self.assertIn('USING', detail, f'{name}: {detail}')
+                self.assertNotIn('TEMP B-TREE', detail, f'{name}: {detail}')
+                if name != 'all':
+                    self.assertIn('SEARCH', detail, f'{name}: {detail}')
+    
+    def test_next_poll_delay(self):
+        """Test adaptive delays: fast near completion, ETA-based while progressing, backoff when stalled."""
+        from services.offline_tasks import next_poll_delay
+        
+        self.assertIsNone(next_poll_delay(TaskStatus.COMPLETED, 100, 90, 60, 10))
+        self.assertEqual(next_poll_delay(TaskStatus.DOWNLOADING, 97, 90, 60, 300), 5)
+        # 10% in 100s -> 50% left takes ~500s -> poll in ~125s
+        self.assertEqual(next_poll_delay(TaskStatus.DOWNLOADING, 50, 40, 100, 20), 125)
+        # Stalled / queued: double the previous delay up to the cap
+        self.assertEqual(next_poll_delay(TaskStatus.PENDING, 0, 0, 0, None), 10)
+        self.assertEqual(next_poll_delay(TaskStatus.DOWNLOADING, 30, 30, 300, 40), 80)
+        self.assertEqual(next_poll_delay(TaskStatus.DOWNLOADING, 30, 30, 300, 500), 600)
+    
+    def test_sync_due_only_skips_tasks_not_due(self):
+        """Test that the poller sync only touches due tasks and schedules the next poll."""
+        from models.database import session_scope
+        
+        ids = []
+        for i in range(2):
+            task_id = self.service.create_task(
+                source_url=f'https://example.com/file{i}.zip',
+                save_cid='123456789',
+                requested_by='user1',
+                requested_chat='chat1'
+            )['data']['id']
+            ids.append(task_id)
+        with session_scope(self.app.session_factory) as session:
+            for i, task_id in enumerate(ids):
+                task = session.get(OfflineTask, task_id)
+                task.p115_task_id = f'hash_{i}'
+            session.get(OfflineTask, ids[1]).next_poll_at = datetime(2999, 1, 1)
+        
+        statuses = {
+            'success': True,
+            'data': {
+                'hash_0': {'status': 'downloading', 'progress': 10, 'speed': 100.0},
+                'hash_1': {'status': 'downloading', 'progress': 10, 'speed': 100.0},
+            }
+        }
+        with patch.object(self.service.cloud115_service, 'list_offline_task_statuses', return_value=statuses):
+            result = self.service.sync_all(due_only=True)
+        
+        self.assertEqual(result['total'], 1)
+        polled = self.service.get_task(ids[0])
+        skipped = self.service.get_task(ids[1])
+        self.assertEqual(polled.progress, 10)
+        self.assertIsNotNone(polled.next_poll_at)
+        self.assertEqual(skipped.progress, 0)
+        self.assertGreater(self.service.seconds_until_next_poll(), 0)
 
 
 if __name__ == '__main__':
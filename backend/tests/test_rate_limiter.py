@@ -0,0 +1,98 @@
+import unittest
+import tempfile
+import shutil
+import os
+import sys
+from unittest.mock import Mock, patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from models.database import _create_engine, get_session_factory, AppDataBase
+from services.rate_limiter import TokenBucketLimiter, RateLimitedProxy
+
+
+class TestTokenBucketLimiter(unittest.TestCase):
+    """Test the cross-process token bucket."""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.engine = _create_engine(f"sqlite:///{os.path.join(self.temp_dir, 'appdata.db')}")
+        AppDataBase.metadata.create_all(self.engine)
+        self.session_factory = get_session_factory(self.engine)
+    
+    def tearDown(self):
+        self.engine.dispose()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    @patch('services.rate_limiter.time.sleep')
+    def test_limiters_with_same_name_share_budget(self, mock_sleep):
+        """Test that two workers' limiters draw from one bucket."""
+        first = TokenBucketLimiter(self.session_factory, 'cloud115', lambda: 1)
+        second = TokenBucketLimiter(self.session_factory, 'cloud115', lambda: 1)
+        
+        self.assertEqual(first.acquire(), 0.0)
+        wait = second.acquire()
+        
+        self.assertGreater(wait, 0.9)
+        mock_sleep.assert_called_once_with(wait)
+        self.assertEqual(second.get_metrics()['throttled'], 1)
+        self.assertEqual(first.get_metrics()['throttled'], 0)
+    
+    @patch('services.rate_limiter.time.sleep')
+    def test_zero_rate_disables_limiting(self, mock_sleep):
+        """Test that qps <= 0 never waits."""
+        limiter = TokenBucketLimiter(self.session_factory, 'cloud123', lambda: 0)
+        
+        for _ in range(5):
+            self.assertEqual(limiter.acquire(), 0.0)
+        
+        mock_sleep.assert_not_called()
+        self.assertEqual(limiter.get_metrics()['calls'], 5)
+    
+    @patch('services.rate_limiter.time.sleep')
+    def test_fails_open_when_bucket_unavailable(self, mock_sleep):
+        """Test that a database error lets the call through."""
+        limiter = TokenBucketLimiter(Mock(side_effect=Exception('db down')), 'cloud115', lambda: 1)
+        
+        self.assertEqual(limiter.acquire(), 0.0)
+        self.assertEqual(limiter.get_metrics()['errors'], 1)
+
+
+class TestRateLimitedProxy(unittest.TestCase):
+    """Test API client wrapping."""
+    
+    def test_nested_calls_take_a_token(self):
+        """Test that client.offline.list() acquires before calling through."""
+        limiter = Mock()
+        client = Mock()
+        client.offline.list.return_value = {'tasks': []}
+        client.user_id = 42
+        
+        proxy = RateLimitedProxy(client, limiter, ['offline.list'])
+        
+        self.assertEqual(proxy.offline.list(page=1), {'tasks': []})
+        client.offline.list.assert_called_once_with(page=1)
+        limiter.acquire.assert_called_once()
+        self.assertEqual(proxy.user_id, 42)
+    
+    def test_unlisted_attributes_are_not_wrapped(self):
+        """Test that only allow-listed methods are throttled; everything else is the raw attribute."""
+        limiter = Mock()
+        client = Mock()
+        
+        proxy = RateLimitedProxy(client, limiter, ['fs_files', 'fs.listdir'])
+        
+        self.assertIs(proxy.login_app, client.login_app)
+        self.assertIs(proxy.fs.get_url, client.fs.get_url)
+        self.assertIs(proxy.cookies.get, client.cookies.get)
+        proxy.login_app()
+        proxy.fs.get_url('pc')
+        limiter.acquire.assert_not_called()
+        
+        proxy.fs_files({'cid': '0'})
+        proxy.fs.listdir('0')
+        self.assertEqual(limiter.acquire.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import unittest
+import json
+import tempfile
+import shutil
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from models.database import _create_engine, _upgrade_schema, get_session_factory, session_scope, SecretsBase, AppDataBase
+from models.app_data import TaskHistory
+from models.offline_task import OfflineTask, TaskStatus
+from services.task_archiver import TaskArchiver
+
+
+class TestTaskArchiver(unittest.TestCase):
+    """Test archiving of finished offline tasks into task_history."""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.secrets_engine = _create_engine(f"sqlite:///{os.path.join(self.temp_dir, 'secrets.db')}")
+        self.appdata_engine = _create_engine(f"sqlite:///{os.path.join(self.temp_dir, 'appdata.db')}")
+        SecretsBase.metadata.create_all(self.secrets_engine)
+        AppDataBase.metadata.create_all(self.appdata_engine)
+        self.secrets_factory = get_session_factory(self.secrets_engine)
+        self.appdata_factory = get_session_factory(self.appdata_engine)
+        self.archiver = TaskArchiver(self.secrets_factory, self.appdata_factory,
+                                     archive_after_days=7, retention_days=30, batch_size=2)
+    
+    def tearDown(self):
+        self.secrets_engine.dispose()
+        self.appdata_engine.dispose()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def _add_task(self, task_id, status, age_days):
+        updated = datetime.now() - timedelta(days=age_days)
+        with session_scope(self.secrets_factory) as session:
+            session.add(OfflineTask(
+                id=task_id, source_url=f'magnet:?xt=urn:btih:{task_id}', save_cid='0',
+                status=status, requested_by='u', requested_chat='c',
+                created_at=updated, updated_at=updated
+            ))
+    
+    def _task_ids(self):
+        with session_scope(self.secrets_factory) as session:
+            return {task_id for (task_id,) in session.query(OfflineTask.id)}
+    
+    def test_archives_only_old_terminal_tasks(self):
+        """Test that old finished tasks move to history in batches and live tasks stay."""
+        self._add_task('done-old', TaskStatus.COMPLETED, 10)
+        self._add_task('failed-old', TaskStatus.FAILED, 10)
+        self._add_task('cancelled-old', TaskStatus.CANCELLED, 10)
+        self._add_task('done-new', TaskStatus.COMPLETED, 1)
+        self._add_task('active-old', TaskStatus.DOWNLOADING, 10)
+        
+        result = self.archiver.run_once()
+        
+        self.assertEqual(result['archived'], 3)
+        self.assertEqual(self._task_ids(), {'done-new', 'active-old'})
+        with session_scope(self.appdata_factory) as session:
+            history = {row.source_id: row for row in session.query(TaskHistory)}
+        self.assertEqual(set(history), {'done-old', 'failed-old', 'cancelled-old'})
+        self.assertEqual(history['failed-old'].status, 'failed')
+        self.assertEqual(history['done-old'].task_type, 'offline')
+        self.assertEqual(json.loads(history['done-old'].details)['id'], 'done-old')
+    
+    def test_rerun_after_partial_archive_does_not_duplicate(self):
+        """Test that tasks already copied to history are not inserted twice."""
+        self._add_task('done-old', TaskStatus.COMPLETED, 10)
+        with session_scope(self.appdata_factory) as session:
+            session.add(TaskHistory(task_type='offline', status='completed', source_id='done-old',
+                                    completed_at=datetime.now() - timedelta(days=10)))
+        
+        self.assertEqual(self.archiver.archive(), 1)
+        with session_scope(self.appdata_factory) as session:
+            self.assertEqual(session.query(TaskHistory).count(), 1)
+        self.assertEqual(self._task_ids(), set())
+    
+    def test_retention_purges_old_history(self):
+        """Test that history past the retention window is deleted."""
+        with session_scope(self.appdata_factory) as session:
+            for i, age in enumerate([40, 35, 31, 5]):
+                session.add(TaskHistory(task_type='offline', status='completed', source_id=f'h{i}',
+                                        completed_at=datetime.now() - timedelta(days=age)))
+        
+        result = self.archiver.run_once()
+        
+        self.assertEqual(result['purged'], 3)
+        with session_scope(self.appdata_factory) as session:
+            self.assertEqual([row.source_id for row in session.query(TaskHistory)], ['h3'])
+    
+    def test_upgrade_schema_adds_source_id_to_existing_table(self):
+        """Test that a task_history table created before source_id existed is migrated."""
+        engine = _create_engine(f"sqlite:///{os.path.join(self.temp_dir, 'old.db')}")
+        try:
+            with engine.begin() as conn:
+                conn.exec_driver_sql(
+                    'CREATE TABLE task_history (id INTEGER PRIMARY KEY, task_type VARCHAR(100) NOT NULL, '
+                    'status VARCHAR(50), details TEXT, created_at DATETIME, completed_at DATETIME)'
+                )
+            _upgrade_schema(AppDataBase.metadata, engine)
+            with session_scope(get_session_factory(engine)) as session:
+                session.add(TaskHistory(task_type='offline', source_id='x'))
+            with session_scope(get_session_factory(engine)) as session:
+                self.assertEqual(session.query(TaskHistory.source_id).scalar(), 'x')
+        finally:
+            engine.dispose()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+import threading
+import time
+import os
+import sys
+from unittest.mock import Mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from services.task_poller import OfflineTaskPoller
+
+
+class TestOfflineTaskPoller(unittest.TestCase):
+    """Test poller wake-up, shutdown and metrics."""
+    
+    def setUp(self):
+        self.service = Mock()
+        self.service.seconds_until_next_poll.return_value = None
+        self.service.count_due_tasks.return_value = 3
+        self.cycles = threading.Semaphore(0)
+        
+        def sync_all(due_only):
+            self.cycles.release()
+            return {'success': True, 'synced': 2, 'failed': 1, 'total': 3}
+        self.service.sync_all.side_effect = sync_all
+        self.poller = OfflineTaskPoller(self.service, interval=60)
+    
+    def tearDown(self):
+        self.poller.stop()
+    
+    def test_wake_runs_a_cycle_immediately(self):
+        """Test that wake() syncs without waiting for the interval."""
+        self.poller.start()
+        self.assertTrue(self.cycles.acquire(timeout=2))
+        
+        self.poller.wake()
+        
+        self.assertTrue(self.cycles.acquire(timeout=2))
+        self.assertEqual(self.service.sync_all.call_count, 2)
+    
+    def test_stop_does_not_wait_for_interval(self):
+        """Test that stop() returns right away while the loop is waiting."""
+        self.poller.start()
+        self.assertTrue(self.cycles.acquire(timeout=2))
+        
+        started = time.monotonic()
+        self.poller.stop()
+        
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertFalse(self.poller.thread.is_alive())
+    
+    def test_metrics_record_last_cycle(self):
+        """Test that a cycle records its duration, result and backlog."""
+        self.poller.poll_once()
+        
+        metrics = self.poller.get_metrics()
+        
+        self.assertEqual(metrics['cycles'], 1)
+        self.assertEqual((metrics['lastSynced'], metrics['lastFailed']), (2, 1))
+        self.assertEqual(metrics['backlog'], 3)
+        self.assertIsNotNone(metrics['lastCycleSeconds'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+# utils/batching.py
+# 批量文件操作 - 按云盘单次上限分块调用, 返回逐项结果
+
+import logging
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+def run_in_batches(items: Sequence[Any], batch_size: int,
+                   call: Callable[[List[Any]], Optional[str]],
+                   describe: Callable[[Any], Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Run `call` on consecutive chunks of `items` and report every item.
+    
+    A chunk succeeds or fails as a whole (the cloud APIs don't report
+    per-item outcomes), so a failed chunk marks each of its items failed
+    and later chunks still run.
+    
+    Args:
+        items: Items in request order
+        batch_size: Max items per call
+        call: Performs one chunk; returns an error message or None, may raise
+        describe: Result dict identifying an item, e.g. {'fileId': ...}
+    
+    Returns:
+        {'success', 'data': [per-item results in order], 'succeeded', 'failed'};
+        success is False only when nothing succeeded
+    """
+    results = []
+    for start in range(0, len(items), batch_size):
+        chunk = list(items[start:start + batch_size])
+        try:
+            error = call(chunk)
+        except Exception as e:
+            logger.error(f'Batch of {len(chunk)} items failed: {str(e)}')
+            error = str(e)
+        for item in chunk:
+            result = describe(item)
+            result['success'] = error is None
+            if error is not None:
+                result['error'] = error
+            results.append(result)
+    
+    succeeded = sum(1 for result in results if result['success'])
+    return {
+        'success': succeeded > 0 or not results,
+        'data': results,
+        'succeeded': succeeded,
+        'failed': len(results) - succeeded
+    }
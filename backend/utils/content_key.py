@@ -0,0 +1,66 @@
+# utils/content_key.py
+# 离线链接归一化 - 同一内容的 magnet / ed2k 链接得到相同的 key
+
+import base64
+import binascii
+import re
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit, unquote
+
+_HEX40 = re.compile(r'^[0-9a-fA-F]{40}$')
+_BASE32 = re.compile(r'^[A-Za-z2-7]{32}$')
+_HEX32 = re.compile(r'^[0-9a-fA-F]{32}$')
+
+
+def _btih_hex(value: str) -> Optional[str]:
+    """BitTorrent info-hash as 40 lowercase hex chars (accepts hex or base32)."""
+    if _HEX40.match(value):
+        return value.lower()
+    if _BASE32.match(value):
+        try:
+            return binascii.hexlify(base64.b32decode(value.upper())).decode()
+        except (binascii.Error, ValueError):
+            return None
+    return None
+
+
+def content_key(source_url: str) -> Optional[str]:
+    """
+    Content key of an offline download link, or None if it has none.
+    
+    magnet:?xt=urn:btih:<hex|base32>&tr=...  -> 'btih:<hex>'  (trackers/name ignored)
+    magnet:?xt=urn:btmh:<multihash>          -> 'btmh:<hex>'
+    ed2k://|file|<name>|<size>|<md4>|/       -> 'ed2k:<md4>'
+    
+    Args:
+        source_url: URL or magnet link as submitted
+    """
+    if not isinstance(source_url, str):
+        return None
+    url = source_url.strip()
+    lowered = url.lower()
+    
+    if lowered.startswith('magnet:'):
+        query = urlsplit(url).query or url.partition('?')[2]
+        for xt in parse_qs(query).get('xt', []):
+            scheme, _, value = xt.partition(':')
+            if scheme.lower() != 'urn':
+                continue
+            kind, _, digest = value.partition(':')
+            kind = kind.lower()
+            if kind == 'btih':
+                digest = _btih_hex(digest)
+                if digest:
+                    return f'btih:{digest}'
+            elif kind == 'btmh' and re.match(r'^[0-9a-fA-F]+$', digest):
+                return f'btmh:{digest.lower()}'
+        return None
+    
+    if lowered.startswith('ed2k://'):
+        parts = unquote(url).split('|')
+        # ed2k://|file|name|size|hash|...
+        if len(parts) >= 5 and parts[1].lower() == 'file' and _HEX32.match(parts[4]):
+            return f'ed2k:{parts[4].lower()}'
+        return None
+    
+    return None
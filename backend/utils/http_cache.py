@@ -0,0 +1,32 @@
+# utils/http_cache.py
+# ETag / 条件请求工具 - 让未变化的读接口直接返回 304
+
+import hashlib
+from typing import Any, Callable, Optional, Tuple
+
+from flask import request, make_response
+
+
+def make_etag(*parts: Any) -> str:
+    """Build a stable ETag value from version parts (signatures, counters, fingerprints)."""
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()[:20]
+
+
+def conditional_response(etag: Optional[str], build: Callable[[], Tuple[Any, int]]):
+    """
+    Answer 304 if the client's If-None-Match matches `etag`, otherwise build the response.
+    
+    Args:
+        etag: Current version of the resource, or None to skip conditional handling
+        build: Callable returning the usual (response, status) tuple
+    """
+    if etag and request.if_none_match.contains_weak(etag):
+        response = make_response('', 304)
+    else:
+        response = make_response(*build())
+        if response.status_code != 200:
+            return response
+    if etag:
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+    return response